@@ -0,0 +1,157 @@
+import base64
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+# Installed before any Meet script runs (CDP addScriptToEvaluateOnNewDocument).
+# It wraps RTCPeerConnection so every remote audio track the page receives is
+# remembered; <audio> elements are picked up as a fallback when tapping starts.
+HOOK_SCRIPT = """
+(function () {
+    if (window.__meetBotAudio) { return; }
+    var tap = window.__meetBotAudio = {streams: [], chunks: [], bytes: 0, recorder: null, onStream: null};
+    function remember(stream) {
+        if (!stream || tap.streams.indexOf(stream) !== -1) { return; }
+        tap.streams.push(stream);
+        if (tap.onStream) { tap.onStream(stream); }
+    }
+    tap.remember = remember;
+    var Native = window.RTCPeerConnection;
+    if (!Native) { return; }
+    function Wrapped(config, constraints) {
+        var pc = new Native(config, constraints);
+        pc.addEventListener("track", function (event) {
+            if (event.track.kind !== "audio") { return; }
+            remember(event.streams && event.streams[0] ? event.streams[0] : new MediaStream([event.track]));
+        });
+        return pc;
+    }
+    Wrapped.prototype = Native.prototype;
+    Object.setPrototypeOf(Wrapped, Native);
+    window.RTCPeerConnection = Wrapped;
+})();
+"""
+
+# Mixes every remote audio stream into one MediaStreamDestination and encodes
+# it with MediaRecorder to WebM/Opus, queueing base64 chunks for Python.
+START_SCRIPT = """
+var tap = window.__meetBotAudio;
+if (!tap) { return "hook_missing"; }
+if (tap.recorder) { return "already_started"; }
+var bitrate = arguments[0];
+var timeslice = arguments[1];
+var ctx = new AudioContext();
+var destination = ctx.createMediaStreamDestination();
+function connect(stream) {
+    if (!stream.getAudioTracks().length) { return; }
+    ctx.createMediaStreamSource(stream).connect(destination);
+}
+document.querySelectorAll("audio, video").forEach(function (el) {
+    if (el.srcObject) { tap.remember(el.srcObject); }
+});
+tap.streams.forEach(connect);
+tap.onStream = connect;
+ctx.resume();
+
+var recorder = new MediaRecorder(destination.stream,
+                                 {mimeType: "audio/webm;codecs=opus", audioBitsPerSecond: bitrate});
+recorder.ondataavailable = function (event) {
+    if (!event.data || !event.data.size) { return; }
+    var reader = new FileReader();
+    reader.onloadend = function () {
+        tap.chunks.push(reader.result.split(",")[1]);
+        tap.bytes += event.data.size;
+    };
+    reader.readAsDataURL(event.data);
+};
+tap.recorder = recorder;
+tap.context = ctx;
+recorder.start(timeslice);
+return "started";
+"""
+
+DRAIN_SCRIPT = """
+var tap = window.__meetBotAudio;
+if (!tap) { return null; }
+var chunks = tap.chunks;
+tap.chunks = [];
+return chunks;
+"""
+
+STOP_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var tap = window.__meetBotAudio;
+if (!tap || !tap.recorder || tap.recorder.state === "inactive") { done(false); return; }
+tap.recorder.addEventListener("stop", function () {
+    // Let the last FileReader finish before handing back.
+    setTimeout(function () { tap.context.close(); done(true); }, 200);
+});
+tap.recorder.stop();
+"""
+
+class AudioTap:
+    """
+    Audio-only capture straight from the meeting's remote WebRTC tracks.
+
+    Chrome encodes the mixed remote audio to Opus (WebM) itself and the chunks
+    are pulled into Python, so there is no screen grab, no FFmpeg and no virtual
+    audio cable. It offers the same start_recording()/stop_recording()/get_stats()
+    interface as recorder.Recorder.
+
+    install() must run before the Meet page is opened. The WebDriver is not
+    thread-safe, so chunks are pulled by calling drain() from the thread that
+    owns the driver (record_meeting does it on every monitor poll).
+    """
+    def __init__(self, driver, output_path, bitrate=32000, timeslice_ms=1000):
+        self.driver = driver
+        self.output_path = output_path
+        self.bitrate = bitrate
+        self.timeslice_ms = timeslice_ms
+        self.bytes_written = 0
+        self.chunks_written = 0
+        self._file = None
+
+    def install(self):
+        self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HOOK_SCRIPT})
+
+    def start_recording(self):
+        state = self.driver.execute_script(START_SCRIPT, self.bitrate, self.timeslice_ms)
+        if state not in ("started", "already_started"):
+            raise RuntimeError(f"Could not start the in-browser audio tap ({state}). "
+                               "Was install() called before opening the meeting?")
+        self._file = open(self.output_path, "ab")
+        print(f"🎧 In-browser audio capture started -> {self.output_path}")
+
+    def drain(self):
+        """
+        Appends every encoded chunk produced so far to the output file.
+        """
+        if not self._file:
+            return 0
+        chunks = self.driver.execute_script(DRAIN_SCRIPT) or []
+        for chunk in chunks:
+            data = base64.b64decode(chunk)
+            self._file.write(data)
+            self.bytes_written += len(data)
+        self.chunks_written += len(chunks)
+        if chunks:
+            self._file.flush()
+        return len(chunks)
+
+    def get_stats(self):
+        return {"bytes": self.bytes_written, "chunks": self.chunks_written}
+
+    def stop_recording(self):
+        if not self._file:
+            return
+        try:
+            self.driver.set_script_timeout(10)
+            self.driver.execute_async_script(STOP_SCRIPT)
+            self.drain()
+        except WebDriverException as e:
+            # The page may already be gone when the call ends; keep what was drained.
+            print(f"⚠️ Could not flush the last audio chunks. Error: {e}")
+        finally:
+            self._file.close()
+            self._file = None
+        print(f"⏹️  Audio capture stopped: {self.bytes_written} bytes in {self.chunks_written} chunks.")
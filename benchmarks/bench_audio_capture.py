@@ -0,0 +1,82 @@
+"""
+Compares the cost of audio-only capture through audio_tap.AudioTap (in-browser
+Opus) with the FFmpeg screen + audio recorder on the local audio fixture.
+Reports CPU (cores), peak RSS and output bytes per minute for each path.
+
+Usage (Linux, from the project root, with chromedriver and ffmpeg available):
+    python benchmarks/bench_audio_capture.py [seconds]
+"""
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from audio_tap import AudioTap
+from browser_handler import initialize_driver
+from recorder import Recorder
+from system_resources import process_tree_cpu_seconds, process_tree_rss_mb
+
+FIXTURE = pathlib.Path(__file__).resolve().parent.parent / "fixtures" / "audio_call.html"
+
+def measure(pids, seconds, on_tick=None):
+    """
+    Samples the process trees once a second. Returns (cores used, peak RSS MB).
+    """
+    cpu_before = sum(process_tree_cpu_seconds(pid) for pid in pids)
+    started = time.monotonic()
+    peak_rss = 0.0
+    while time.monotonic() - started < seconds:
+        time.sleep(1)
+        if on_tick:
+            on_tick()
+        peak_rss = max(peak_rss, sum(process_tree_rss_mb(pid) or 0 for pid in pids))
+    elapsed = time.monotonic() - started
+    cpu_after = sum(process_tree_cpu_seconds(pid) for pid in pids)
+    return (cpu_after - cpu_before) / elapsed, peak_rss
+
+def run_ffmpeg(driver, seconds, output_path):
+    driver.get(FIXTURE.as_uri())
+    time.sleep(2)
+    recorder = Recorder(output_path, preset="full_motion", nice=0)
+    recorder.start_recording()
+    cores, rss = measure([driver.service.process.pid, recorder.process.pid], seconds)
+    recorder.stop_recording()
+    return cores, rss
+
+def run_audio_tap(driver, seconds, output_path):
+    tap = AudioTap(driver, output_path)
+    tap.install()
+    driver.get(FIXTURE.as_uri())
+    time.sleep(2)
+    tap.start_recording()
+    cores, rss = measure([driver.service.process.pid], seconds, on_tick=tap.drain)
+    tap.stop_recording()
+    return cores, rss
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    work_dir = tempfile.mkdtemp(prefix="bench_audio_")
+    results = []
+    for name, runner, extension in (("ffmpeg screen+audio", run_ffmpeg, "mp4"),
+                                    ("in-browser audio tap", run_audio_tap, "webm")):
+        driver = initialize_driver(user_data_dir=os.path.join(work_dir, f"profile_{extension}"))
+        if not driver:
+            sys.exit(1)
+        output_path = os.path.join(work_dir, f"capture.{extension}")
+        try:
+            cores, rss = runner(driver, seconds, output_path)
+        finally:
+            driver.quit()
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        results.append((name, cores, rss, size * 60 / seconds))
+
+    print(f"\n📊 Capture cost over {seconds}s (Chrome + recorder process trees)")
+    print(f"{'path':<22} {'CPU (cores)':>12} {'peak RSS (MB)':>14} {'bytes/min':>12}")
+    for name, cores, rss, bytes_per_minute in results:
+        print(f"{name:<22} {cores:>12.2f} {rss:>14.0f} {bytes_per_minute:>12.0f}")
+
+if __name__ == "__main__":
+    main()
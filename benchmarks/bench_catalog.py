@@ -0,0 +1,110 @@
+"""
+Seeds a throwaway collection with synthetic recordings and times catalog
+queries against it: the first page and a deep page for one participant, one
+meeting and a time range. For each query it prints the winning plan's index,
+keys/documents examined and latency. Every page should examine about `limit`
+keys however deep it is.
+
+Usage (from the project root, with a local mongod; the collection is dropped afterwards):
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_catalog.py [recordings]
+"""
+import os
+import pathlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from pymongo import MongoClient
+
+from catalog import RecordingCatalog, catalog_fields
+
+PEOPLE = [f"Person {i}" for i in range(2000)]
+MEETINGS = [f"https://meet.google.com/aaa-bbbb-{i:03d}" for i in range(500)]
+
+def seed(collection, count, batch_size=10000):
+    rng = random.Random(1)
+    started = datetime(2024, 1, 1)
+    for first in range(0, count, batch_size):
+        batch = []
+        for i in range(first, min(first + batch_size, count)):
+            start = started + timedelta(minutes=i)
+            names = rng.sample(PEOPLE, rng.randint(1, 6))
+            metadata = {
+                "recording_id": f"bench-{i}",
+                "partner_id": ", ".join(names),
+                "meeting_id": rng.choice(MEETINGS),
+                "start_time_utc": start,
+                "end_time_utc": start + timedelta(minutes=rng.randint(5, 240)),
+                "gcs_url": f"gs://bench/recordings/recording_{i}.mp4",
+                "participants": [{"name": name} for name in names],
+                "media": {"size_bytes": rng.randint(10, 5000) * 1024 * 1024},
+            }
+            metadata.update(catalog_fields(metadata))
+            batch.append(metadata)
+        collection.insert_many(batch, ordered=False)
+
+def explain(catalog, **filters):
+    query = catalog.build_query(**filters)
+    plan = (catalog.collection.find(query).sort([("start_time_utc", -1), ("_id", -1)]).limit(51)
+            .explain()["executionStats"])
+    return _index_names(plan["executionStages"]), plan["totalKeysExamined"], plan["totalDocsExamined"]
+
+def _index_names(stage):
+    names = {stage["indexName"]} if "indexName" in stage else set()
+    for child in stage.get("inputStages", []) + ([stage["inputStage"]] if "inputStage" in stage else []):
+        names |= _index_names(child)
+    return ",".join(sorted(names)) or "COLLSCAN"
+
+def timed_page(catalog, pages, **filters):
+    """
+    Follows `pages` cursors, then times one more page. Returns (ms, cursor used).
+    """
+    cursor = None
+    for _ in range(pages):
+        cursor = catalog.search(cursor=cursor, limit=50, **filters)["next_cursor"]
+        if not cursor:
+            break
+    started = time.perf_counter()
+    catalog.search(cursor=cursor, limit=50, **filters)
+    return (time.perf_counter() - started) * 1000, cursor
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    collection = client["meetbot_bench"]["recordings"]
+    collection.drop()
+    try:
+        started = time.perf_counter()
+        seed(collection, count)
+        print(f"Seeded {count} recordings in {time.perf_counter() - started:.1f}s.")
+        # store_metadata's writer creates this one in a real deployment.
+        collection.create_index("recording_id", unique=True)
+        catalog = RecordingCatalog(collection)
+        catalog.ensure_indexes()
+
+        queries = {
+            "participant": {"participant": PEOPLE[7]},
+            "meeting": {"meeting": MEETINGS[3]},
+            "time range": {"since": datetime(2024, 3, 1), "until": datetime(2024, 6, 1)},
+        }
+        print(f"{'query':<12} {'page':>5} {'ms':>8} {'keys':>6} {'docs':>6}  index")
+        for label, filters in queries.items():
+            for pages in (0, 20):
+                ms, cursor = timed_page(catalog, pages, **filters)
+                index, keys, docs = explain(catalog, cursor=cursor, **filters)
+                print(f"{label:<12} {pages + 1:>5} {ms:>8.2f} {keys:>6} {docs:>6}  {index}")
+
+        ids = [f"bench-{random.randrange(count)}" for _ in range(200)]
+        for label in ("cold", "cached"):
+            started = time.perf_counter()
+            for recording_id in ids:
+                catalog.get(recording_id)
+            print(f"get() {label}: {(time.perf_counter() - started) * 1000 / len(ids):.3f} ms each")
+    finally:
+        collection.drop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures time-to-join with browser_handler.join_meet() on the local lobby
+fixture, step by step. The join flow used to spend about 14 s in fixed sleeps
+(10 s after navigation, 2 s after the pop-up, 2 s after muting) before it
+even looked for the join button.
+
+Usage (from the project root, with chromedriver available):
+    python benchmarks/bench_join.py [runs]
+"""
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from browser_handler import initialize_driver, join_meet
+from readiness import wait_for_admission
+
+FIXTURE = pathlib.Path(__file__).resolve().parent.parent / "fixtures" / "meet_call.html"
+LEGACY_FIXED_SLEEPS = 14.0
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    driver = initialize_driver(user_data_dir=tempfile.mkdtemp(prefix="bench_join_profile_"),
+                               headless=os.environ.get("CHROME_HEADLESS", "1") == "1")
+    if not driver:
+        sys.exit(1)
+
+    totals = []
+    steps = {}
+    try:
+        for _ in range(runs):
+            timings = {}
+            started = time.perf_counter()
+            if not join_meet(driver, f"{FIXTURE.as_uri()}?lobby=1&notNow=1&admitDelay=500", timings=timings):
+                sys.exit("❌ join_meet failed on the fixture.")
+            join_state = driver.execute_script("return meetFixture.joinState")
+            if join_state != {"mic": "true", "cam": "true"}:
+                sys.exit(f"❌ Mic/camera were not both off when joining: {join_state}")
+            if wait_for_admission(driver, timeout=10) != "admitted":
+                sys.exit("❌ The fixture did not admit the bot.")
+            totals.append(time.perf_counter() - started)
+            for step, seconds in timings.items():
+                steps.setdefault(step, []).append(seconds)
+    finally:
+        driver.quit()
+
+    print(f"\n📊 Time to join over {runs} runs (fixture: 800 ms lobby render, 500 ms admission)")
+    for step, values in steps.items():
+        print(f"   {step:<15} median {statistics.median(values):.2f}s")
+    print(f"   {'join + admit':<15} median {statistics.median(totals):.2f}s "
+          f"(the old flow slept {LEGACY_FIXED_SLEEPS:.0f}s before clicking join)")
+
+if __name__ == "__main__":
+    main()
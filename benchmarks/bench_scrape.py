@@ -0,0 +1,55 @@
+"""
+Compares browser_handler.get_participant_names() with the single-round-trip
+participant_scraper.scrape_participants() on the local Meet fixture.
+
+Usage (from the project root, with chromedriver available):
+    python benchmarks/bench_scrape.py [10 100 500]
+"""
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from browser_handler import initialize_driver, get_participant_names
+from participant_scraper import scrape_participants
+
+FIXTURE = pathlib.Path(__file__).resolve().parent.parent / "fixtures" / "meet_call.html"
+
+def time_call(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 500]
+    profile_dir = tempfile.mkdtemp(prefix="bench_scrape_profile_")
+    driver = initialize_driver(user_data_dir=profile_dir, headless=os.environ.get("CHROME_HEADLESS", "1") == "1")
+    if not driver:
+        sys.exit(1)
+
+    rows = []
+    try:
+        for size in sizes:
+            url = f"{FIXTURE.as_uri()}?participants={size}"
+
+            driver.get(url)
+            legacy_seconds, legacy = time_call(get_participant_names, driver)
+
+            driver.get(url)
+            fast_seconds, fast = time_call(scrape_participants, driver)
+
+            rows.append((size, legacy_seconds, len(legacy), fast_seconds, len(fast)))
+    finally:
+        driver.quit()
+
+    print("\n📊 Participant scraping benchmark")
+    print(f"{'participants':>12} {'legacy (s)':>11} {'found':>6} {'batched (s)':>12} {'found':>6} {'speed-up':>9}")
+    for size, legacy_seconds, legacy_found, fast_seconds, fast_found in rows:
+        print(f"{size:>12} {legacy_seconds:>11.2f} {legacy_found:>6} {fast_seconds:>12.2f} "
+              f"{fast_found:>6} {legacy_seconds / fast_seconds:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
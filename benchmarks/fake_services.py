@@ -0,0 +1,283 @@
+"""
+Local stand-ins for the services a bot talks to, for the load-test harness:
+
+- MeetFixtureServer serves fixtures/ over HTTP, so many browsers can load the
+  mock Meet page the way they would load a real one.
+- FakeGCSServer speaks enough of the GCS JSON API (simple, multipart and
+  resumable uploads, object metadata, compose, delete) for gcp_handler via
+  STORAGE_EMULATOR_HOST. Objects are kept in memory.
+- FakeCollection is an in-memory collection with the pymongo calls the
+  MetadataWriter uses. start_fake_mongo() serves one instance to every bot
+  process through a multiprocessing manager.
+"""
+import base64
+import hashlib
+import json
+import pathlib
+import threading
+import uuid
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.managers import BaseManager
+from urllib.parse import urlparse, parse_qs, unquote
+
+import google_crc32c
+
+FIXTURES_DIR = pathlib.Path(__file__).resolve().parent.parent / "fixtures"
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class _QuietFixtureHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+class MeetFixtureServer:
+    """
+    Serves the fixture pages on 127.0.0.1 at `url`.
+    """
+    def __init__(self, directory=FIXTURES_DIR):
+        handler = partial(_QuietFixtureHandler, directory=str(directory))
+        self.server = _serve(ThreadingHTTPServer(("127.0.0.1", 0), handler))
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def close(self):
+        self.server.shutdown()
+
+# --- GCS ---
+
+def _object_resource(bucket, name, data, generation):
+    return {
+        "kind": "storage#object",
+        "bucket": bucket,
+        "name": name,
+        "id": f"{bucket}/{name}/{generation}",
+        "generation": str(generation),
+        "size": str(len(data)),
+        "crc32c": base64.b64encode(google_crc32c.Checksum(data).digest()).decode("ascii"),
+        "md5Hash": base64.b64encode(hashlib.md5(data).digest()).decode("ascii"),
+    }
+
+class _GCSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._reply(404, {"error": {"code": 404, "message": "Not Found"}})
+
+    def _put_object(self, bucket, name, data):
+        with self.server.lock:
+            self.server.generation += 1
+            resource = _object_resource(bucket, name, data, self.server.generation)
+            self.store[(bucket, name)] = (data, resource)
+        return resource
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [unquote(p) for p in parsed.path.split("/") if p]
+        return parts, {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+    def do_GET(self):
+        parts, query = self._route()
+        # /storage/v1/b/<bucket>/o/<name>
+        if parts[:2] == ["storage", "v1"] and len(parts) == 6 and parts[4] == "o":
+            entry = self.store.get((parts[3], parts[5]))
+            if not entry:
+                return self._not_found()
+            if query.get("alt") == "media":
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(entry[0])))
+                self.end_headers()
+                self.wfile.write(entry[0])
+                return
+            return self._reply(200, entry[1])
+        self._not_found()
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) == 6 and self.store.pop((parts[3], parts[5]), None):
+            return self._reply(204)
+        self._not_found()
+
+    def do_POST(self):
+        parts, query = self._route()
+        body = self._body()
+        # /upload/storage/v1/b/<bucket>/o?uploadType=...
+        if parts[:1] == ["upload"]:
+            bucket = parts[4]
+            upload_type = query.get("uploadType")
+            if upload_type == "media":
+                return self._reply(200, self._put_object(bucket, query["name"], body))
+            if upload_type == "multipart":
+                boundary = self.headers.get_param("boundary")
+                sections = body.split(b"--" + boundary.encode())[1:-1]
+                metadata = json.loads(sections[0].split(b"\r\n\r\n", 1)[1].strip())
+                data = sections[1].split(b"\r\n\r\n", 1)[1][:-2]
+                return self._reply(200, self._put_object(bucket, metadata["name"], data))
+            if upload_type == "resumable":
+                metadata = json.loads(body or b"{}")
+                upload_id = uuid.uuid4().hex
+                self.server.uploads[upload_id] = (bucket, metadata.get("name") or query.get("name"), bytearray())
+                host = self.headers.get("Host")
+                location = f"http://{host}/upload/storage/v1/b/{bucket}/o?uploadType=resumable&upload_id={upload_id}"
+                return self._reply(200, {}, {"Location": location})
+        # /storage/v1/b/<bucket>/o/<destination>/compose
+        if parts[-1:] == ["compose"]:
+            bucket, destination = parts[3], parts[5]
+            sources = json.loads(body)["sourceObjects"]
+            try:
+                data = b"".join(self.store[(bucket, source["name"])][0] for source in sources)
+            except KeyError:
+                return self._not_found()
+            return self._reply(200, self._put_object(bucket, destination, data))
+        self._not_found()
+
+    def do_PUT(self):
+        _, query = self._route()
+        upload = self.server.uploads.get(query.get("upload_id"))
+        if not upload:
+            return self._not_found()
+        bucket, name, buffer = upload
+        buffer.extend(self._body())
+        # Content-Range: bytes <first>-<last>/<total or *>
+        total = (self.headers.get("Content-Range") or "").rpartition("/")[2]
+        if total not in ("*", "") and len(buffer) >= int(total):
+            del self.server.uploads[query["upload_id"]]
+            return self._reply(200, self._put_object(bucket, name, bytes(buffer)))
+        headers = {"Range": f"bytes=0-{len(buffer) - 1}"} if buffer else {}
+        self._reply(308, None, headers)
+
+class FakeGCSServer:
+    """
+    In-memory GCS JSON API endpoint. Point STORAGE_EMULATOR_HOST at `url`.
+    """
+    def __init__(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _GCSHandler)
+        server.store = {}
+        server.uploads = {}
+        server.generation = 0
+        server.lock = threading.Lock()
+        self.server = _serve(server)
+        self.url = f"http://127.0.0.1:{server.server_port}"
+
+    def object_count(self):
+        return len(self.server.store)
+
+    def stored_bytes(self):
+        return sum(len(data) for data, _ in self.server.store.values())
+
+    def close(self):
+        self.server.shutdown()
+
+# --- MongoDB ---
+
+def _matches(document, query):
+    for key, expected in query.items():
+        value = document
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(expected, dict) and "$ne" in expected:
+            if value == expected["$ne"]:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+class FakeCollection:
+    """
+    Just enough of a pymongo collection for MetadataWriter and store_metadata:
+    equality filters, $set / $setOnInsert / $addToSet updates and upserts.
+    """
+    def __init__(self):
+        self.documents = []
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def create_index(self, keys, **kwargs):
+        return "fake_index"
+
+    def _update(self, query, update, upsert):
+        matched = next((doc for doc in self.documents if _matches(doc, query)), None)
+        if matched is None:
+            if not upsert:
+                return
+            matched = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            self.documents.append(matched)
+            matched.update(update.get("$setOnInsert", {}))
+        matched.update(update.get("$set", {}))
+        for key, value in update.get("$addToSet", {}).items():
+            values = matched.setdefault(key, [])
+            if value not in values:
+                values.append(value)
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            self.writes += 1
+            self._update(query, update, upsert)
+
+    def bulk_write(self, operations, ordered=True):
+        with self._lock:
+            self.writes += 1
+            for operation in operations:
+                self._update(operation._filter, operation._doc, operation._upsert)
+
+    def find_one(self, query=None, projection=None):
+        with self._lock:
+            return next((dict(doc) for doc in self.documents if _matches(doc, query or {})), None)
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for doc in self.documents if _matches(doc, query))
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self.documents), "writes": self.writes}
+
+_shared_collection = None
+
+def _get_shared_collection():
+    global _shared_collection
+    if _shared_collection is None:
+        _shared_collection = FakeCollection()
+    return _shared_collection
+
+class FakeMongoManager(BaseManager):
+    pass
+
+FakeMongoManager.register("collection", callable=_get_shared_collection)
+
+def start_fake_mongo():
+    """
+    Starts the shared FakeCollection in a manager process. Returns the manager;
+    bots connect with connect_fake_mongo(manager.address, manager authkey).
+    """
+    manager = FakeMongoManager(address=("127.0.0.1", 0), authkey=b"meetbot-loadtest")
+    manager.start()
+    return manager
+
+def connect_fake_mongo(address):
+    manager = FakeMongoManager(address=tuple(address), authkey=b"meetbot-loadtest")
+    manager.connect()
+    return manager.collection()
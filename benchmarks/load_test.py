@@ -0,0 +1,334 @@
+"""
+Load test: how many concurrent bots can one host sustain?
+
+Serves the mock Meet page (fixtures/meet_call.html: lobby, admission delay,
+N participants with churn, end of call) over HTTP, plus a fake GCS endpoint
+and a shared fake MongoDB collection. Then runs batches of bots at
+increasing concurrency, each in its own process, through the real code
+paths: initialize_driver -> join_meet -> wait_for_admission ->
+get_participant_names -> MeetingMonitor -> upload_to_gcs -> store_metadata.
+
+Reports p50/p95 per stage, CPU and peak RSS per bot (its Python process,
+chromedriver and Chrome) and the concurrency at which throughput stops
+scaling. The churn is seeded and every service is local, so runs are
+repeatable in CI; pass --json to keep the report.
+
+Usage (from the project root, with Chrome and chromedriver available):
+    python benchmarks/load_test.py --levels 1,2,4,8 --call-seconds 20 --json load_report.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+from fake_services import FakeGCSServer, MeetFixtureServer, connect_fake_mongo, start_fake_mongo
+from system_resources import process_tree_cpu_seconds, process_tree_rss_mb
+
+STAGES = ["launch", "join", "admission", "scrape", "end_detect", "upload", "metadata"]
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers, or None if it is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class ResourceSampler:
+    """
+    Samples the RSS of this process tree (bot, chromedriver, Chrome) in the background.
+    """
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = process_tree_rss_mb(os.getpid())
+            if rss is not None:
+                self.samples.append(rss)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def run_bot(bot_id, meeting_url, options, mongo_address):
+    """
+    One simulated bot, run in its own process. Returns its stage timings and
+    resource use.
+    """
+    # Imported here so every bot process sets up its own Selenium/GCS/Mongo clients.
+    import db_handler
+    from browser_handler import initialize_driver, join_meet, get_participant_names
+    from gcp_handler import upload_to_gcs
+    from meeting_monitor import MeetingMonitor
+    from readiness import wait_for_admission
+
+    work_dir = tempfile.mkdtemp(prefix=f"loadtest_bot{bot_id}_")
+    # Point the process-wide metadata writer at the shared fake collection.
+    db_handler._writer = db_handler.MetadataWriter(collection=connect_fake_mongo(mongo_address),
+                                                   journal_path=os.path.join(work_dir, "metadata.jsonl"))
+
+    result = {"bot_id": bot_id, "ok": False, "error": None, "stages": {}}
+    stages = result["stages"]
+    sampler = ResourceSampler().start()
+    started = time.perf_counter()
+    driver = None
+    output = open(os.devnull, "w") if not options["verbose"] else contextlib.nullcontext(sys.stdout)
+    try:
+        with output as out, contextlib.redirect_stdout(out):
+            t = time.perf_counter()
+            driver = initialize_driver(user_data_dir=os.path.join(work_dir, "profile"), headless=True)
+            if not driver:
+                raise RuntimeError("Chrome did not start")
+            stages["launch"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            if not join_meet(driver, meeting_url):
+                raise RuntimeError("join_meet failed")
+            stages["join"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            if wait_for_admission(driver, timeout=60) != "admitted":
+                raise RuntimeError("not admitted")
+            stages["admission"] = time.perf_counter() - t
+
+            scrapes = []
+            for _ in range(options["scrapes"]):
+                t = time.perf_counter()
+                participants = get_participant_names(driver)
+                # Failures come back as a single {"id": "error"} entry naming the problem.
+                errors = [p["name"] for p in participants if p.get("id") == "error"]
+                if errors or not participants:
+                    raise RuntimeError(f"get_participant_names failed: {', '.join(errors) or 'found nobody'}")
+                scrapes.append(time.perf_counter() - t)
+                time.sleep(options["scrape_interval"])
+            stages["scrape"] = scrapes
+
+            end_event = MeetingMonitor(driver, poll_timeout=5).wait_for_end()
+            ended_at = driver.execute_script("return meetFixture.endedAt")
+            if end_event["type"] != "call_ended" or not ended_at:
+                raise RuntimeError(f"unexpected end of call: {end_event}")
+            stages["end_detect"] = max(0.0, time.time() - ended_at / 1000)
+            result["cpu_seconds"] = process_tree_cpu_seconds(os.getpid())
+
+            driver.quit()
+            driver = None
+
+            recording = os.path.join(work_dir, f"recording_{bot_id}.mp4")
+            with open(recording, "wb") as f:
+                f.write(random.Random(bot_id).randbytes(options["upload_mb"] * 1024 * 1024))
+            t = time.perf_counter()
+            gcs_url = upload_to_gcs(recording, f"loadtest/{options['run_id']}/{bot_id}.mp4")
+            if not gcs_url:
+                raise RuntimeError("upload failed")
+            stages["upload"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            if not db_handler.store_metadata(partner_id="Participant 1", meeting_id=meeting_url,
+                                             start_time=datetime.utcnow(), end_time=datetime.utcnow(),
+                                             gcs_url=gcs_url, recording_id=f"{options['run_id']}-{bot_id}"):
+                raise RuntimeError("store_metadata failed")
+            stages["metadata"] = time.perf_counter() - t
+            result["ok"] = True
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if driver:
+            driver.quit()
+        sampler.stop()
+
+    result["wall_seconds"] = time.perf_counter() - started
+    result.setdefault("cpu_seconds", process_tree_cpu_seconds(os.getpid()))
+    result["rss_peak_mb"] = max(sampler.samples, default=None)
+    result["rss_mean_mb"] = sum(sampler.samples) / len(sampler.samples) if sampler.samples else None
+    return result
+
+def meeting_url(fixture_url, index, options):
+    return (f"{fixture_url}/meet_call.html?lobby=1&notNow=1&loadDelay={options['load_delay_ms']}"
+            f"&admitDelay={options['admit_delay_ms']}&participants={options['participants']}"
+            f"&churn={options['churn_ms']}&endAfter={options['call_seconds'] * 1000}&seed={index + 1}")
+
+def run_level(level, options, fixture_url, mongo_address):
+    """
+    Runs `level` bots at once and summarizes them.
+    """
+    print(f"▶️  {level} concurrent bot(s)...")
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=level, mp_context=context) as pool:
+        futures = [pool.submit(run_bot, i, meeting_url(fixture_url, i, options), options, mongo_address)
+                   for i in range(level)]
+        bots = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    ok = [bot for bot in bots if bot["ok"]]
+    stages = {}
+    for stage in STAGES:
+        values = []
+        for bot in ok:
+            value = bot["stages"].get(stage)
+            values.extend(value if isinstance(value, list) else [value] if value is not None else [])
+        stages[stage] = {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+    cpu_percent = [100 * bot["cpu_seconds"] / bot["wall_seconds"] for bot in bots if bot["wall_seconds"]]
+    rss_peaks = [bot["rss_peak_mb"] for bot in bots if bot["rss_peak_mb"] is not None]
+    return {
+        "level": level,
+        "bots": level,
+        "succeeded": len(ok),
+        "errors": sorted({bot["error"] for bot in bots if bot["error"]}),
+        "wall_seconds": round(wall, 2),
+        # Completed meetings per minute across the whole batch.
+        "throughput_per_minute": round(len(ok) / wall * 60, 2) if wall else 0.0,
+        "stages": stages,
+        "cpu_percent_per_bot": round(sum(cpu_percent) / len(cpu_percent), 1) if cpu_percent else None,
+        "rss_peak_mb_per_bot": round(sum(rss_peaks) / len(rss_peaks), 1) if rss_peaks else None,
+        "rss_peak_mb_max": round(max(rss_peaks), 1) if rss_peaks else None,
+    }
+
+def saturation_reason(summary, previous, baseline, min_gain):
+    """
+    Returns why this level counts as saturated, or None if it still scales.
+    """
+    if summary["succeeded"] < summary["bots"]:
+        return f"{summary['bots'] - summary['succeeded']} bot(s) failed"
+    if previous:
+        expected = previous["throughput_per_minute"] * (1 + min_gain)
+        if summary["throughput_per_minute"] < expected:
+            return (f"throughput grew less than {min_gain:.0%} "
+                    f"({previous['throughput_per_minute']} -> {summary['throughput_per_minute']}/min)")
+    base_join = baseline["stages"]["join"]["p95"] if baseline else None
+    join = summary["stages"]["join"]["p95"]
+    if base_join and join and join > 2 * base_join:
+        return f"p95 join latency doubled ({base_join:.2f}s -> {join:.2f}s)"
+    return None
+
+def print_summary(summary):
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}"
+    print(f"   {summary['succeeded']}/{summary['bots']} ok in {summary['wall_seconds']}s, "
+          f"{summary['throughput_per_minute']} meetings/min, "
+          f"CPU {summary['cpu_percent_per_bot']}%/bot, peak RSS {summary['rss_peak_mb_per_bot']} MB/bot")
+    for stage, values in summary["stages"].items():
+        print(f"     {stage:<11} p50 {fmt(values['p50'])}s  p95 {fmt(values['p95'])}s")
+    for error in summary["errors"]:
+        print(f"     ❌ {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--call-seconds", type=int, default=20, help="length of each mock call")
+    parser.add_argument("--participants", type=int, default=10)
+    parser.add_argument("--churn-ms", type=int, default=2000, help="0 disables participant churn")
+    parser.add_argument("--scrapes", type=int, default=3, help="participant scrapes per bot")
+    parser.add_argument("--scrape-interval", type=float, default=1.0)
+    parser.add_argument("--load-delay-ms", type=int, default=800, help="lobby render time")
+    parser.add_argument("--admit-delay-ms", type=int, default=1000, help="host admission delay")
+    parser.add_argument("--upload-mb", type=int, default=8, help="size of each bot's fake recording")
+    parser.add_argument("--min-gain", type=float, default=0.10,
+                        help="throughput growth below this fraction counts as saturated")
+    parser.add_argument("--all-levels", action="store_true", help="keep going after saturation")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the bots' own output")
+    args = parser.parse_args()
+
+    options = {
+        "run_id": uuid.uuid4().hex[:8],
+        "call_seconds": args.call_seconds,
+        "participants": args.participants,
+        "churn_ms": args.churn_ms,
+        "scrapes": args.scrapes,
+        "scrape_interval": args.scrape_interval,
+        "load_delay_ms": args.load_delay_ms,
+        "admit_delay_ms": args.admit_delay_ms,
+        "upload_mb": args.upload_mb,
+        "verbose": args.verbose,
+    }
+    levels = [int(level) for level in args.levels.split(",")]
+
+    fixtures = MeetFixtureServer()
+    gcs = FakeGCSServer()
+    mongo = start_fake_mongo()
+    # Inherited by the spawned bot processes.
+    os.environ["STORAGE_EMULATOR_HOST"] = gcs.url
+    os.environ["GCP_BUCKET_NAME"] = "loadtest"
+    os.environ["TELEMETRY_LOG"] = os.path.join(tempfile.gettempdir(), f"loadtest_{options['run_id']}.jsonl")
+    # Keep the bots' selector hits and misses out of the production selector_stats.json.
+    os.environ["SELECTOR_STATS"] = os.path.join(tempfile.gettempdir(),
+                                                f"loadtest_{options['run_id']}_selector_stats.json")
+    print(f"🧪 Mock Meet at {fixtures.url}, fake GCS at {gcs.url}, fake MongoDB at {mongo.address}")
+
+    summaries = []
+    saturation = None
+    try:
+        for level in levels:
+            summary = run_level(level, options, fixtures.url, mongo.address)
+            print_summary(summary)
+            reason = saturation_reason(summary, summaries[-1] if summaries else None,
+                                       summaries[0] if summaries else None, args.min_gain)
+            summary["saturated"] = reason
+            summaries.append(summary)
+            if reason and saturation is None:
+                saturation = {"level": level, "reason": reason,
+                              "last_scaling_level": summaries[-2]["level"] if len(summaries) > 1 else None}
+                if not args.all_levels:
+                    break
+        stored = {"gcs_objects": gcs.object_count(), "gcs_bytes": gcs.stored_bytes(),
+                  "metadata": mongo.collection().stats()}
+    finally:
+        fixtures.close()
+        gcs.close()
+        mongo.shutdown()
+
+    print("\n📊 Load test summary")
+    print(f"   {'bots':>5} {'ok':>4} {'meet/min':>9} {'join p95':>9} {'scrape p95':>11} {'CPU %/bot':>10} {'RSS MB/bot':>11}")
+    for summary in summaries:
+        join = summary["stages"]["join"]["p95"]
+        scrape = summary["stages"]["scrape"]["p95"]
+        print(f"   {summary['bots']:>5} {summary['succeeded']:>4} {summary['throughput_per_minute']:>9} "
+              f"{'-' if join is None else f'{join:.2f}s':>9} {'-' if scrape is None else f'{scrape:.2f}s':>11} "
+              f"{str(summary['cpu_percent_per_bot']):>10} {str(summary['rss_peak_mb_per_bot']):>11}")
+    if saturation:
+        print(f"   Saturates at {saturation['level']} concurrent bots: {saturation['reason']}."
+              + (f" Last level that scaled: {saturation['last_scaling_level']}."
+                 if saturation["last_scaling_level"] else ""))
+    else:
+        print(f"   Throughput still scaled at {levels[-1]} concurrent bots; try higher --levels.")
+    print(f"   Fake services stored {stored['gcs_objects']} objects ({stored['gcs_bytes'] / 1e6:.1f} MB) "
+          f"and {stored['metadata']['documents']} metadata records.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"options": options, "levels": summaries, "saturation": saturation, "stored": stored},
+                      f, indent=2)
+        print(f"   Report written to {args.json}")
+
+    # Saturation is reported either way, but a failed bot at any level fails the run.
+    failed = sum(summary["bots"] - summary["succeeded"] for summary in summaries)
+    if failed:
+        print(f"❌ {failed} bot(s) failed.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,29 +7,81 @@ from selenium.webdriver.support import expected_conditions as EC
 import time
 import os
 
-def initialize_driver():
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selector_registry import get_registry
+from readiness import StepTimer, wait_for_network_idle, wait_for_lobby_controls, prepare_and_join
+from long_meeting import LONG_MEETING_FLAGS
+
+DEFAULT_PROFILE_DIR = r'C:\BotChromeProfile'
+
+# Flags shared by drivers that launch their own Chrome and by the warm
+# sessions that driver_pool.py pre-launches.
+CHROME_FLAGS = [
+    '--profile-directory=Default',
+    "--use-fake-ui-for-media-stream",
+    # Lets audio_tap.py start its AudioContext without a user gesture.
+    "--autoplay-policy=no-user-gesture-required",
+    "--start-maximized",
+    "--disable-infobars",
+    "--disable-extensions",
+    "--disable-gpu",
+]
+
+def chrome_flags(window_size=None, long_meeting=False):
+    """
+    CHROME_FLAGS, with an explicit window size instead of --start-maximized.
+    A bare Xvfb display has no window manager to maximize into.
+    `long_meeting` adds the trimming flags from long_meeting.py.
+    """
+    flags = list(CHROME_FLAGS)
+    if long_meeting:
+        flags += LONG_MEETING_FLAGS
+    if not window_size:
+        return flags
+    width, height = window_size.split("x")
+    flags = [flag for flag in flags if flag != "--start-maximized"]
+    return flags + [f"--window-size={width},{height}", "--window-position=0,0"]
+
+def find_chromedriver():
+    """
+    Looks for chromedriver in the project root (Windows or Linux build).
+    """
+    for name in ("chromedriver.exe", "chromedriver"):
+        driver_path = os.path.join(os.getcwd(), name)
+        if os.path.exists(driver_path):
+            return driver_path
+    return None
+
+def initialize_driver(user_data_dir=DEFAULT_PROFILE_DIR, headless=False, debugger_address=None,
+                      env=None, window_size=None, long_meeting=False):
     """
     Launches Chrome using the dedicated 'BotChromeProfile'.
     This is the final, correct autonomous method.
+    If debugger_address is given, attaches to an already running (warm) Chrome
+    session from driver_pool.py instead of starting a new browser.
+    `env` and `window_size` place Chrome inside a media sandbox (its own display and audio sink).
+    `long_meeting` launches Chrome with the memory/CPU trimming flags for multi-hour meetings.
     """
-    print("🚀 Launching Chrome with the dedicated 'BotChromeProfile'...")
     chrome_options = Options()
-    chrome_options.add_argument(r'--user-data-dir=C:\BotChromeProfile')
-    chrome_options.add_argument('--profile-directory=Default')
-    chrome_options.add_argument("--use-fake-ui-for-media-stream")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-infobars")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if debugger_address:
+        print(f"🔌 Attaching to warm Chrome session at {debugger_address}...")
+        chrome_options.debugger_address = debugger_address
+    else:
+        print("🚀 Launching Chrome with the dedicated 'BotChromeProfile'...")
+        chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
+        for flag in chrome_flags(window_size, long_meeting):
+            chrome_options.add_argument(flag)
+        if headless:
+            chrome_options.add_argument("--headless=new")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
     
     try:
-        driver_path = os.path.join(os.getcwd(), "chromedriver.exe")
-        if not os.path.exists(driver_path):
+        driver_path = find_chromedriver()
+        if not driver_path:
             print(f"❌ FATAL ERROR: 'chromedriver.exe' not found.")
             return None
-        service = Service(executable_path=driver_path)
+        service = Service(executable_path=driver_path, env=env)
         driver = webdriver.Chrome(service=service, options=chrome_options)
         print("✅ WebDriver initialized successfully using the persistent bot profile.")
         return driver
@@ -37,61 +89,42 @@ def initialize_driver():
         print(f"❌ WebDriver initialization failed. Error: {e}")
         return None
 
-def join_meet(driver, meet_link):
+def join_meet(driver, meet_link, timings=None):
     """
     Navigates to the meet, handles pop-ups, and clicks the join button
     using the most modern and robust selectors.
+    Waits on the page's actual readiness instead of fixed sleeps. Per-step
+    timings (seconds) are stored in `timings` if a dictionary is passed.
     """
+    timer = StepTimer()
     print(f"🌐 Navigating to Google Meet: {meet_link}")
     driver.get(meet_link)
-    
-    print("... Allowing 10 seconds for the page to load all elements...")
-    time.sleep(10)
+    timer.mark("navigate")
 
     try:
-        # Step 1: Handle any notification pop-ups first.
-        try:
-            not_now_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Not now')]"))
-            )
-            print("🔔 Dismissing 'desktop notifications' pop-up...")
-            not_now_button.click()
-            time.sleep(2)
-        except Exception:
-            print("✅ No 'desktop notifications' pop-up found.")
+        # Step 1: Wait for the page to settle, then for the lobby controls to render.
+        if not wait_for_network_idle(driver):
+            print("... Page is still busy, continuing once the controls are there...")
+        timer.mark("page_ready")
 
-        # Step 2: Mute mic and camera using more robust selectors that check for multiple text variations.
-        print("... Searching for Mute and Camera buttons...")
-        all_buttons = driver.find_elements(By.CSS_SELECTOR, "button")
-        mic_muted = False
-        cam_off = False
-        for button in all_buttons:
-            label = button.get_attribute("aria-label")
-            if label:
-                if "microphone" in label.lower() and not mic_muted:
-                    try:
-                        button.click()
-                        print("🎤 Microphone muted.")
-                        mic_muted = True
-                    except:
-                        pass
-                if "camera" in label.lower() and not cam_off:
-                    try:
-                        button.click()
-                        print("📷 Camera turned off.")
-                        cam_off = True
-                    except:
-                        pass
-        
-        time.sleep(2)
+        if not wait_for_lobby_controls(driver):
+            raise TimeoutException("The join button did not appear.")
+        timer.mark("controls_ready")
 
-        # Step 3: Find and click the final join button.
-        join_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Join now') or contains(., 'Ask to join')]"))
-        )
-        print(f"✅ Found join button: '{join_button.text}'. Clicking it...")
-        join_button.click()
-        
+        # Step 2: Dismiss the notification pop-up, mute mic and camera and click join, in one script.
+        actions = prepare_and_join(driver)
+        timer.mark("join_clicked")
+        if actions["not_now"]:
+            print("🔔 Dismissed 'desktop notifications' pop-up.")
+        if actions["mic"]:
+            print("🎤 Microphone muted.")
+        if actions["camera"]:
+            print("📷 Camera turned off.")
+        print(f"✅ Clicked join button: '{actions['join']}'.")
+        print(f"⏱️  Join flow took {timer.total:.2f}s ({', '.join(f'{k} {v:.2f}s' for k, v in timer.timings.items())}).")
+
+        if timings is not None:
+            timings.update(timer.timings)
         return True
     except Exception as e:
         print(f"⚠️ Could not complete the joining process. The UI might have changed.")
@@ -100,6 +133,58 @@ def join_meet(driver, meet_link):
         traceback.print_exc()
         return False
 
+def _wait_for_any(driver, group, locators, condition, timeout=5):
+    """
+    Waits up to `timeout` seconds in total for the first of `locators` (all
+    tried, in order, on every poll) to satisfy `condition`, e.g.
+    EC.element_to_be_clickable. Records the hit, and a miss for every locator
+    tried before it, in the selector registry.
+    Returns (selector, element), or (None, None) if none matched in time.
+    """
+    registry = get_registry()
+    started = time.perf_counter()
+
+    def first_match(d):
+        for locator in locators:
+            try:
+                element = condition(locator)(d)
+            except WebDriverException:
+                continue
+            if element:
+                return locator[1], element
+        return False
+
+    try:
+        selector, element = WebDriverWait(driver, timeout, poll_frequency=0.1).until(first_match)
+    except TimeoutException:
+        for _, value in locators:
+            registry.record(group, value, False)
+        return None, None
+    for _, value in locators:
+        if value == selector:
+            registry.record(group, value, True, (time.perf_counter() - started) * 1000)
+            break
+        registry.record(group, value, False)
+    return selector, element
+
+def _wait_for_participant_list(driver, panel_selector, timeout=3, quiet=0.3):
+    """
+    Waits until the panel lists someone and the number of entries has not
+    changed for `quiet` seconds, instead of pausing a fixed amount.
+    """
+    scope = f"{panel_selector} " if panel_selector else ""
+    css = f"{scope}[data-participant-id], {scope}[role='listitem']"
+    deadline = time.monotonic() + timeout
+    count, changed_at = -1, time.monotonic()
+    while time.monotonic() < deadline:
+        current = len(driver.find_elements(By.CSS_SELECTOR, css))
+        if current != count:
+            count, changed_at = current, time.monotonic()
+        elif count and time.monotonic() - changed_at >= quiet:
+            return True
+        time.sleep(0.1)
+    return False
+
 # --- THIS IS THE FINAL get_participant_names FUNCTION ---
 def get_participant_names(driver):
     """
@@ -113,27 +198,16 @@ def get_participant_names(driver):
         print("   - Step 1: Looking for the 'Participants' button...")
         
         # Try multiple selectors for the participants button
-        participants_button = None
-        button_selectors = [
-            (By.XPATH, "//button[.//i[contains(text(), 'people')]]"),
-            (By.XPATH, "//button[@aria-label[contains(., 'participant')]]"),
-            (By.XPATH, "//button[@aria-label[contains(., 'People')]]"),
-            (By.XPATH, "//button[contains(@aria-label, 'Show everyone')]"),
-            (By.CSS_SELECTOR, "button[jsname='A5il2e']"),
-        ]
-        
-        for selector_type, selector_value in button_selectors:
-            try:
-                participants_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((selector_type, selector_value))
-                )
-                print(f"   - Found participants button using selector: {selector_value}")
-                break
-            except Exception as e:
-                print(f"   - Selector failed: {selector_value}")
-                continue
-        
+        # All of them are polled together against one 5 s deadline, best recent success first.
+        registry = get_registry()
+        button_selectors = [(By.XPATH, xpath) for xpath in registry.ordered("participants_button")]
+        selector_value, participants_button = _wait_for_any(driver, "participants_button", button_selectors,
+                                                            EC.element_to_be_clickable)
+        if participants_button:
+            print(f"   - Found participants button using selector: {selector_value}")
+
         if not participants_button:
+            registry.save()
             print("   - ❌ FATAL: Could not find the Participants button with any selector.")
             return [{"name": "participants_button_not_found", "id": "error"}]
         
@@ -144,24 +218,18 @@ def get_participant_names(driver):
         print("   - Step 2: Waiting for the participant panel to appear...")
         
         # Try multiple panel selectors
-        panel_visible = False
-        panel_selectors = ["div.R3Gmyc", "div[role='list']", "div.Sfe7Qb", "div.CKKJIf"]
-        
-        for panel_selector in panel_selectors:
-            try:
-                WebDriverWait(driver, 5).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, panel_selector))
-                )
-                print(f"   - Participant panel found with selector: {panel_selector}")
-                panel_visible = True
-                break
-            except:
-                continue
-        
-        if not panel_visible:
+        panel_selectors = [(By.CSS_SELECTOR, css) for css in registry.ordered("participants_panel")]
+        panel_selector, panel = _wait_for_any(driver, "participants_panel", panel_selectors,
+                                              EC.visibility_of_element_located)
+        registry.save()
+
+        if panel:
+            print(f"   - Participant panel found with selector: {panel_selector}")
+        else:
             print("   - ⚠️ Warning: Could not confirm panel visibility, continuing anyway...")
-        
-        time.sleep(3) # Extra pause for all names to render inside the panel.
+
+        # Wait for the names to finish rendering inside the panel.
+        _wait_for_participant_list(driver, panel_selector)
 
         # Step 3: Try to find participant names and IDs using multiple modern selectors.
         print("   - Step 3: Searching for participant names and IDs...")
@@ -204,13 +272,7 @@ def get_participant_names(driver):
         if not participants:
             print("   - Strategy 1 yielded no results. Trying Strategy 2...")
             
-            name_selectors = [
-                "div.zWGUib",
-                "div.Yx52jb",
-                "span[data-self-name]",
-                "div.GvcuGe",
-                "div.wnPUne"
-            ]
+            name_selectors = registry.ordered("participant_name")
             
             name_elements = []
             for name_selector in name_selectors:
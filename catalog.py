@@ -0,0 +1,339 @@
+import argparse
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from db_handler import get_metadata_collection
+from meeting_lease import meeting_key
+
+# Bumped whenever catalog_fields() changes, so backfill() knows which records to rewrite.
+CATALOG_VERSION = 1
+
+# Every index ends in (start_time_utc, _id) descending: the order search() pages in.
+# Equality fields come first, then the sort, so a query for one person or one
+# meeting over a time range is a single bounded index scan.
+CATALOG_INDEXES = {
+    "catalog_participant_time": [("participant_keys", ASCENDING), ("start_time_utc", DESCENDING), ("_id", DESCENDING)],
+    "catalog_meeting_time": [("meeting_code", ASCENDING), ("start_time_utc", DESCENDING), ("_id", DESCENDING)],
+    "catalog_time": [("start_time_utc", DESCENDING), ("_id", DESCENDING)],
+}
+
+# Returned by search() unless `fields` says otherwise. The participant timeline
+# can be large, so it is only returned when asked for.
+SUMMARY_FIELDS = ["recording_id", "meeting_id", "meeting_code", "start_time_utc", "end_time_utc",
+                  "duration_seconds", "size_bytes", "participant_names", "gcs_url", "proxy_gcs_url"]
+
+MAX_PAGE_SIZE = 500
+
+# What main.py stores as partner_id when nobody else was in the call.
+NO_PARTICIPANTS = "No other participants found"
+
+def participant_key(name):
+    """
+    Returns the form a participant name is indexed and matched under.
+    """
+    return " ".join(name.split()).casefold()
+
+def _participant_names(metadata):
+    names = [p.get("name") for p in metadata.get("participants") or []]
+    if not any(names):
+        # Older records (and the recovery path) only have the comma-joined partner_id.
+        partner_id = metadata.get("partner_id")
+        names = partner_id.split(", ") if partner_id and partner_id != NO_PARTICIPANTS else []
+    unique = {}
+    for name in names:
+        if name and name.strip():
+            unique.setdefault(participant_key(name), name.strip())
+    return [unique[key] for key in sorted(unique)]
+
+def catalog_fields(metadata):
+    """
+    Returns the normalized, indexable fields for a metadata record: one entry
+    per participant instead of the comma-joined partner_id, the meeting code,
+    and the duration, size and GCS URIs at the top level.
+    """
+    media = metadata.get("media") or {}
+    names = _participant_names(metadata)
+    duration = media.get("duration_seconds")
+    start, end = metadata.get("start_time_utc"), metadata.get("end_time_utc")
+    if duration is None and isinstance(start, datetime) and isinstance(end, datetime):
+        duration = (end - start).total_seconds()
+    fields = {
+        "catalog_version": CATALOG_VERSION,
+        "participant_names": names,
+        "participant_keys": [participant_key(name) for name in names],
+        "participant_count": len(names),
+        "duration_seconds": round(duration, 3) if duration is not None else None,
+        "size_bytes": media.get("size_bytes"),
+        "proxy_gcs_url": media.get("proxy_gcs_url"),
+    }
+    if metadata.get("meeting_id"):
+        fields["meeting_code"] = meeting_key(metadata["meeting_id"])
+    return fields
+
+def encode_cursor(document):
+    """
+    Returns an opaque cursor pointing just past `document` in search order.
+    """
+    position = {"t": document["start_time_utc"], "id": document["_id"]}
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode()).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return position["t"], position["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds, so a
+    record updated by another bot is never served stale for long.
+    """
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+class RecordingCatalog:
+    """
+    Read path over the recording metadata that store_metadata() writes.
+
+    search() pages through recordings newest first with keyset cursors on
+    (start_time_utc, _id). Every page is one bounded index scan, however deep
+    into millions of records it is. get() looks up single recordings through
+    an LRU cache. Pass `collection` to use any pymongo-compatible collection,
+    e.g. one on a local mongod.
+    """
+    def __init__(self, collection=None, cache_size=1024, cache_ttl=60):
+        self._collection = collection
+        self._indexes_ready = False
+        self.cache = LRUCache(cache_size, cache_ttl)
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_metadata_collection()
+            if self._collection is None:
+                raise RuntimeError("MongoDB environment variables not set")
+        return self._collection
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        for name, keys in CATALOG_INDEXES.items():
+            self.collection.create_index(keys, name=name)
+        self._indexes_ready = True
+
+    @staticmethod
+    def _projection(fields):
+        fields = SUMMARY_FIELDS if fields is None else fields
+        projection = {field: 1 for field in fields}
+        # The cursor is built from these.
+        projection.update({"_id": 1, "start_time_utc": 1})
+        return projection
+
+    def get(self, recording_id, fields=None):
+        """
+        Returns one recording's metadata (all of it, or just `fields`), or None.
+        """
+        key = (recording_id, tuple(fields) if fields else None)
+        document = self.cache.get(key)
+        if document is None:
+            projection = {field: 1 for field in fields} if fields else None
+            document = self.collection.find_one({"recording_id": recording_id}, projection)
+            if document is not None:
+                self.cache.put(key, document)
+        return dict(document) if document is not None else None
+
+    def build_query(self, participant=None, meeting=None, since=None, until=None, min_duration=None,
+                    cursor=None):
+        """
+        Returns the MongoDB filter search() runs.
+        """
+        time_range = {"$type": "date"}
+        if since:
+            time_range["$gte"] = since
+        if until:
+            time_range["$lt"] = until
+        query = {"start_time_utc": time_range}
+        if participant:
+            query["participant_keys"] = participant_key(participant)
+        if meeting:
+            # A bare code like 'abc-defg-hij' means a Meet link.
+            link = meeting if "/" in meeting or "." in meeting else f"meet.google.com/{meeting}"
+            query["meeting_code"] = meeting_key(link)
+        if min_duration is not None:
+            query["duration_seconds"] = {"$gte": min_duration}
+        if cursor:
+            last_time, last_id = decode_cursor(cursor)
+            # The bound on start_time_utc makes the index scan start at the cursor;
+            # $nor drops the records at that same instant already returned.
+            time_range["$lte"] = last_time
+            query["$nor"] = [{"start_time_utc": last_time, "_id": {"$gte": last_id}}]
+        return query
+
+    def search(self, participant=None, meeting=None, since=None, until=None, min_duration=None,
+               fields=None, limit=50, cursor=None):
+        """
+        Returns {'recordings': [...], 'next_cursor': ...}: up to `limit`
+        recordings, newest first, matching every filter given. `participant`
+        matches any one person in the call, case-insensitively. Pass
+        `next_cursor` back as `cursor` for the next page; it is None on the last page.
+        """
+        self.ensure_indexes()
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = self.build_query(participant, meeting, since, until, min_duration, cursor)
+        # One extra record tells whether there is another page without a count.
+        documents = list(self.collection.find(query, self._projection(fields))
+                         .sort([("start_time_utc", DESCENDING), ("_id", DESCENDING)])
+                         .limit(limit + 1))
+        next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        return {"recordings": documents[:limit], "next_cursor": next_cursor}
+
+    def iter_search(self, page_size=MAX_PAGE_SIZE, **filters):
+        """
+        Yields every recording matching `filters`, fetching one page at a time.
+        """
+        cursor = None
+        while True:
+            page = self.search(limit=page_size, cursor=cursor, **filters)
+            yield from page["recordings"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return
+
+    def backfill(self, batch_size=1000):
+        """
+        Adds the normalized catalog fields to records written before they
+        existed (or by an older CATALOG_VERSION), in _id order and in batches,
+        so it can be stopped and rerun at any point. Returns how many it updated.
+        """
+        self.ensure_indexes()
+        updated = 0
+        last_id = ObjectId("0" * 24)
+        stale = {"$or": [{"catalog_version": {"$exists": False}}, {"catalog_version": {"$lt": CATALOG_VERSION}}]}
+        while True:
+            batch = list(self.collection.find({"_id": {"$gt": last_id}, **stale},
+                                              {"participants.name": 1, "partner_id": 1, "meeting_id": 1,
+                                               "media": 1, "start_time_utc": 1, "end_time_utc": 1})
+                         .sort("_id", ASCENDING).limit(batch_size))
+            if not batch:
+                break
+            self.collection.bulk_write([UpdateOne({"_id": doc["_id"]}, {"$set": catalog_fields(doc)})
+                                        for doc in batch], ordered=False)
+            updated += len(batch)
+            last_id = batch[-1]["_id"]
+            print(f"🗂️  Backfilled {updated} recordings...")
+        self.cache.invalidate()
+        return updated
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """
+    Returns the process-wide RecordingCatalog, creating it on first use.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = RecordingCatalog()
+        return _catalog
+
+def _parse_time(value):
+    """
+    Accepts an ISO date/time or a relative age like '7d' or '12h' (ago).
+    """
+    units = {"d": "days", "h": "hours", "m": "minutes"}
+    if value[-1:] in units and value[:-1].isdigit():
+        return datetime.utcnow() - timedelta(**{units[value[-1]]: int(value[:-1])})
+    return datetime.fromisoformat(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the recording catalog.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="List recordings, newest first.")
+    search.add_argument("--participant", help="Name of anyone who was in the call.")
+    search.add_argument("--meeting", help="Meet link or code.")
+    search.add_argument("--since", type=_parse_time, help="ISO time or age, e.g. 2025-11-01 or 7d.")
+    search.add_argument("--until", type=_parse_time, help="ISO time or age.")
+    search.add_argument("--min-duration", type=float, help="Minimum duration in seconds.")
+    search.add_argument("--fields", help="Comma-separated fields to return.")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--cursor", help="next_cursor from the previous page.")
+
+    get = commands.add_parser("get", help="Show one recording.")
+    get.add_argument("recording_id")
+    get.add_argument("--fields", help="Comma-separated fields to return.")
+
+    commands.add_parser("backfill", help="Add catalog fields to existing records.")
+    args = parser.parse_args(argv)
+
+    catalog = get_catalog()
+    fields = args.fields.split(",") if getattr(args, "fields", None) else None
+    try:
+        return _run_command(catalog, args, fields)
+    except Exception as e:
+        print(f"❌ Catalog query failed. Error: {e}")
+        return 1
+
+def _run_command(catalog, args, fields):
+    if args.command == "search":
+        page = catalog.search(participant=args.participant, meeting=args.meeting, since=args.since,
+                              until=args.until, min_duration=args.min_duration, fields=fields,
+                              limit=args.limit, cursor=args.cursor)
+        for document in page["recordings"]:
+            print(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS))
+        if page["next_cursor"]:
+            print(f"\nMore results: --cursor {page['next_cursor']}")
+    elif args.command == "get":
+        document = catalog.get(args.recording_id, fields)
+        if document is None:
+            print(f"❌ No recording {args.recording_id}.")
+            return 1
+        print(json.dumps(json.loads(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS)),
+                         indent=2))
+    else:
+        print(f"✅ Backfilled {catalog.backfill()} recordings.")
+    return 0
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    raise SystemExit(main())
@@ -1,39 +1,294 @@
 # In db_handler.py
 
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from pymongo.errors import OperationFailure
+from bson import json_util
+import atexit
 import os
+import queue
+import threading
+import uuid
+import time
 from dotenv import load_dotenv
-# We no longer need datetime here as it's passed from main.py
+
+import telemetry
+from datetime import datetime
 
 load_dotenv()
 
-def store_metadata(partner_id, meeting_id, start_time, end_time, gcs_url):
+_client = None
+_client_lock = threading.Lock()
+
+def get_mongo_client():
     """
-    Connects to MongoDB and stores the detailed recording metadata.
+    Returns one MongoClient shared by the whole process (it is thread-safe and
+    pools its own connections), or None if MONGO_URI is not set.
     """
-    try:
-        mongo_uri = os.environ.get("MONGO_URI")
-        db_name = os.environ.get("DATABASE_NAME")
-        collection_name = os.environ.get("COLLECTION_NAME")
+    global _client
+    with _client_lock:
+        if _client is None:
+            mongo_uri = os.environ.get("MONGO_URI")
+            if not mongo_uri:
+                return None
+            _client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        return _client
+
+def get_metadata_collection():
+    client = get_mongo_client()
+    db_name = os.environ.get("DATABASE_NAME")
+    collection_name = os.environ.get("COLLECTION_NAME")
+    if not all([client, db_name, collection_name]):
+        return None
+    return client[db_name][collection_name]
+
+WRITE_SECONDS = telemetry.REGISTRY.histogram("meetbot_mongo_write_seconds", "Latency of metadata bulk writes.")
+SPILLED = telemetry.REGISTRY.counter("meetbot_metadata_spilled_total", "Metadata records spilled to the local journal.")
+
+class MetadataWriter:
+    """
+    Long-lived, batched writer for recording metadata.
+
+    Documents go into a bounded queue and a background thread flushes them with
+    one bulk_write of upserts keyed on recording_id, either when `batch_size`
+    documents are waiting (write() wakes it) or every `flush_interval` seconds. Upserts make
+    retries and journal replays idempotent.
+
+    If Mongo cannot be reached, the batch is appended to a local journal file
+    and replayed on the next successful flush. Pass `collection` to use any
+    pymongo-compatible collection (for example a local stand-in in tests).
+    """
+    def __init__(self, collection=None, batch_size=100, flush_interval=2.0, max_queue=10000,
+                 journal_path=None):
+        self._collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path or os.environ.get("METADATA_JOURNAL", "metadata_journal.jsonl")
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._indexes_ready = False
+        self._stop = threading.Event()
+        # Set by write() when a full batch is waiting, to flush before the interval is up.
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
 
-        if not all([mongo_uri, db_name, collection_name]):
-            print("❌ Error: MongoDB environment variables not set.")
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_metadata_collection()
+        return self._collection
+
+    def _ensure_indexes(self, collection):
+        if self._indexes_ready:
+            return
+        indexes = [
+            # Records written before recording_id existed have none; a plain unique
+            # index would count them all as null and fail to build.
+            ([("recording_id", ASCENDING)], {"unique": True,
+                                             "partialFilterExpression": {"recording_id": {"$exists": True}}}),
+            ([("meeting_id", ASCENDING)], {}),
+            ([("partner_id", ASCENDING)], {}),
+            ([("start_time_utc", ASCENDING)], {}),
+            ([("media.content_crc32c", ASCENDING), ("media.size_bytes", ASCENDING)], {}),
+        ]
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except OperationFailure as e:
+                # The server refused this index (e.g. a conflicting one exists); writes work without it.
+                print(f"⚠️ Could not create metadata index on {keys}. Error: {e}")
+        self._indexes_ready = True
+
+    def write(self, document):
+        """
+        Queues a metadata document. It must carry a recording_id.
+        Blocks if the queue is full, which applies back-pressure to producers.
+        """
+        self._queue.put(document)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.flush()
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _bulk_upsert(self, collection, documents):
+        operations = []
+        for doc in documents:
+            fields = dict(doc)
+            update = {"$set": fields}
+            # Followers may be adding themselves to attached_jobs at the same time
+            # (attach_to_recording), so merge into the array instead of replacing it.
+            attached_jobs = fields.pop("attached_jobs", None)
+            if attached_jobs:
+                update["$addToSet"] = {"attached_jobs": {"$each": attached_jobs}}
+            operations.append(UpdateOne({"recording_id": doc["recording_id"]}, update, upsert=True))
+        for i in range(0, len(operations), self.batch_size):
+            collection.bulk_write(operations[i:i + self.batch_size], ordered=False)
+
+    def _spill(self, documents):
+        SPILLED.inc(len(documents))
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for doc in documents:
+                f.write(json_util.dumps(doc) + "\n")
+
+    def _replay_journal(self, collection):
+        """
+        Claims the journal with an atomic rename so concurrent writers never
+        replay the same entries, then upserts them.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        claimed = f"{self.journal_path}.{uuid.uuid4().hex}.replaying"
+        try:
+            os.replace(self.journal_path, claimed)
+        except OSError:
             return
+        with open(claimed, encoding="utf-8") as f:
+            documents = [json_util.loads(line) for line in f if line.strip()]
+        try:
+            self._bulk_upsert(collection, documents)
+        except Exception:
+            self._spill(documents)
+            raise
+        finally:
+            os.remove(claimed)
+        print(f"📝 Replayed {len(documents)} metadata records from the local journal.")
 
-        client = MongoClient(mongo_uri)
-        db = client[db_name]
-        collection = db[collection_name]
-
-        # --- THIS IS THE NEW METADATA STRUCTURE ---
-        metadata = {
-            "partner_id": partner_id,
-            "meeting_id": meeting_id, # This is now the meet URL
-            "start_time_utc": start_time,
-            "end_time_utc": end_time,
-            "gcs_url": gcs_url,
-        }
-        
-        collection.insert_one(metadata)
+    def flush(self):
+        """
+        Writes everything queued so far. Returns True if it reached MongoDB,
+        False if the batch was spilled to the local journal.
+        """
+        with self._flush_lock:
+            batch = self._drain()
+            collection = self.collection
+            try:
+                if collection is None:
+                    raise RuntimeError("MongoDB environment variables not set")
+                self._ensure_indexes(collection)
+                # Older journaled records go first so they never overwrite newer ones.
+                self._replay_journal(collection)
+                if batch:
+                    started = time.perf_counter()
+                    self._bulk_upsert(collection, batch)
+                    WRITE_SECONDS.observe(time.perf_counter() - started)
+                return True
+            except Exception as e:
+                if batch:
+                    self._spill(batch)
+                    print(f"❌ Failed to store {len(batch)} metadata records in MongoDB, "
+                          f"saved to '{self.journal_path}' for replay. Error: {e}")
+                return False
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_metadata_writer():
+    """
+    Returns the process-wide MetadataWriter, creating it on first use.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = MetadataWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+def store_metadata(partner_id, meeting_id, start_time, end_time, gcs_url, participants=None,
+                   recording_id=None, media=None, attached_jobs=None, wait=True):
+    """
+    Stores the detailed recording metadata through the shared MetadataWriter.
+    `participants` is the optional join/leave timeline from ParticipantTimeline.to_list().
+    `media` holds the duration and sizes computed by postprocess.py.
+    `attached_jobs` are the jobs that found the meeting already being recorded.
+    The normalized fields the catalog queries on (catalog.catalog_fields()) are added here.
+    With wait=True the record is flushed before returning (a worker process may
+    exit right after); with wait=False it is batched with other writes.
+    """
+    # --- THIS IS THE NEW METADATA STRUCTURE ---
+    metadata = {
+        "recording_id": recording_id or str(uuid.uuid4()),
+        "partner_id": partner_id,
+        "meeting_id": meeting_id, # This is now the meet URL
+        "start_time_utc": start_time,
+        "end_time_utc": end_time,
+        "gcs_url": gcs_url,
+    }
+    if participants is not None:
+        metadata["participants"] = participants
+    if attached_jobs:
+        metadata["attached_jobs"] = attached_jobs
+    if media:
+        # The local proxy path means nothing outside this host.
+        metadata["media"] = {key: value for key, value in media.items() if key != "proxy_path"}
+    # Imported here because catalog.py builds on this module.
+    from catalog import catalog_fields
+    metadata.update(catalog_fields(metadata))
+
+    writer = get_metadata_writer()
+    writer.write(metadata)
+    if not wait:
+        return True
+    if writer.flush():
         print("📝 Detailed metadata successfully stored in MongoDB.")
+        return True
+    return False
+
+def find_recording_by_content(content_crc32c, size_bytes):
+    """
+    Returns the gs:// URI of a stored recording with exactly this content
+    (same CRC32C and size), or None. Used to skip re-uploading a recording
+    that is already in GCS.
+    """
+    collection = get_metadata_collection()
+    if collection is None or not content_crc32c:
+        return None
+    try:
+        existing = collection.find_one({"media.content_crc32c": content_crc32c, "media.size_bytes": size_bytes,
+                                        "gcs_url": {"$ne": None}}, {"gcs_url": 1})
+    except Exception as e:
+        print(f"⚠️ Could not look up stored recordings by content. Error: {e}")
+        return None
+    return existing["gcs_url"] if existing else None
+
+def attach_to_recording(recording_id, job_id, attached_at=None):
+    """
+    Records that another bot (`job_id`) arrived at a meeting that is already
+    being recorded as `recording_id`, on that recording's metadata record.
+    Only touches a record that already exists: until the leader stores its
+    metadata, attachments are kept on the meeting lease instead. Pass the
+    `attached_at` the lease was given so both copies of the entry are equal.
+    """
+    collection = get_metadata_collection()
+    if collection is None:
+        return False
+    try:
+        matched = collection.update_one(
+            {"recording_id": recording_id},
+            {"$addToSet": {"attached_jobs": {"job_id": job_id,
+                                             "attached_at": attached_at or datetime.utcnow()}}}).matched_count
     except Exception as e:
-        print(f"❌ Failed to store metadata in MongoDB. Error: {e}")
\ No newline at end of file
+        print(f"❌ Could not attach to recording {recording_id}. Error: {e}")
+        return False
+    if matched:
+        print(f"🔗 Attached to recording {recording_id} of the same meeting.")
+    return bool(matched)
@@ -0,0 +1,254 @@
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+from browser_handler import DEFAULT_PROFILE_DIR, chrome_flags
+from system_resources import process_tree_rss_mb
+
+CHROME_CANDIDATES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+]
+
+# Chrome refuses to start on a profile that still carries another instance's lock files.
+PROFILE_LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+
+def find_chrome_binary():
+    """
+    Returns the Chrome executable, preferring the CHROME_BINARY environment variable.
+    """
+    configured = os.environ.get("CHROME_BINARY")
+    if configured:
+        return configured
+    for candidate in CHROME_CANDIDATES:
+        path = shutil.which(candidate) or (candidate if os.path.exists(candidate) else None)
+        if path:
+            return path
+    return None
+
+def clone_profile(template_dir, destination):
+    """
+    Copies the template profile into a private directory for one session.
+    On Linux `cp --reflink=auto` makes this a copy-on-write clone on filesystems
+    that support it (btrfs, XFS), so cloning is near-instant and shares disk blocks.
+    """
+    if os.name == "posix" and shutil.which("cp"):
+        subprocess.run(["cp", "-a", "--reflink=auto", template_dir, destination], check=True)
+    else:
+        shutil.copytree(template_dir, destination, symlinks=True)
+
+    for root, _, files in os.walk(destination):
+        for name in files:
+            if name in PROFILE_LOCK_FILES:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+    # SingletonLock is a dangling symlink, which os.walk lists as a file only when it resolves.
+    for name in PROFILE_LOCK_FILES:
+        path = os.path.join(destination, name)
+        if os.path.islink(path):
+            os.remove(path)
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ChromeSession:
+    """
+    One pre-launched Chrome process with its own cloned profile and a
+    remote-debugging port that initialize_driver() can attach to.
+    """
+    def __init__(self, chrome_binary, profile_dir, headless=False, sandbox=None):
+        self.profile_dir = profile_dir
+        self.port = _free_port()
+        self.meetings_served = 0
+        # The media sandbox (display + audio sink) this browser lives in, if any.
+        self.sandbox = sandbox
+
+        args = [chrome_binary, f"--user-data-dir={profile_dir}",
+                f"--remote-debugging-port={self.port}", "--no-first-run",
+                "--no-default-browser-check"] + chrome_flags(sandbox.resolution if sandbox else None,
+                                                             os.environ.get("LONG_MEETING") == "1")
+        if headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        env=sandbox.env() if sandbox else None)
+
+    @property
+    def debugger_address(self):
+        return f"127.0.0.1:{self.port}"
+
+    def wait_until_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_healthy():
+                return True
+            time.sleep(0.2)
+        return False
+
+    def is_healthy(self):
+        """
+        The session is healthy if the process is alive and the DevTools endpoint answers.
+        """
+        if self.process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"http://{self.debugger_address}/json/version", timeout=1):
+                return True
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        return process_tree_rss_mb(self.process.pid)
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+class DriverPool:
+    """
+    Keeps N Chrome sessions warm so a job gets a browser in well under a second
+    instead of paying a cold Chrome start.
+    Every session runs on its own copy of the template profile, so bots never
+    share a user-data-dir. Sessions are recycled after `max_meetings` meetings or
+    once their process tree grows past `max_rss_mb`.
+    With a MediaSandboxPool, every session is started inside its own sandbox.
+    """
+    def __init__(self, size, template_profile=DEFAULT_PROFILE_DIR, headless=False,
+                 max_meetings=10, max_rss_mb=2048, work_dir=None, sandbox_pool=None):
+        self.size = size
+        self.template_profile = template_profile
+        self.headless = headless
+        self.max_meetings = max_meetings
+        self.max_rss_mb = max_rss_mb
+        self.sandbox_pool = sandbox_pool
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="meet_bot_profiles_")
+        self.chrome_binary = find_chrome_binary()
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+
+    def start(self):
+        """
+        Launches the pool's sessions. Returns the number that came up healthy.
+        """
+        if not self.chrome_binary:
+            print("❌ FATAL ERROR: Chrome executable not found. Set CHROME_BINARY.")
+            return 0
+        print(f"🔥 Warming {self.size} Chrome sessions...")
+        launched = [self._launch() for _ in range(self.size)]
+        ready = 0
+        for session in launched:
+            if session and session.wait_until_ready():
+                self._idle.put(session)
+                ready += 1
+            elif session:
+                self._discard(session)
+        print(f"✅ {ready}/{self.size} warm Chrome sessions ready.")
+        return ready
+
+    def _launch(self):
+        profile_dir = os.path.join(self.work_dir, f"profile_{_free_port()}_{time.monotonic_ns()}")
+        sandbox = None
+        try:
+            if self.sandbox_pool:
+                sandbox = self.sandbox_pool.acquire()
+            clone_profile(self.template_profile, profile_dir)
+            session = ChromeSession(self.chrome_binary, profile_dir, self.headless, sandbox)
+        except Exception as e:
+            print(f"❌ Could not launch a warm Chrome session. Error: {e}")
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            if sandbox:
+                self.sandbox_pool.release(sandbox)
+            return None
+        with self._lock:
+            self._all.add(session)
+        return session
+
+    def _discard(self, session):
+        with self._lock:
+            self._all.discard(session)
+        session.close()
+        if session.sandbox:
+            self.sandbox_pool.release(session.sandbox)
+
+    def _replace(self, session):
+        self._discard(session)
+        if self._closed:
+            return
+        fresh = self._launch()
+        if fresh and fresh.wait_until_ready():
+            self._idle.put(fresh)
+        elif fresh:
+            self._discard(fresh)
+
+    def acquire(self, timeout=None):
+        """
+        Hands out a healthy warm session, or None if none becomes available within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                session = self._idle.get(timeout=remaining) if remaining != 0 else self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if session.is_healthy():
+                return session
+            print(f"♻️  Warm session on port {session.port} failed its health check. Replacing it.")
+            threading.Thread(target=self._replace, args=(session,), daemon=True).start()
+
+    def release(self, session):
+        """
+        Returns a session after a meeting. Worn-out or unhealthy sessions are
+        recycled in the background so the pool stays at full size.
+        """
+        session.meetings_served += 1
+        rss = session.rss_mb()
+        reason = None
+        if not session.is_healthy():
+            reason = "failed health check"
+        elif session.meetings_served >= self.max_meetings:
+            reason = f"served {session.meetings_served} meetings"
+        elif rss is not None and rss > self.max_rss_mb:
+            reason = f"using {rss:.0f} MB"
+
+        if self._closed:
+            self._discard(session)
+        elif reason:
+            print(f"♻️  Recycling Chrome session on port {session.port} ({reason}).")
+            threading.Thread(target=self._replace, args=(session,), daemon=True).start()
+        else:
+            self._idle.put(session)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            sessions = list(self._all)
+            self._all.clear()
+        for session in sessions:
+            session.close()
+            if session.sandbox:
+                self.sandbox_pool.release(session.sandbox)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        print("✅ Warm Chrome pool shut down.")
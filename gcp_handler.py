@@ -1,27 +1,356 @@
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
+import base64
 import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
-def upload_to_gcs(local_file_path, destination_blob_name):
+import telemetry
+
+_client = None
+_client_lock = threading.Lock()
+
+# GCS compose accepts at most 32 sources per call.
+MAX_COMPOSE_SOURCES = 32
+
+# Files larger than this are uploaded as parallel parts by upload_to_gcs().
+PARALLEL_UPLOAD_THRESHOLD = 128 * 1024 * 1024
+
+def get_storage_client():
+    """
+    Returns one storage.Client shared by every upload in this process, so the
+    connection pool is reused instead of rebuilt per call.
+    When STORAGE_EMULATOR_HOST is set (e.g. a local fake-gcs-server), an
+    anonymous client is created so no credentials are needed.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.environ.get("STORAGE_EMULATOR_HOST"):
+                from google.auth.credentials import AnonymousCredentials
+                _client = storage.Client(project=os.environ.get("GCP_PROJECT", "local"),
+                                         credentials=AnonymousCredentials())
+            else:
+                _client = storage.Client()
+            # The default HTTP pool keeps only 10 connections, fewer than a busy
+            # parallel upload uses, so size it to match.
+            from requests.adapters import HTTPAdapter
+            pool_size = int(os.environ.get("GCS_CONNECTION_POOL_SIZE", "32"))
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _client._http.mount("https://", adapter)
+            _client._http.mount("http://", adapter)
+        return _client
+
+def get_bucket():
+    """
+    Returns the bucket named by GCP_BUCKET_NAME, or None if it is not configured.
+    """
+    bucket_name = os.environ.get("GCP_BUCKET_NAME")
+    if not bucket_name:
+        print("❌ Error: GCP_BUCKET_NAME environment variable not set.")
+        return None
+    return get_storage_client().bucket(bucket_name)
+
+UPLOAD_BYTES = telemetry.REGISTRY.counter("meetbot_upload_bytes_total", "Bytes uploaded to GCS.")
+UPLOAD_THROUGHPUT = telemetry.REGISTRY.histogram(
+    "meetbot_upload_throughput_bytes_per_second", "Throughput of finished GCS uploads.",
+    buckets=(1e6, 5e6, 10e6, 25e6, 50e6, 100e6, 250e6, 500e6))
+RETRIES = telemetry.REGISTRY.counter("meetbot_retries_total", "Retried operations by description.")
+
+class UploadCancelled(Exception):
+    """
+    Raised inside a part upload that was stopped because another part failed.
+    """
+
+def retry_with_backoff(func, attempts=6, base_delay=1.0, max_delay=30.0, description="operation",
+                       on_retry=None, cancelled=None):
+    """
+    Calls func() until it succeeds, sleeping with exponential backoff and jitter
+    between failures. Re-raises the last error once `attempts` are used up.
+    `on_retry` is called once for every retried failure. Setting the
+    `cancelled` event stops the retries, including one that is sleeping.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == attempts or (cancelled and cancelled.is_set()):
+                raise
+            if on_retry:
+                on_retry()
+            RETRIES.inc(operation=description.split(" of ")[0])
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            print(f"⚠️ {description} failed (attempt {attempt}/{attempts}), retrying in {delay:.1f}s. Error: {e}")
+            if cancelled:
+                if cancelled.wait(delay):
+                    raise
+            else:
+                time.sleep(delay)
+
+def file_crc32c(local_file_path, block_size=8 * 1024 * 1024):
+    """
+    Returns the CRC32C of a file, base64-encoded the way GCS reports it.
+    """
+    import google_crc32c
+    checksum = google_crc32c.Checksum()
+    with open(local_file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+class UploadStats:
+    """
+    Throughput and retry figures for one upload, for sizing egress.
+    """
+    def __init__(self, total_bytes, part_count):
+        self.total_bytes = total_bytes
+        self.part_count = part_count
+        self.retries = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    @property
+    def seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def bytes_per_second(self):
+        return self.total_bytes / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "bytes": self.total_bytes,
+            "parts": self.part_count,
+            "seconds": round(self.seconds, 3),
+            "bytes_per_second": round(self.bytes_per_second),
+            "retries": self.retries,
+        }
+
+class _FileRange:
+    """
+    Read-only view of bytes [offset, offset + length) of an open file that
+    starts at position 0, as the resumable upload client requires.
+    Reads raise UploadCancelled once the `cancelled` event is set, which
+    stops an upload in flight at its next chunk.
+    """
+    def __init__(self, f, offset, length, cancelled=None):
+        self._f = f
+        self._offset = offset
+        self._length = length
+        self._cancelled = cancelled
+        self._pos = 0
+        f.seek(offset)
+
+    def read(self, size=-1):
+        if self._cancelled and self._cancelled.is_set():
+            raise UploadCancelled("another part of the upload failed")
+        remaining = self._length - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self._f.read(size)
+        self._pos += len(data)
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self._pos
+        elif whence == 2:
+            pos += self._length
+        self._pos = max(0, min(pos, self._length))
+        self._f.seek(self._offset + self._pos)
+        return self._pos
+
+class ParallelUploader:
+    """
+    Uploads one large file as parts on a thread pool, composes them server-side
+    and verifies the result.
+
+    Every part is MD5-checked by the client as it is uploaded. Composite objects
+    only carry a CRC32C, so the final object is checked against a CRC32C of the
+    local file, computed alongside the uploads. Once one part has failed for
+    good, the parts still queued are cancelled and those in flight stop at
+    their next chunk.
+    """
+    def __init__(self, part_size=64 * 1024 * 1024, concurrency=8, bucket=None):
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.stats = None
+        self._cancelled = threading.Event()
+
+    def _upload_part(self, local_file_path, blob_name, offset, length):
+        blob = self.bucket.blob(blob_name)
+        # Stream in 8 MB resumable chunks so memory stays flat however large the part is.
+        blob.chunk_size = 8 * 1024 * 1024
+
+        def attempt():
+            with open(local_file_path, "rb") as f:
+                blob.upload_from_file(_FileRange(f, offset, length, self._cancelled), size=length,
+                                      checksum="md5", retry=None)
+
+        retry_with_backoff(attempt, description=f"Upload of {blob_name}", on_retry=self.stats.record_retry,
+                           cancelled=self._cancelled)
+        return blob
+
+    def _compose(self, blobs, destination_blob_name, intermediates):
+        """
+        Composes blobs in order into the destination, in rounds of up to 32
+        sources. Every intermediate is added to `intermediates` before it is
+        written, so the caller can clean up even after a failed round.
+        Returns the composed blob.
+        """
+        level = 0
+        while len(blobs) > MAX_COMPOSE_SOURCES:
+            grouped = []
+            for i in range(0, len(blobs), MAX_COMPOSE_SOURCES):
+                target = self.bucket.blob(f"{destination_blob_name}.parts/compose-{level}-{i // MAX_COMPOSE_SOURCES:06d}")
+                sources = blobs[i:i + MAX_COMPOSE_SOURCES]
+                intermediates.append(target)
+                retry_with_backoff(lambda: target.compose(sources), description="Compose of parts",
+                                   on_retry=self.stats.record_retry)
+                grouped.append(target)
+            blobs = grouped
+            level += 1
+
+        destination = self.bucket.blob(destination_blob_name)
+        retry_with_backoff(lambda: destination.compose(blobs), description="Final compose",
+                           on_retry=self.stats.record_retry)
+        return destination
+
+    def upload(self, local_file_path, destination_blob_name, expected_crc32c=None):
+        """
+        Uploads the file and returns the gs:// URI. Raises on failure or checksum mismatch.
+        Pass `expected_crc32c` if the file's CRC32C is already known.
+        """
+        if self.bucket is None:
+            self.bucket = get_bucket()
+            if self.bucket is None:
+                raise RuntimeError("GCP_BUCKET_NAME is not set")
+
+        size = os.path.getsize(local_file_path)
+        ranges = [(offset, min(self.part_size, size - offset)) for offset in range(0, size, self.part_size)] or [(0, 0)]
+        self.stats = UploadStats(size, len(ranges))
+        self._cancelled = threading.Event()
+
+        part_names = [f"{destination_blob_name}.parts/{index:06d}" for index in range(len(ranges))]
+        intermediates = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency + 1) as pool:
+                local_crc = pool.submit(lambda: expected_crc32c or file_crc32c(local_file_path))
+                futures = [
+                    pool.submit(self._upload_part, local_file_path, name, offset, length)
+                    for name, (offset, length) in zip(part_names, ranges)
+                ]
+                wait(futures, return_when=FIRST_EXCEPTION)
+                failed = next((future for future in futures if future.done() and future.exception()), None)
+                if failed:
+                    # Stop the other parts instead of letting them upload and retry for nothing.
+                    self._cancelled.set()
+                    for future in futures + [local_crc]:
+                        future.cancel()
+                    raise failed.exception()
+                parts = [future.result() for future in futures]
+                expected_crc = local_crc.result()
+
+            destination = self._compose(parts, destination_blob_name, intermediates)
+        finally:
+            # The pool has waited for every part by now. Parts and intermediates
+            # are removed whether or not the upload got through, so a failed
+            # upload never leaves up to part_size bytes per part in the bucket.
+            for blob in [self.bucket.blob(name) for name in part_names] + intermediates:
+                try:
+                    blob.delete()
+                except Exception:
+                    pass
+
+        destination.reload()
+        if destination.crc32c != expected_crc:
+            # Never leave a corrupt recording behind at the destination.
+            try:
+                destination.delete()
+            except Exception as e:
+                print(f"⚠️ Could not delete the corrupt object {destination_blob_name}. Error: {e}")
+            raise RuntimeError(f"CRC32C mismatch after compose (local {expected_crc}, remote {destination.crc32c})")
+
+        self.stats.finished = time.monotonic()
+        return f"gs://{self.bucket.name}/{destination_blob_name}"
+
+def is_already_stored(blob, local_file_path, content_crc32c):
+    """
+    True if `blob` exists and holds exactly the local file (same size and CRC32C).
+    """
+    try:
+        blob.reload()
+    except NotFound:
+        return False
+    return blob.size == os.path.getsize(local_file_path) and blob.crc32c == content_crc32c
+
+def upload_to_gcs(local_file_path, destination_blob_name, content_crc32c=None):
     """
     Uploads a file to the GCS bucket specified in the .env file.
     Relies on the GOOGLE_APPLICATION_CREDENTIALS environment variable being set.
+    If the destination already holds the same content (e.g. an upload finished
+    just before a crash), nothing is uploaded.
     """
     try:
-        bucket_name = os.environ.get("GCP_BUCKET_NAME")
-        if not bucket_name:
-            print("❌ Error: GCP_BUCKET_NAME environment variable not set.")
+        bucket = get_bucket()
+        if not bucket:
             return None
-            
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
+        bucket_name = bucket.name
         blob = bucket.blob(destination_blob_name)
 
+        content_crc32c = content_crc32c or file_crc32c(local_file_path)
+        if is_already_stored(blob, local_file_path, content_crc32c):
+            print(f"♻️  gs://{bucket_name}/{destination_blob_name} already holds this recording, skipping upload.")
+            return f"gs://{bucket_name}/{destination_blob_name}"
+
         print(f"⬆️  Uploading '{local_file_path}' to gs://{bucket_name}/{destination_blob_name}...")
-        blob.upload_from_filename(local_file_path)
+        size = os.path.getsize(local_file_path)
+        started = time.monotonic()
+        if size > PARALLEL_UPLOAD_THRESHOLD:
+            uploader = ParallelUploader(
+                part_size=int(os.environ.get("GCS_PART_SIZE_MB", "64")) * 1024 * 1024,
+                concurrency=int(os.environ.get("GCS_UPLOAD_CONCURRENCY", "8")),
+                bucket=bucket,
+            )
+            uploader.upload(local_file_path, destination_blob_name, expected_crc32c=content_crc32c)
+            stats = uploader.stats.as_dict()
+            print(f"   {stats['parts']} parts, {stats['bytes_per_second'] / 1e6:.1f} MB/s, "
+                  f"{stats['retries']} retries.")
+        else:
+            blob.upload_from_filename(local_file_path)
 
+        elapsed = time.monotonic() - started
+        UPLOAD_BYTES.inc(size)
+        UPLOAD_THROUGHPUT.observe(size / elapsed if elapsed else 0)
+        telemetry.log("upload_finished", bytes=size, seconds=round(elapsed, 3))
         print(f"✅ File uploaded successfully.")
         # Return the GCS URI for storage in the database
         return f"gs://{bucket_name}/{destination_blob_name}"
     except Exception as e:
         print(f"❌ Failed to upload to GCS. Have you set the GOOGLE_APPLICATION_CREDENTIALS environment variable? Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def upload_proxy(media, destination_blob_name):
+    """
+    Uploads the low-bitrate proxy from postprocess.py (if one was made) next to
+    the recording as <name>_proxy.mp4. Returns `media` with its proxy_gcs_url.
+    """
+    proxy_path = (media or {}).get("proxy_path")
+    if not proxy_path or media.get("proxy_gcs_url") or not os.path.exists(proxy_path):
+        return media
+    stem, _ = os.path.splitext(destination_blob_name)
+    proxy_uri = upload_to_gcs(proxy_path, f"{stem}_proxy.mp4")
+    if proxy_uri:
+        media = dict(media, proxy_gcs_url=proxy_uri)
+    return media
@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bson import json_util
+
+from system_resources import process_start_id
+
+# Lifecycle of a recording, in order. A recording only ever moves forward.
+# 'failed' is the other end state, for a capture that cannot be read.
+STATES = ["joined", "recording", "finalized", "processed", "uploaded", "indexed", "cleaned", "failed"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    recording_id TEXT PRIMARY KEY,
+    meet_link TEXT,
+    local_path TEXT,
+    gcs_destination TEXT,
+    owner_pid INTEGER,
+    owner_start TEXT
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recording_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    at TEXT NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_by_recording ON transitions (recording_id, id);
+"""
+
+def _process_alive(pid):
+    if not pid or pid == os.getpid():
+        return False
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows, so ask the kernel instead.
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else (or Windows refuses the probe).
+        return True
+    return True
+
+def _owner_alive(job):
+    """
+    True if the process that journaled `job` is still running. A live pid is
+    not enough, since the pid may have been reused after a crash or reboot:
+    its start identity has to match the one recorded with it too.
+    """
+    if not _process_alive(job["owner_pid"]):
+        return False
+    recorded = job.get("owner_start")
+    current = process_start_id(job["owner_pid"])
+    # Without a recorded or readable identity (old journals, no /proc), trust the pid.
+    return recorded is None or current is None or current == recorded
+
+class JobJournal:
+    """
+    Durable, append-only record of where every recording is in the
+    joined -> recording -> finalized -> processed -> uploaded -> indexed -> cleaned lifecycle.
+    A crashed capture that cannot be read ends in 'failed' instead, with its
+    file left on disk.
+
+    Backed by SQLite in WAL mode so several worker processes can append at once
+    and a crash never loses an acknowledged transition. Each transition is a
+    new row; the current state of a recording is its latest row.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("JOB_JOURNAL", "job_journal.sqlite3")
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            try:
+                # Journals created before the owner's start identity was recorded.
+                conn.execute("ALTER TABLE recordings ADD COLUMN owner_start TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def start(self, recording_id, meet_link, local_path, gcs_destination):
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO recordings (recording_id, meet_link, local_path, gcs_destination, "
+                         "owner_pid, owner_start) VALUES (?, ?, ?, ?, ?, ?)",
+                         (recording_id, meet_link, local_path, gcs_destination, os.getpid(),
+                          process_start_id(os.getpid())))
+        self.transition(recording_id, "joined")
+
+    def transition(self, recording_id, state, **details):
+        """
+        Appends a state change. `details` (e.g. the metadata at 'finalized' or
+        the gs:// URI at 'uploaded') are stored with it.
+        """
+        if state not in STATES:
+            raise ValueError(f"Unknown recording state: {state}")
+        with self._connect() as conn:
+            conn.execute("INSERT INTO transitions (recording_id, state, at, details) VALUES (?, ?, ?, ?)",
+                         (recording_id, state, datetime.utcnow().isoformat(),
+                          json_util.dumps(details) if details else None))
+
+    def get(self, recording_id):
+        """
+        Returns the recording with its current state and the merged details of
+        all its transitions, or None.
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT recording_id, meet_link, local_path, gcs_destination, owner_pid, owner_start "
+                           "FROM recordings WHERE recording_id = ?", (recording_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(zip(["recording_id", "meet_link", "local_path", "gcs_destination", "owner_pid", "owner_start"],
+                       row))
+        job["state"] = None
+        for state, details in conn.execute("SELECT state, details FROM transitions "
+                                           "WHERE recording_id = ? ORDER BY id", (recording_id,)):
+            job["state"] = state
+            if details:
+                job.update(json_util.loads(details))
+        return job
+
+    def unfinished(self, include_live=False):
+        """
+        Returns every recording that has not reached 'cleaned' or 'failed'.
+        Recordings whose owning process is still alive are skipped unless
+        include_live is set.
+        """
+        rows = self._connect().execute("""
+            SELECT t.recording_id FROM transitions t
+            JOIN (SELECT recording_id, MAX(id) AS id FROM transitions GROUP BY recording_id) latest
+              ON t.id = latest.id
+            WHERE t.state NOT IN ('cleaned', 'failed')
+        """).fetchall()
+        jobs = [self.get(recording_id) for (recording_id,) in rows]
+        return [job for job in jobs if include_live or not _owner_alive(job)]
+
+    def cleanup(self, recording_id, keep_local=False):
+        """
+        Deletes the local recording once it is safely uploaded and indexed.
+        With keep_local the files stay, but the recording is still marked
+        cleaned so recovery never looks at it again.
+        """
+        job = self.get(recording_id)
+        if not job or job["state"] != "indexed":
+            return False
+        if keep_local:
+            self.transition(recording_id, "cleaned", kept_local=True)
+            return True
+        _remove_local_files(job)
+        self.transition(recording_id, "cleaned")
+        print(f"🧹 Removed local copy of recording {recording_id}.")
+        return True
+
+    def discard(self, recording_id, **details):
+        """
+        Deletes whatever a recording left on disk, in any state, and marks it
+        cleaned so recovery never uploads it. For recordings that must not be
+        kept, such as a partial capture of a meeting another bot took over.
+        """
+        job = self.get(recording_id)
+        if not job:
+            return False
+        _remove_local_files(job)
+        self.transition(recording_id, "cleaned", discarded=True, **details)
+        print(f"🧹 Discarded local files of recording {recording_id}.")
+        return True
+
+def _remove_local_files(job):
+    proxy_path = (job.get("media") or {}).get("proxy_path")
+    for path in (job["local_path"], f"{job['local_path']}.upload-state", proxy_path):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def _recover_one(journal, job, keep_local):
+    # Imported here so the journal itself has no cloud dependencies.
+    from gcp_handler import upload_to_gcs, upload_proxy
+    from db_handler import store_metadata, find_recording_by_content
+    from postprocess import content_times, get_postprocessor, salvage
+    from streaming_upload import StreamingUploader
+
+    recording_id = job["recording_id"]
+    local_path = job["local_path"]
+
+    if job["state"] in ("joined", "recording"):
+        if not local_path or not os.path.exists(local_path) or not os.path.getsize(local_path):
+            print(f"⚠️ Recording {recording_id} never produced a file. Marking it cleaned.")
+            journal.transition(recording_id, "cleaned")
+            return
+        # The process died mid-meeting; keep whatever was captured, as long as
+        # it can be read. A plain MP4 cut off before its moov atom cannot.
+        if salvage(local_path) is False:
+            print(f"❌ Recording {recording_id} was cut off and cannot be read. "
+                  f"Leaving '{local_path}' on disk and marking it failed.")
+            journal.transition(recording_id, "failed", reason="unreadable")
+            return
+        journal.transition(recording_id, "finalized", interrupted=True)
+        job = journal.get(recording_id)
+
+    if job["state"] == "finalized":
+        # Part of a streamed recording may already be in GCS, so only measure it.
+        streamed = os.path.exists(f"{local_path}.upload-state")
+        media = get_postprocessor().process(local_path, trim=not streamed, faststart=not streamed)
+        start_time, end_time = content_times(job.get("start_time"), job.get("end_time"), media)
+        journal.transition(recording_id, "processed", media=media, start_time=start_time, end_time=end_time)
+        job = journal.get(recording_id)
+
+    if job["state"] == "processed":
+        uploader = StreamingUploader.resume(local_path)
+        media = job.get("media") or {}
+        if uploader:
+            gcs_uri = uploader.finish()
+        else:
+            gcs_uri = (find_recording_by_content(media.get("content_crc32c"), media.get("size_bytes"))
+                       or upload_to_gcs(local_path, job["gcs_destination"],
+                                        content_crc32c=media.get("content_crc32c")))
+        if not gcs_uri:
+            return
+        media = upload_proxy(job.get("media"), job["gcs_destination"])
+        journal.transition(recording_id, "uploaded", gcs_url=gcs_uri, media=media)
+        job = journal.get(recording_id)
+
+    if job["state"] == "uploaded":
+        if not store_metadata(partner_id=job.get("partner_id"), meeting_id=job["meet_link"],
+                              start_time=job.get("start_time"), end_time=job.get("end_time"),
+                              gcs_url=job["gcs_url"], participants=job.get("participants"),
+                              recording_id=recording_id, media=job.get("media")):
+            return
+        journal.transition(recording_id, "indexed")
+
+    journal.cleanup(recording_id, keep_local=keep_local)
+
+def recover_pending(journal=None, max_workers=4, keep_local=None):
+    """
+    Resumes every unfinished upload and metadata write left behind by a crash,
+    in parallel. Returns the number of recordings that were looked at.
+    """
+    journal = journal or JobJournal()
+    if keep_local is None:
+        keep_local = os.environ.get("KEEP_LOCAL_RECORDINGS") == "1"
+    jobs = journal.unfinished()
+    if not jobs:
+        return 0
+
+    print(f"🔁 Recovering {len(jobs)} unfinished recordings...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_recover_one, journal, job, keep_local) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Could not recover recording {job['recording_id']}. Error: {e}")
+    return len(jobs)
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    if len(sys.argv) == 2 and sys.argv[1] == "status":
+        for job in JobJournal().unfinished(include_live=True):
+            print(f"{job['recording_id']}: {job['state']} ({job['local_path']})")
+    else:
+        recover_pending()
@@ -0,0 +1,395 @@
+import os
+import time
+from collections import deque
+
+from system_resources import (find_process_with_argument, process_command_line, process_cpu_seconds,
+                              process_rss_mb, process_tree_pids)
+import telemetry
+
+# Extra Chrome flags for multi-hour meetings. The bot only ever visits Meet, so
+# background services, site-per-process isolation and back/forward caching
+# cost memory without buying anything.
+LONG_MEETING_FLAGS = [
+    "--disable-site-isolation-trials",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,DialMediaRouteProvider,BackForwardCache,"
+    "AutofillServerCommunication,InterestFeedContentSuggestions,IsolateOrigins,site-per-process",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--metrics-recording-only",
+    "--disable-dev-shm-usage",
+    # An occluded or unfocused window must not have its timers throttled mid-meeting.
+    "--disable-renderer-backgrounding",
+    "--disable-background-timer-throttling",
+]
+
+# What each recorder preset needs to see of the meeting: 'audio' needs no
+# incoming video at all, 'screen' only the presenter, 'full' every tile.
+PRESET_VIEWS = {"audio_only": "audio", "browser_audio": "audio", "slides": "screen", "full_motion": "full"}
+
+# Text/aria-label patterns (case-insensitive regular expressions) for the Meet
+# controls the view script drives.
+VIEW_CONTROLS = {
+    "more_options": "more options",
+    "layout_menu": "change layout|adjust view",
+    "settings_menu": "^\\s*settings",
+    "video_tab": "^\\s*video",
+    "receive_resolution": "receive resolution",
+    "close": "^\\s*close|^\\s*done",
+}
+
+# Changes the Meet view through its own menus, in one async script call:
+# {action: 'layout', layout: 'Spotlight', tiles: 6} or
+# {action: 'receive_resolution', option: 'Audio only'}. Never leaves the call.
+VIEW_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var cfg = arguments[0];
+var controls = cfg.controls;
+
+function textOf(el) {
+    var parts = [el.getAttribute("aria-label") || "", el.innerText || el.textContent || ""];
+    var labelledBy = el.getAttribute("aria-labelledby");
+    if (labelledBy) {
+        labelledBy.split(" ").forEach(function (id) {
+            var label = document.getElementById(id);
+            if (label) { parts.push(label.textContent || ""); }
+        });
+    }
+    if (el.labels) { for (var i = 0; i < el.labels.length; i++) { parts.push(el.labels[i].textContent || ""); } }
+    return parts.join(" ").trim();
+}
+
+function find(selector, pattern) {
+    var re = new RegExp(pattern, "i");
+    var elements = document.querySelectorAll(selector);
+    for (var i = 0; i < elements.length; i++) {
+        var el = elements[i];
+        if (el.getClientRects().length && re.test(textOf(el))) { return el; }
+    }
+    return null;
+}
+
+function waitFind(selector, pattern) {
+    return new Promise(function (resolve, reject) {
+        var started = Date.now();
+        (function check() {
+            var el = find(selector, pattern);
+            if (el) { resolve(el); return; }
+            if (Date.now() - started > cfg.timeout_ms) { reject(new Error("not found: " + pattern)); return; }
+            setTimeout(check, 50);
+        })();
+    });
+}
+
+function closeDialog() {
+    var button = find("[role='dialog'] button", controls.close);
+    if (button) { button.click(); return; }
+    document.dispatchEvent(new KeyboardEvent("keydown", {key: "Escape", keyCode: 27, bubbles: true}));
+}
+
+function setRange(slider, value) {
+    if (slider.tagName === "INPUT") {
+        var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+        setter.call(slider, value);
+        slider.dispatchEvent(new Event("input", {bubbles: true}));
+        slider.dispatchEvent(new Event("change", {bubbles: true}));
+        return;
+    }
+    // A custom role=slider only reacts to the keyboard.
+    slider.focus();
+    for (var i = 0; i < 64 && Number(slider.getAttribute("aria-valuenow")) !== value; i++) {
+        var key = Number(slider.getAttribute("aria-valuenow")) < value ? "ArrowRight" : "ArrowLeft";
+        slider.dispatchEvent(new KeyboardEvent("keydown", {key: key, bubbles: true}));
+    }
+}
+
+function openMenuItem(pattern) {
+    return waitFind("button, [role='button']", controls.more_options).then(function (more) {
+        more.click();
+        return waitFind("[role='menuitem'], [role='menuitemradio'], li", pattern);
+    }).then(function (item) { item.click(); });
+}
+
+function setLayout() {
+    return openMenuItem(controls.layout_menu).then(function () {
+        return waitFind("[role='dialog'] input[type='radio'], [role='dialog'] [role='radio'], [role='dialog'] label",
+                        "^\\\\s*" + cfg.layout);
+    }).then(function (choice) {
+        choice.click();
+        if (!cfg.tiles) { return; }
+        var slider = document.querySelector("[role='dialog'] input[type='range'], [role='dialog'] [role='slider']");
+        if (slider) { setRange(slider, cfg.tiles); }
+    });
+}
+
+function setReceiveResolution() {
+    return openMenuItem(controls.settings_menu).then(function () {
+        return waitFind("[role='dialog'] [role='tab']", controls.video_tab);
+    }).then(function (tab) {
+        tab.click();
+        return waitFind("[role='dialog'] select, [role='dialog'] [role='combobox'], " +
+                        "[role='dialog'] [aria-haspopup='listbox']", controls.receive_resolution);
+    }).then(function (box) {
+        if (box.tagName === "SELECT") {
+            for (var i = 0; i < box.options.length; i++) {
+                if (box.options[i].text.indexOf(cfg.option) === 0) {
+                    box.selectedIndex = i;
+                    box.dispatchEvent(new Event("change", {bubbles: true}));
+                    return;
+                }
+            }
+            throw new Error("option not found: " + cfg.option);
+        }
+        box.click();
+        return waitFind("[role='option']", "^\\\\s*" + cfg.option).then(function (option) { option.click(); });
+    });
+}
+
+(cfg.action === "layout" ? setLayout() : setReceiveResolution()).then(function () {
+    closeDialog();
+    done({ok: true});
+}, function (error) {
+    closeDialog();
+    done({ok: false, error: String(error && error.message || error)});
+});
+"""
+
+# Takes remote video out of the page's rendering. Only used when the recording
+# does not need to see the meeting.
+HIDE_VIDEO_SCRIPT = """
+if (!document.getElementById("meetbot-hide-video")) {
+    var style = document.createElement("style");
+    style.id = "meetbot-hide-video";
+    style.textContent = "video { display: none !important; }";
+    document.head.appendChild(style);
+}
+return true;
+"""
+
+CHROME_RSS = telemetry.REGISTRY.gauge("meetbot_chrome_rss_mb", "Resident memory of the bot's Chrome processes.")
+CHROME_CPU = telemetry.REGISTRY.gauge("meetbot_chrome_cpu_percent", "CPU use of the bot's Chrome processes.")
+CHROME_HEAP = telemetry.REGISTRY.gauge("meetbot_chrome_js_heap_mb", "JS heap used by the Meet page.")
+ACTIONS = telemetry.REGISTRY.counter("meetbot_long_meeting_actions_total", "Corrective actions taken in long meetings.")
+
+def chrome_root_pid(driver, debugger_address=None):
+    """
+    Returns the pid whose process tree holds this driver's Chrome: chromedriver
+    for a browser it launched, or the browser itself for an attached warm session.
+    """
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None) if service else None
+    if process and not debugger_address:
+        return process.pid
+    if debugger_address:
+        port = debugger_address.rsplit(":", 1)[-1]
+        return find_process_with_argument(f"--remote-debugging-port={port}")
+    return None
+
+def _process_type(pid):
+    args = process_command_line(pid)
+    if args and "chromedriver" in os.path.basename(args[0]):
+        return "chromedriver"
+    for arg in args:
+        if arg.startswith("--type="):
+            return arg.split("=", 1)[1]
+    return "browser"
+
+class LongMeetingGuard:
+    """
+    Keeps a Chrome session's memory and CPU flat over a multi-hour meeting.
+
+    prepare() stops incoming video the recording does not need: 'audio'
+    views switch Meet's receive resolution to audio only and hide remote
+    video, 'screen' views switch to one video at a time in the spotlight.
+
+    poll() is meant to be called from MeetingMonitor.wait_for_end(on_poll=...),
+    on the thread that owns the driver. Every `interval` seconds it samples
+    per-process RSS and CPU from /proc (and the page's JS heap over CDP).
+    When the totals cross `rss_limit_mb` or `cpu_limit_percent` it works
+    down a ladder of corrective actions, starting with a garbage collection
+    and memory-pressure purge and then cutting down the tiles Meet renders.
+    None of them leave the call.
+
+    Spotlight and capped tile counts take participants' tiles out of the page,
+    so `on_layout_change` is called before the first layout change, e.g. to
+    tell MeetingMonitor that tiles no longer show everyone.
+    """
+    def __init__(self, driver, view="full", debugger_address=None, interval=None, rss_limit_mb=None,
+                 cpu_limit_percent=None, purge_interval=900, history=240, on_layout_change=None):
+        self.driver = driver
+        self.view = view
+        self.on_layout_change = on_layout_change
+        self.layout_changed = False
+        self.interval = interval or float(os.environ.get("LONG_MEETING_SAMPLE_SECONDS", "60"))
+        self.rss_limit_mb = rss_limit_mb or float(os.environ.get("LONG_MEETING_RSS_MB", "1500"))
+        self.cpu_limit_percent = cpu_limit_percent or float(os.environ.get("LONG_MEETING_CPU_PERCENT", "150"))
+        self.purge_interval = purge_interval
+        self.root_pid = chrome_root_pid(driver, debugger_address)
+        self.samples = deque(maxlen=history)
+        self.actions = []
+        self.ladder = self._ladder(view)
+        self._level = 0
+        self._cpu_seconds = {}
+        self._last_sample = None
+        self._last_purge = time.monotonic()
+        self._cdp_metrics = True
+
+    @staticmethod
+    def _ladder(view):
+        ladder = [("purge", None)]
+        if view == "full":
+            ladder += [("layout", {"layout": "Tiled", "tiles": 6}),
+                       ("receive_resolution", {"option": "Standard definition (360p)"}),
+                       ("layout", {"layout": "Spotlight", "tiles": None})]
+        return ladder
+
+    def _view(self, config):
+        if config["action"] == "layout" and not self.layout_changed:
+            # Even a failed attempt may have switched the layout before it gave up.
+            self.layout_changed = True
+            if self.on_layout_change:
+                self.on_layout_change()
+        self.driver.set_script_timeout(20)
+        config = dict(config, controls=VIEW_CONTROLS, timeout_ms=5000)
+        return self.driver.execute_async_script(VIEW_SCRIPT, config) or {"ok": False, "error": "no result"}
+
+    def _apply(self, action, config=None, reason=""):
+        try:
+            if action == "purge":
+                self.driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+                self.driver.execute_cdp_cmd("Memory.simulatePressureNotification", {"level": "critical"})
+                self._last_purge = time.monotonic()
+                outcome = {"ok": True}
+            elif action == "hide_video":
+                outcome = {"ok": bool(self.driver.execute_script(HIDE_VIDEO_SCRIPT))}
+            else:
+                outcome = self._view(dict(config, action=action))
+        except Exception as e:
+            outcome = {"ok": False, "error": str(e)}
+
+        record = {"action": action, "config": config, "reason": reason, "at": time.time(), **outcome}
+        self.actions.append(record)
+        ACTIONS.inc(action=action)
+        telemetry.log("long_meeting_action", **record)
+        if outcome.get("ok"):
+            print(f"🧰 Long-meeting mode: {action} {config or ''} ({reason or 'setup'}).")
+        else:
+            print(f"⚠️ Long-meeting mode could not apply {action}: {outcome.get('error')}")
+        return outcome.get("ok", False)
+
+    def prepare(self):
+        """
+        Stops incoming video the recording does not need. Call once the bot is in the call.
+        """
+        if self.view == "audio":
+            self._apply("receive_resolution", {"option": "Audio only"}, "audio-only recording")
+            self._apply("hide_video", None, "audio-only recording")
+        elif self.view == "screen":
+            self._apply("receive_resolution", {"option": "Standard definition (360p), one video at a time"},
+                        "screen recording")
+            self._apply("layout", {"layout": "Spotlight", "tiles": None}, "screen recording")
+
+    def _js_heap_mb(self):
+        if not self._cdp_metrics:
+            return None
+        try:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+            metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        except Exception:
+            # Not every driver exposes CDP; stop asking.
+            self._cdp_metrics = False
+            return None
+        values = {metric["name"]: metric["value"] for metric in metrics}
+        return round(values.get("JSHeapUsedSize", 0) / 1024 / 1024, 1)
+
+    def sample(self):
+        """
+        Returns one resource sample: total and per-process RSS (MB) and CPU (%
+        of one core since the previous sample), plus the page's JS heap.
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_sample if self._last_sample else None
+        processes = []
+        if self.root_pid and os.path.isdir("/proc"):
+            cpu_seconds = {}
+            for pid in process_tree_pids(self.root_pid):
+                cpu_seconds[pid] = process_cpu_seconds(pid)
+                cpu = None
+                if elapsed and pid in self._cpu_seconds:
+                    cpu = round(100 * (cpu_seconds[pid] - self._cpu_seconds[pid]) / elapsed, 1)
+                processes.append({"pid": pid, "type": _process_type(pid), "rss_mb": round(process_rss_mb(pid), 1),
+                                  "cpu_percent": cpu})
+            self._cpu_seconds = cpu_seconds
+        self._last_sample = now
+
+        sample = {
+            "time": time.time(),
+            "rss_mb": round(sum(p["rss_mb"] for p in processes), 1) if processes else None,
+            "cpu_percent": (round(sum(p["cpu_percent"] or 0 for p in processes), 1)
+                            if processes and elapsed else None),
+            "js_heap_mb": self._js_heap_mb(),
+            "processes": processes,
+        }
+        if sample["rss_mb"] is not None:
+            CHROME_RSS.set(sample["rss_mb"])
+        if sample["cpu_percent"] is not None:
+            CHROME_CPU.set(sample["cpu_percent"])
+        if sample["js_heap_mb"] is not None:
+            CHROME_HEAP.set(sample["js_heap_mb"])
+        self.samples.append(sample)
+        return sample
+
+    def poll(self):
+        """
+        Samples if `interval` has passed and corrects the session if a threshold is crossed.
+        """
+        if self._last_sample and time.monotonic() - self._last_sample < self.interval:
+            return
+        try:
+            self._check()
+        except Exception as e:
+            # Never let resource bookkeeping end the recording.
+            print(f"⚠️ Long-meeting check failed. Error: {e}")
+
+    def _check(self):
+        sample = self.sample()
+        telemetry.log("chrome_resources", rss_mb=sample["rss_mb"], cpu_percent=sample["cpu_percent"],
+                      js_heap_mb=sample["js_heap_mb"])
+
+        reasons = []
+        if sample["rss_mb"] and sample["rss_mb"] > self.rss_limit_mb:
+            reasons.append(f"RSS {sample['rss_mb']:.0f} MB > {self.rss_limit_mb:.0f} MB")
+        if sample["cpu_percent"] and sample["cpu_percent"] > self.cpu_limit_percent:
+            reasons.append(f"CPU {sample['cpu_percent']:.0f}% > {self.cpu_limit_percent:.0f}%")
+        if reasons:
+            # Once every rung has been tried, all that is left is purging again.
+            action, config = self.ladder[self._level] if self._level < len(self.ladder) else ("purge", None)
+            self._level += 1
+            self._apply(action, config, "; ".join(reasons))
+        elif time.monotonic() - self._last_purge >= self.purge_interval:
+            # A routine purge keeps slow JS heap and cache growth from accumulating.
+            self._apply("purge", None, "routine")
+
+    def summary(self):
+        """
+        RSS at the start, peak and end of the meeting, its growth rate in MB per
+        hour (least squares over the samples) and the actions taken.
+        """
+        points = [(s["time"], s["rss_mb"]) for s in self.samples if s["rss_mb"] is not None]
+        slope = None
+        if len(points) >= 2:
+            mean_t = sum(t for t, _ in points) / len(points)
+            mean_r = sum(r for _, r in points) / len(points)
+            variance = sum((t - mean_t) ** 2 for t, _ in points)
+            if variance:
+                slope = round(sum((t - mean_t) * (r - mean_r) for t, r in points) / variance * 3600, 1)
+        return {
+            "samples": len(self.samples),
+            "rss_start_mb": points[0][1] if points else None,
+            "rss_peak_mb": max(r for _, r in points) if points else None,
+            "rss_end_mb": points[-1][1] if points else None,
+            "rss_growth_mb_per_hour": slope,
+            "actions": [{"action": a["action"], "reason": a["reason"], "ok": a["ok"]} for a in self.actions],
+        }
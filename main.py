@@ -4,71 +4,134 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from browser_handler import initialize_driver, join_meet, get_participant_names_only
-
-from browser_handler import initialize_driver, join_meet, get_participant_names
+from browser_handler import initialize_driver, join_meet
 from recorder import Recorder
-from gcp_handler import upload_to_gcs
-from db_handler import store_metadata
+from gcp_handler import upload_to_gcs, upload_proxy
+from streaming_upload import StreamingUploader
+from db_handler import store_metadata, find_recording_by_content, attach_to_recording
+from meeting_monitor import MeetingMonitor
+from participant_scraper import scrape_participants
+from participant_tracker import ParticipantTimeline
+from job_journal import JobJournal
+from readiness import wait_for_admission
+from media_sandbox import sandbox_env
+from audio_tap import AudioTap
+from long_meeting import LongMeetingGuard, PRESET_VIEWS
+from postprocess import content_times, get_postprocessor
+from meeting_lease import MeetingLease
+import telemetry
 
-# --- YOUR NAME AS IT APPEARS IN GOOGLE MEET ---
-# This is crucial for the bot to identify the other participant.
-# Please check how your name appears in the participant list and enter it here.
-YOUR_NAME_IN_MEET = "Kopalle Sidhartha" 
+JOBS = telemetry.REGISTRY.counter("meetbot_jobs_total", "Finished meeting jobs by outcome.")
+JOIN_STEP_SECONDS = telemetry.REGISTRY.histogram("meetbot_join_step_seconds", "Duration of each join_meet() step.")
 
-def main():
+def record_meeting(meet_link, report=None, debugger_address=None, sandbox=None, job_id=None):
     """
-    Autonomous bot that:
-    1. Deduces the partner_id by finding the other person in the meeting.
-    2. Records the start and end time of the session.
-    3. Saves the meeting URL as the meeting_id.
+    Runs the full join -> record -> upload -> metadata pipeline for one meeting.
+    `report` is an optional callback that receives the name of each stage as it starts.
+    `debugger_address` attaches to a warm Chrome session from driver_pool.py.
+    `sandbox` is a MediaSandbox.describe() dict; Chrome and the recorder then use
+    its private display and audio sink.
+    Every stage is timed through telemetry, and logs carry `job_id` and the recording ID.
+    Only one bot records a meeting: if another one holds its lease, this one
+    attaches to that recording's metadata and returns with status 'duplicate'.
+    Returns a dictionary describing the outcome so a scheduler can track the job.
     """
-    
-    print("🧹 Closing any existing Chrome processes...")
-    os.system("taskkill /F /IM chrome.exe >nul 2>&1")
-    time.sleep(2)
-    
-    load_dotenv()
-    
-    meet_link = "https://meet.google.com/tdd-mikb-rko"
+    stages = telemetry.StageTracker()
+    telemetry.bind(job_id=job_id, meet_link=meet_link)
+
+    def set_stage(stage):
+        stages.enter(stage)
+        if report:
+            report(stage)
+
+    result = {"status": "failed", "stage": "starting", "local_filename": None, "gcs_uri": None}
+    journal = JobJournal()
     local_filename = None
     start_time = None
     end_time = None
+    meeting_id_uuid = str(uuid.uuid4()) # We still need a unique ID for the filename
 
-    driver = initialize_driver()
+    # --- CLAIM THE MEETING ---
+    lease = MeetingLease(meet_link, meeting_id_uuid)
+    if not lease.acquire() and not lease.wait_for_leader():
+        leader_id = lease.current["recording_id"]
+        print(f"👥 This meeting is already being recorded as {leader_id} "
+              f"(on {lease.current.get('host')}). Not recording it twice.")
+        attached_at = lease.attach(job_id or meeting_id_uuid)
+        # If the leader has already stored its metadata, the lease copy is too late for it.
+        attach_to_recording(leader_id, job_id or meeting_id_uuid, attached_at=attached_at)
+        result.update(status="duplicate", stage="done", leader_recording_id=leader_id)
+        JOBS.inc(status="duplicate")
+        return result
+
+    set_stage("launching_browser")
+    long_meeting = os.environ.get("LONG_MEETING") == "1"
+    driver = initialize_driver(debugger_address=debugger_address,
+                               env=sandbox_env(sandbox) if sandbox else None,
+                               window_size=sandbox["resolution"] if sandbox else None,
+                               long_meeting=long_meeting)
     if not driver:
-        return
+        result["stage"] = "launching_browser"
+        stages.finish("failed")
+        JOBS.inc(status="failed")
+        lease.release()
+        return result
 
     try:
-        if not join_meet(driver, meet_link):
-            return
+        # The browser_audio preset taps the meeting audio inside Chrome instead of
+        # running FFmpeg; its hook has to be in place before the page loads.
+        browser_audio = os.environ.get("RECORDER_PRESET") == "browser_audio"
+        audio_tap = None
+        if browser_audio:
+            audio_tap = AudioTap(driver, None)
+            audio_tap.install()
+
+        set_stage("joining")
+        result["stage"] = "joining"
+        join_timings = {}
+        if not join_meet(driver, meet_link, timings=join_timings):
+            return result
+        result["join_timings"] = join_timings
+        for step, seconds in join_timings.items():
+            JOIN_STEP_SECONDS.observe(seconds, step=step)
 
         print("⏳ Waiting to be admitted to the meeting room...")
-        leave_button_selector = "button[aria-label='Leave call']"
+        set_stage("waiting_for_admission")
+        result["stage"] = "waiting_for_admission"
         
-        try:
-            WebDriverWait(driver, 300).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, leave_button_selector))
-            )
+        admission = wait_for_admission(driver, timeout=300)
+        if admission == "admitted":
             print("✅ Successfully entered the meeting room.")
             # --- CAPTURE START TIME ---
             start_time = datetime.utcnow()
             print(f"   Start time captured: {start_time.isoformat()}Z")
+            local_filename = f"recording_{meeting_id_uuid}.{'webm' if browser_audio else 'mp4'}"
+            gcs_destination_path = f"recordings/{local_filename}"
+            journal.start(meeting_id_uuid, meet_link, os.path.abspath(local_filename), gcs_destination_path)
+            telemetry.bind(recording_id=meeting_id_uuid)
 
-        except TimeoutException:
-            print("❌ Was not admitted after 5 minutes. Halting.")
-            return
+        else:
+            if admission == "denied":
+                print("❌ The request to join was denied. Halting.")
+            else:
+                print("❌ Was not admitted after 5 minutes. Halting.")
+            result["status"] = "not_admitted"
+            return result
 
         # --- DEDUCE THE PARTNER_ID ---
         print("🕵️‍♂️ Determining the partner_id...")
-        all_participants = get_participant_names_only(driver)  # Changed here
-        
-        # Filter out your own name from the list
-        other_participants = [name for name in all_participants if name != YOUR_NAME_IN_MEET]
+        set_stage("scraping_participants")
+        # Leave the bot itself out: the scraper flags its own entry, whatever name it joined with.
+        other_participants = []
+        seen_ids = set()
+        for participant in scrape_participants(driver):
+            if not participant["is_self"] and participant["id"] not in seen_ids:
+                seen_ids.add(participant["id"])
+                other_participants.append(participant["name"])
         
         partner_id = None
         if len(other_participants) == 1:
@@ -85,51 +148,170 @@ def main():
             print("   Warning: Could not identify any other participants.")
 
         # --- START RECORDING ---
-        meeting_id_uuid = str(uuid.uuid4()) # We still need a unique ID for the filename
-        local_filename = f"recording_{meeting_id_uuid}.mp4"
-        recorder = Recorder(local_filename)
+        set_stage("recording")
+        result["stage"] = "recording"
+        result["local_filename"] = local_filename
+        streaming = os.environ.get("STREAMING_UPLOAD") == "1"
+        if audio_tap:
+            audio_tap.output_path = local_filename
+            recorder = audio_tap
+        else:
+            recorder_kwargs = {}
+            if sandbox:
+                recorder_kwargs = {"display": sandbox["display"], "audio_source": sandbox["audio_source"],
+                                   "screen_size": sandbox["resolution"]}
+            recorder = Recorder(local_filename, preset=os.environ.get("RECORDER_PRESET", "full_motion"),
+                                fragmented=streaming, **recorder_kwargs)
         recorder.start_recording()
+        journal.transition(meeting_id_uuid, "recording")
+        lease.mark_recording()
+
+        # In streaming mode the file is uploaded part by part while it is recorded.
+        streaming_uploader = None
+        if streaming:
+            streaming_uploader = StreamingUploader(local_filename, gcs_destination_path)
+            if not streaming_uploader.start():
+                streaming_uploader = None
 
         print(f"🟢 Recording started. Monitoring meeting...")
-        while True:
-            try:
-                driver.find_element(By.CSS_SELECTOR, leave_button_selector)
-                time.sleep(10)
-            except NoSuchElementException:
-                print("✅ Meeting has ended.")
-                # --- CAPTURE END TIME ---
-                end_time = datetime.utcnow()
-                print(f"   End time captured: {end_time.isoformat()}Z")
-                break
+        # The in-page observer reports the end of the call as soon as it happens,
+        # so the recording stops without trailing dead time.
+        # The same observer feeds participant join/leave diffs into the timeline.
+        timeline = ParticipantTimeline()
+        pollers = []
+        if audio_tap:
+            # Pull the encoded audio out of the page every few seconds.
+            pollers.append(audio_tap.drain)
+        monitor = MeetingMonitor(driver, poll_timeout=5 if audio_tap else 30)
+        guard = None
+        if long_meeting:
+            # Stop the incoming video this preset does not record, then keep Chrome's memory and CPU in check.
+            # Fewer tiles on screen means departures have to come from the People panel.
+            view = PRESET_VIEWS.get(os.environ.get("RECORDER_PRESET", "full_motion"), "full")
+            guard = LongMeetingGuard(driver, view, debugger_address=debugger_address,
+                                     on_layout_change=lambda: monitor.set_tiles_complete(False))
+            guard.prepare()
+            pollers.append(guard.poll)
+
+        def on_poll():
+            for poll in pollers:
+                poll()
+            # If the lease lapsed and another bot took the meeting over, stop here
+            # rather than record and upload it twice.
+            if not lease.check():
+                return {"type": "lease_lost", "time": int(time.time() * 1000)}
 
+        end_event = monitor.wait_for_end(on_event=timeline.handle_event, on_poll=on_poll)
+        if guard:
+            result["chrome_resources"] = guard.summary()
+            telemetry.log("chrome_resources_summary", **result["chrome_resources"])
+        if end_event["type"] == "lease_lost":
+            leader_id = (lease.current or {}).get("recording_id")
+            print(f"👥 Another bot took over this meeting as {leader_id}. Stopping this recording.")
+            recorder.stop_recording()
+            if streaming_uploader:
+                streaming_uploader.abort()
+            # The leader has the meeting; the partial capture is never uploaded, so don't keep it.
+            journal.discard(meeting_id_uuid, reason="lease_lost", leader_recording_id=leader_id)
+            result.update(status="lease_lost", stage="done", leader_recording_id=leader_id)
+            return result
+        print(f"✅ Meeting has ended ({end_event['type']}).")
+        # --- CAPTURE END TIME ---
+        end_time = datetime.utcnow()
+        print(f"   End time captured: {end_time.isoformat()}Z")
         recorder.stop_recording()
+        timeline.close(time.time())
+        participants = timeline.to_list()
+        # Everything needed to finish the job is journaled, so a crash from here
+        # on is picked up by job_journal.recover_pending().
+        journal.transition(meeting_id_uuid, "finalized", partner_id=partner_id, start_time=start_time,
+                           end_time=end_time, participants=participants)
 
-        gcs_destination_path = f"recordings/{local_filename}"
-        gcs_uri = upload_to_gcs(local_filename, gcs_destination_path)
+        # --- POST-PROCESS ---
+        # Trim dead time and remux for fast start. A streamed recording is
+        # already (mostly) in GCS, so it is only measured, never rewritten.
+        set_stage("post_processing")
+        result["stage"] = "post_processing"
+        media = get_postprocessor().process(local_filename, trim=not streaming_uploader,
+                                            faststart=not streaming_uploader,
+                                            proxy=os.environ.get("POSTPROCESS_PROXY") == "1")
+        start_time, end_time = content_times(start_time, end_time, media)
+        journal.transition(meeting_id_uuid, "processed", media=media, start_time=start_time, end_time=end_time)
+
+        set_stage("uploading")
+        result["stage"] = "uploading"
+        gcs_uri = streaming_uploader.finish() if streaming_uploader else None
+        if not gcs_uri:
+            # Never push the same bytes to GCS twice.
+            gcs_uri = find_recording_by_content(media.get("content_crc32c"), media.get("size_bytes"))
+            if gcs_uri:
+                print(f"♻️  An identical recording is already stored at {gcs_uri}, skipping upload.")
+            else:
+                gcs_uri = upload_to_gcs(local_filename, gcs_destination_path,
+                                        content_crc32c=media.get("content_crc32c"))
         if gcs_uri:
+            media = upload_proxy(media, gcs_destination_path)
+            result["gcs_uri"] = gcs_uri
+            journal.transition(meeting_id_uuid, "uploaded", gcs_url=gcs_uri, media=media)
+            set_stage("storing_metadata")
+            result["stage"] = "storing_metadata"
             # Pass all the new data points to the metadata storage function
-            store_metadata(
+            if store_metadata(
                 partner_id=partner_id,
                 meeting_id=meet_link, # Using the URL as the meeting ID
                 start_time=start_time,
                 end_time=end_time,
-                gcs_url=gcs_uri
-            )
+                gcs_url=gcs_uri,
+                participants=participants,
+                recording_id=meeting_id_uuid,
+                media=media,
+                attached_jobs=lease.attached_jobs()
+            ):
+                journal.transition(meeting_id_uuid, "indexed")
+                journal.cleanup(meeting_id_uuid, keep_local=os.environ.get("KEEP_LOCAL_RECORDINGS") == "1")
+            result["status"] = "succeeded"
+            result["stage"] = "done"
         else:
             print("❌ Skipping metadata storage.")
 
     finally:
+        lease.release()
+        stages.finish(result["status"])
+        JOBS.inc(status=result["status"])
         if 'driver' in locals() and driver:
+            if debugger_address:
+                # Quitting an attached driver leaves the warm browser running, so
+                # navigate away first to make sure the bot has left the call.
+                try:
+                    driver.get("about:blank")
+                except Exception:
+                    pass
             driver.quit()
             print("✅ Browser closed.")
         
         if local_filename and os.path.exists(local_filename):
             full_path = os.path.join(os.getcwd(), local_filename)
             print(f"✅ Recording saved successfully to: {full_path}")
-        else:
+        elif result["status"] != "succeeded":
             print("⚠️ No recording file was found or created.")
 
+    return result
+
+def main():
+    """
+    Autonomous bot that:
+    1. Deduces the partner_id by finding the other person in the meeting.
+    2. Records the start and end time of the session.
+    3. Saves the meeting URL as the meeting_id.
+    To record many meetings at once, use scheduler.py instead.
+    """
+    load_dotenv()
+    telemetry.start_exporters()
+    
+    meet_link = "https://meet.google.com/tdd-mikb-rko"
+    record_meeting(meet_link)
+
     print("\n🎉 Process finished.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
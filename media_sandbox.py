@@ -0,0 +1,159 @@
+import atexit
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+class MediaSandbox:
+    """
+    A private Xvfb display and PulseAudio/PipeWire null sink for one meeting (Linux only).
+
+    Chrome is started with DISPLAY and PULSE_SINK pointing at the sandbox, and
+    the recorder grabs that display and the sink's monitor source, so meetings
+    on the same host never see or hear each other.
+    """
+    def __init__(self, display_number, resolution="1280x720"):
+        self.display_number = display_number
+        self.resolution = resolution
+        self.sink_name = f"meetbot_{uuid.uuid4().hex[:8]}"
+        self.xvfb = None
+        self.sink_module = None
+        self.last_used = time.monotonic()
+
+    @property
+    def display(self):
+        return f":{self.display_number}"
+
+    @property
+    def audio_source(self):
+        return f"{self.sink_name}.monitor"
+
+    def start(self, timeout=10):
+        width, height = self.resolution.split("x")
+        self.xvfb = subprocess.Popen(
+            ["Xvfb", self.display, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp", "-noreset"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket_path = f"/tmp/.X11-unix/X{self.display_number}"
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path):
+            if self.xvfb.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError(f"Xvfb failed to start on display {self.display}")
+            time.sleep(0.05)
+
+        try:
+            output = subprocess.run(
+                ["pactl", "load-module", "module-null-sink", f"sink_name={self.sink_name}",
+                 f"sink_properties=device.description={self.sink_name}"],
+                check=True, capture_output=True, text=True).stdout
+            self.sink_module = output.strip()
+        except (OSError, subprocess.CalledProcessError) as e:
+            self.close()
+            raise RuntimeError(f"Could not create PulseAudio null sink. Error: {e}")
+        print(f"🖥️  Media sandbox ready: display {self.display}, audio sink {self.sink_name}.")
+
+    def env(self):
+        """
+        Environment for processes (Chrome, FFmpeg) that should live in this sandbox.
+        """
+        return sandbox_env(self.describe())
+
+    def describe(self):
+        """
+        A picklable description for handing the sandbox to a worker process.
+        """
+        return {"display": self.display, "audio_source": self.audio_source,
+                "sink_name": self.sink_name, "resolution": self.resolution}
+
+    def is_healthy(self):
+        return self.xvfb is not None and self.xvfb.poll() is None
+
+    def close(self):
+        if self.sink_module:
+            subprocess.run(["pactl", "unload-module", self.sink_module], capture_output=True)
+            self.sink_module = None
+        if self.xvfb and self.xvfb.poll() is None:
+            self.xvfb.terminate()
+            try:
+                self.xvfb.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.xvfb.kill()
+                self.xvfb.wait()
+
+def sandbox_env(description):
+    """
+    Builds the process environment for a sandbox description from MediaSandbox.describe().
+    """
+    env = dict(os.environ)
+    env["DISPLAY"] = description["display"]
+    env["PULSE_SINK"] = description["sink_name"]
+    return env
+
+def media_sandbox_supported():
+    return os.name == "posix" and bool(shutil.which("Xvfb")) and bool(shutil.which("pactl"))
+
+class MediaSandboxPool:
+    """
+    Hands out MediaSandboxes, creating them lazily and reusing idle ones.
+    Sandboxes idle for longer than `idle_timeout` seconds are torn down, and
+    everything is torn down at exit.
+    """
+    def __init__(self, resolution="1280x720", first_display=99, idle_timeout=300):
+        self.resolution = resolution
+        self.first_display = first_display
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._in_use = set()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _free_display_number(self):
+        used = {s.display_number for s in self._idle} | {s.display_number for s in self._in_use}
+        number = self.first_display
+        while number in used or os.path.exists(f"/tmp/.X{number}-lock") \
+                or os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            number += 1
+        return number
+
+    def acquire(self):
+        with self._lock:
+            self._reap_idle()
+            while self._idle:
+                sandbox = self._idle.pop()
+                if sandbox.is_healthy():
+                    self._in_use.add(sandbox)
+                    return sandbox
+                sandbox.close()
+            sandbox = MediaSandbox(self._free_display_number(), self.resolution)
+            # Reserve the display number before releasing the lock.
+            self._in_use.add(sandbox)
+        try:
+            sandbox.start()
+        except Exception:
+            with self._lock:
+                self._in_use.discard(sandbox)
+            raise
+        return sandbox
+
+    def release(self, sandbox):
+        with self._lock:
+            self._in_use.discard(sandbox)
+            sandbox.last_used = time.monotonic()
+            self._idle.append(sandbox)
+            self._reap_idle()
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        for sandbox in [s for s in self._idle if now - s.last_used > self.idle_timeout]:
+            self._idle.remove(sandbox)
+            sandbox.close()
+
+    def close(self):
+        with self._lock:
+            sandboxes = self._idle + list(self._in_use)
+            self._idle = []
+            self._in_use = set()
+        for sandbox in sandboxes:
+            sandbox.close()
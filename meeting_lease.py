@@ -0,0 +1,346 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db_handler import get_mongo_client
+
+def meeting_key(meet_link):
+    """
+    Returns the key a meeting is leased under: its lower-cased meeting code,
+    so 'https://meet.google.com/abc-defg-hij?authuser=1' and
+    'meet.google.com/ABC-DEFG-HIJ/' are the same meeting.
+    """
+    link = meet_link.strip()
+    if "://" not in link:
+        link = f"https://{link}"
+    parsed = urlparse(link)
+    return f"{parsed.netloc.lower()}{parsed.path.rstrip('/').lower()}"
+
+class MongoLeaseStore:
+    """
+    Leases kept in a MongoDB collection next to the metadata, so bots on
+    different hosts see each other. One document per meeting; a TTL index
+    removes leases whose holder died.
+    """
+    def __init__(self, collection=None):
+        self._collection = collection
+        self._indexes_ready = False
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            client = get_mongo_client()
+            db_name = os.environ.get("DATABASE_NAME")
+            if not client or not db_name:
+                raise RuntimeError("MongoDB environment variables not set")
+            self._collection = client[db_name][os.environ.get("LEASE_COLLECTION", "meeting_leases")]
+        if not self._indexes_ready:
+            self._collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+        return self._collection
+
+    def acquire(self, key, holder, ttl, details):
+        """
+        Takes the lease if it is free, expired or already ours.
+        Returns (acquired, lease document).
+        """
+        for _ in range(3):
+            now = datetime.utcnow()
+            try:
+                lease = self.collection.find_one_and_update(
+                    {"_id": key, "$or": [{"expires_at": {"$lt": now}}, {"holder": holder}]},
+                    {"$set": dict(details, holder=holder, expires_at=now + timedelta(seconds=ttl))},
+                    upsert=True, return_document=ReturnDocument.AFTER)
+                return True, lease
+            except DuplicateKeyError:
+                # The upsert collided with a live lease held by someone else.
+                current = self.collection.find_one({"_id": key})
+                if current is not None:
+                    return False, current
+                # It was released in the meantime, so the meeting is free again: retry.
+        raise RuntimeError(f"lease on {key} kept changing hands")
+
+    def renew(self, key, holder, ttl):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        return self.collection.update_one({"_id": key, "holder": holder},
+                                          {"$set": {"expires_at": expires_at}}).matched_count == 1
+
+    def set_state(self, key, holder, state):
+        return self.collection.update_one({"_id": key, "holder": holder},
+                                          {"$set": {"state": state}}).matched_count == 1
+
+    def release(self, key, holder):
+        # Attachments live on the lease document, so they go with it.
+        self.collection.delete_one({"_id": key, "holder": holder})
+
+    def attach(self, key, recording_id, job_id, attached_at):
+        entry = {"recording_id": recording_id, "job_id": job_id, "attached_at": attached_at}
+        self.collection.update_one({"_id": key}, {"$addToSet": {"attached_jobs": entry}})
+
+    def attached_jobs(self, key, recording_id):
+        lease = self.collection.find_one({"_id": key}, {"attached_jobs": 1}) or {}
+        return [{"job_id": entry["job_id"], "attached_at": entry["attached_at"]}
+                for entry in lease.get("attached_jobs", []) if entry.get("recording_id") == recording_id]
+
+class LocalLeaseStore:
+    """
+    SQLite stand-in for MongoLeaseStore, for single-host setups without
+    MongoDB. All processes on the host share one file. Attachments are
+    deleted together with the lease they were made on.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("LEASE_DB", "meeting_leases.sqlite3")
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, holder TEXT, "
+                         "recording_id TEXT, meet_link TEXT, host TEXT, pid INTEGER, expires_at REAL, state TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS attachments (key TEXT, recording_id TEXT, job_id TEXT, "
+                         "attached_at TEXT, PRIMARY KEY (key, recording_id, job_id))")
+            try:
+                # Lease files created before leases carried the leader's state.
+                conn.execute("ALTER TABLE leases ADD COLUMN state TEXT")
+            except sqlite3.OperationalError:
+                pass
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, conn, key):
+        row = conn.execute("SELECT key, holder, recording_id, meet_link, host, pid, expires_at, state "
+                           "FROM leases WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        return dict(zip(["_id", "holder", "recording_id", "meet_link", "host", "pid", "expires_at", "state"], row))
+
+    def acquire(self, key, holder, ttl, details):
+        conn = self._connect()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so check-and-set is atomic across processes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = self._row(conn, key)
+            if current and current["holder"] != holder and current["expires_at"] > now:
+                return False, current
+            conn.execute("INSERT OR REPLACE INTO leases (key, holder, recording_id, meet_link, host, pid, "
+                         "expires_at, state) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, holder, details.get("recording_id"), details.get("meet_link"),
+                          details.get("host"), details.get("pid"), now + ttl, details.get("state")))
+            # Attachments to a recording whose lease is gone (released, or taken
+            # over from a dead leader) will never be read again.
+            conn.execute("DELETE FROM attachments WHERE NOT EXISTS (SELECT 1 FROM leases "
+                         "WHERE leases.key = attachments.key AND leases.recording_id = attachments.recording_id)")
+            return True, self._row(conn, key)
+        finally:
+            conn.execute("COMMIT")
+
+    def renew(self, key, holder, ttl):
+        cursor = self._connect().execute("UPDATE leases SET expires_at = ? WHERE key = ? AND holder = ?",
+                                         (time.time() + ttl, key, holder))
+        return cursor.rowcount == 1
+
+    def set_state(self, key, holder, state):
+        cursor = self._connect().execute("UPDATE leases SET state = ? WHERE key = ? AND holder = ?",
+                                         (state, key, holder))
+        return cursor.rowcount == 1
+
+    def release(self, key, holder):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM attachments WHERE key = ? AND recording_id = "
+                         "(SELECT recording_id FROM leases WHERE key = ? AND holder = ?)", (key, key, holder))
+            conn.execute("DELETE FROM leases WHERE key = ? AND holder = ?", (key, holder))
+        finally:
+            conn.execute("COMMIT")
+
+    def attach(self, key, recording_id, job_id, attached_at):
+        self._connect().execute("INSERT OR IGNORE INTO attachments VALUES (?, ?, ?, ?)",
+                                (key, recording_id, job_id, attached_at.isoformat()))
+
+    def attached_jobs(self, key, recording_id):
+        rows = self._connect().execute("SELECT job_id, attached_at FROM attachments "
+                                       "WHERE key = ? AND recording_id = ?", (key, recording_id)).fetchall()
+        return [{"job_id": job_id, "attached_at": datetime.fromisoformat(at)} for job_id, at in rows]
+
+def get_lease_store():
+    """
+    Returns the lease store for this deployment: MongoDB when MONGO_URI is set
+    (or LEASE_BACKEND=mongo), otherwise the local SQLite stand-in.
+    """
+    backend = os.environ.get("LEASE_BACKEND") or ("mongo" if os.environ.get("MONGO_URI") else "local")
+    if backend == "mongo":
+        return MongoLeaseStore()
+    return LocalLeaseStore()
+
+class MeetingLease:
+    """
+    Makes sure only one bot records a given meeting.
+
+    The bot that acquires the lease becomes the meeting's recorder and keeps
+    the lease alive with heartbeats every ttl/3 seconds. If it dies, the lease
+    expires after `ttl` seconds and the meeting is free again. Everyone else
+    sees the leader's recording_id in `current`, can wait_for_leader() to
+    make sure it really starts recording, and then attach() to its recording
+    instead of recording.
+    """
+    def __init__(self, meet_link, recording_id, ttl=60, store=None):
+        self.meet_link = meet_link
+        self.key = meeting_key(meet_link)
+        self.recording_id = recording_id
+        self.ttl = ttl
+        self.store = store or get_lease_store()
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{recording_id}"
+        self.current = None
+        self.held = False
+        self.lost = False
+        self.state = "starting"
+        self._stop = threading.Event()
+        self._thread = None
+        self._renewed_at = None
+
+    def acquire(self):
+        """
+        Returns True if this bot should record the meeting. If the lease
+        store cannot be reached the bot records anyway: a duplicate recording
+        is better than a missed one.
+        """
+        try:
+            self.held, self.current = self.store.acquire(self.key, self.holder, self.ttl, self._details())
+        except Exception as e:
+            print(f"⚠️ Could not reach the meeting lease store, recording without a lease. Error: {e}")
+            return True
+        if self.held:
+            self._start_heartbeat()
+        return self.held
+
+    def _details(self):
+        return {"recording_id": self.recording_id, "meet_link": self.meet_link,
+                "host": socket.gethostname(), "pid": os.getpid(), "state": self.state}
+
+    def mark_recording(self):
+        """
+        Tells the bots waiting in wait_for_leader() that the recording has started.
+        """
+        self.state = "recording"
+        try:
+            self.store.set_state(self.key, self.holder, self.state)
+        except Exception as e:
+            print(f"⚠️ Could not mark the lease on {self.key} as recording. Error: {e}")
+
+    def wait_for_leader(self, timeout=None, interval=10):
+        """
+        Called by a bot that lost acquire(). Re-checks the lease every
+        `interval` seconds until the leader reports it is recording, so a
+        leader that fails while joining does not leave the meeting unrecorded.
+        Returns True if the lease came free and this bot took it (it should
+        record), False once the leader is recording or after `timeout`
+        seconds (LEASE_FOLLOW_SECONDS, default 420: long enough for the
+        leader to wait out admission) with the leader still holding the lease.
+        """
+        if timeout is None:
+            timeout = float(os.environ.get("LEASE_FOLLOW_SECONDS", "420"))
+        deadline = time.monotonic() + timeout
+        while (self.current or {}).get("state") != "recording":
+            if time.monotonic() >= deadline:
+                print(f"⌛ The bot holding {self.key} has not started recording yet; leaving the meeting to it.")
+                return False
+            time.sleep(interval)
+            if self.acquire():
+                if self.held:
+                    print(f"🔒 The previous leader of {self.key} is gone; taking the meeting over.")
+                return True
+        return False
+
+    def _start_heartbeat(self):
+        self._renewed_at = time.monotonic()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.store.renew(self.key, self.holder, self.ttl):
+                    self.lost = True
+                    print(f"⚠️ Lost the lease on {self.key}; another bot may start recording it.")
+                    return
+                self._renewed_at = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ Lease heartbeat failed. Error: {e}")
+                if time.monotonic() - self._renewed_at > self.ttl:
+                    # A full ttl without a renewal: the lease has lapsed and may be taken.
+                    self.lost = True
+                    return
+
+    def check(self):
+        """
+        Returns False once another bot has taken over the meeting; call it
+        periodically while recording. A lapsed lease that nobody else took is
+        re-acquired. If the store cannot be reached the bot keeps recording
+        and asks again on the next call.
+        """
+        if not self.lost:
+            return True
+        try:
+            held, self.current = self.store.acquire(self.key, self.holder, self.ttl, self._details())
+        except Exception as e:
+            print(f"⚠️ Could not re-acquire the lease on {self.key}, still recording. Error: {e}")
+            return True
+        if not held:
+            self.held = False
+            return False
+        self.lost = False
+        self._start_heartbeat()
+        print(f"🔒 Re-acquired the lease on {self.key}.")
+        return True
+
+    def attach(self, job_id):
+        """
+        Records on the lease that `job_id` found this meeting already being
+        recorded. The leader copies these into its metadata record when it
+        stores it (see attached_jobs()), so nothing is written for a
+        recording that may never be stored.
+        Returns the attachment time, or None if the store cannot be reached.
+        """
+        now = datetime.utcnow()
+        # Millisecond precision, as MongoDB stores it, so the same attachment
+        # written through db_handler.attach_to_recording() compares equal.
+        attached_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        try:
+            self.store.attach(self.key, self.current["recording_id"], job_id, attached_at)
+            return attached_at
+        except Exception as e:
+            print(f"⚠️ Could not attach to the recording on the lease. Error: {e}")
+            return None
+
+    def attached_jobs(self):
+        """
+        Returns the jobs that attached to this bot's recording of the meeting.
+        """
+        try:
+            return self.store.attached_jobs(self.key, self.recording_id)
+        except Exception as e:
+            print(f"⚠️ Could not read attached jobs from the lease. Error: {e}")
+            return []
+
+    def release(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self.held:
+            try:
+                self.store.release(self.key, self.holder)
+            except Exception as e:
+                print(f"⚠️ Could not release the lease on {self.key}; it expires in {self.ttl}s. Error: {e}")
+            self.held = False
@@ -0,0 +1,300 @@
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from participant_scraper import scrape_participants
+import telemetry
+
+LEAVE_BUTTON_SELECTOR = "button[aria-label='Leave call']"
+
+# Installed once per page. A MutationObserver watches the call UI and queues
+# events; wait_for_events() long-polls that queue with execute_async_script,
+# so an event reaches Python as soon as it happens instead of on the next poll.
+# Participant joins and leaves come from the tiles in each batch of added and
+# removed nodes; a full rescan of the tiles only runs every reconcile_ms.
+# Once the layout shows only some of the participants (tilesComplete false),
+# a tile disappearing no longer means its participant left; departures then
+# come from the People panel roster passed to monitor.roster().
+MONITOR_SCRIPT = """
+if (window.__meetBotMonitor) { return true; }
+var LEAVE = arguments[0];
+var RECONCILE_MS = arguments[1];
+var TILE = "div[data-participant-id]";
+var END_TEXTS = ["You left the meeting", "You've been removed from the meeting",
+                 "You have been removed", "The call has ended", "Return to home screen"];
+var monitor = {events: [], waiter: null, inCall: !!document.querySelector(LEAVE),
+               participants: {}, ended: false, tilesComplete: arguments[2]};
+window.__meetBotMonitor = monitor;
+var added = [];
+var removed = {};
+
+function push(event) {
+    event.time = Date.now();
+    monitor.events.push(event);
+    if (monitor.waiter) {
+        var resolve = monitor.waiter;
+        monitor.waiter = null;
+        resolve();
+    }
+}
+
+function participantName(el) {
+    var nameEl = el.querySelector("div.zWGUib, div.Yx52jb, span[data-self-name]");
+    var text = (nameEl || el).textContent || "";
+    return text.trim().split("\\n")[0];
+}
+
+// The bot's own tile: it is not a participant of the meeting it records.
+function isSelf(el) {
+    return !!el.querySelector("[data-self-name]") || /\(You\)/.test(el.textContent || "");
+}
+
+function tilesIn(node) {
+    if (node.nodeType !== 1) { return []; }
+    var tiles = Array.prototype.slice.call(node.querySelectorAll(TILE));
+    if (node.matches(TILE)) { tiles.unshift(node); }
+    return tiles;
+}
+
+function joined(el) {
+    var id = el.getAttribute("data-participant-id");
+    if (!id || monitor.participants[id] || isSelf(el)) { return; }
+    monitor.participants[id] = participantName(el) || id;
+    push({type: "participant_joined", id: id, name: monitor.participants[id]});
+}
+
+function left(id) {
+    push({type: "participant_left", id: id, name: monitor.participants[id]});
+    delete monitor.participants[id];
+}
+
+// Only the tiles in this batch of mutations. Meet re-renders a tile by
+// removing and re-adding it, so a removed id only counts as a departure when
+// no tile with that id is left in the page.
+function applyDiff() {
+    var batch = added;
+    var gone = Object.keys(removed);
+    added = [];
+    removed = {};
+    batch.forEach(function (el) { if (el.isConnected) { joined(el); } });
+    gone.forEach(function (id) {
+        if (monitor.tilesComplete && monitor.participants[id] && !document.querySelector(TILE + '[data-participant-id="' + CSS.escape(id) + '"]')) {
+            left(id);
+        }
+    });
+}
+
+// Full rescan of every tile, to catch anything the diffs missed.
+function reconcile() {
+    if (monitor.ended || !document.querySelector(LEAVE)) { return; }
+    var seen = {};
+    document.querySelectorAll(TILE).forEach(function (el) {
+        seen[el.getAttribute("data-participant-id")] = true;
+        joined(el);
+    });
+    if (!monitor.tilesComplete) { return; }
+    Object.keys(monitor.participants).forEach(function (id) {
+        if (!seen[id]) { left(id); }
+    });
+}
+
+// Everyone in the call but the bot, from the People panel: [{id, name}].
+monitor.roster = function (participants) {
+    var present = {};
+    participants.forEach(function (p) {
+        present[p.id] = true;
+        if (!monitor.participants[p.id]) {
+            monitor.participants[p.id] = p.name || p.id;
+            push({type: "participant_joined", id: p.id, name: monitor.participants[p.id]});
+        }
+    });
+    Object.keys(monitor.participants).forEach(function (id) {
+        if (!present[id]) { left(id); }
+    });
+    return true;
+};
+
+function check() {
+    if (monitor.ended) { return; }
+    var inCall = !!document.querySelector(LEAVE);
+    if (inCall) {
+        applyDiff();
+    }
+    if (monitor.inCall && !inCall) {
+        var bodyText = document.body ? document.body.innerText : "";
+        var reason = "left_call";
+        for (var i = 0; i < END_TEXTS.length; i++) {
+            if (bodyText.indexOf(END_TEXTS[i]) !== -1) {
+                reason = END_TEXTS[i].indexOf("removed") !== -1 ? "kicked" : "call_ended";
+                break;
+            }
+        }
+        monitor.ended = true;
+        push({type: reason});
+    } else if (!monitor.inCall && inCall) {
+        push({type: "entered_call"});
+        reconcile();
+    }
+    monitor.inCall = inCall;
+}
+
+// Collect the tiles each mutation adds or removes, and coalesce bursts of
+// mutations (Meet re-renders constantly) into one check per frame.
+var scheduled = false;
+new MutationObserver(function (records) {
+    records.forEach(function (record) {
+        if (record.type === "attributes") {
+            if (record.attributeName === "data-participant-id") {
+                if (record.oldValue) { removed[record.oldValue] = true; }
+                if (record.target.matches(TILE)) { added.push(record.target); }
+            }
+            return;
+        }
+        record.addedNodes.forEach(function (node) { added.push.apply(added, tilesIn(node)); });
+        record.removedNodes.forEach(function (node) {
+            tilesIn(node).forEach(function (el) { removed[el.getAttribute("data-participant-id")] = true; });
+        });
+    });
+    if (scheduled) { return; }
+    scheduled = true;
+    setTimeout(function () { scheduled = false; check(); }, 0);
+}).observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeOldValue: true,
+                                      attributeFilter: ["aria-label", "data-participant-id"]});
+var reconcileTimer = setInterval(function () {
+    if (monitor.ended) { clearInterval(reconcileTimer); return; }
+    reconcile();
+}, RECONCILE_MS);
+window.addEventListener("pagehide", function () { monitor.ended = true; push({type: "left_call"}); });
+check();
+reconcile();
+return true;
+"""
+
+WAIT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var monitor = window.__meetBotMonitor;
+if (!monitor) { done(null); return; }
+function flush() {
+    var events = monitor.events;
+    monitor.events = [];
+    done(events);
+}
+if (monitor.events.length) { flush(); return; }
+var timer = setTimeout(function () { monitor.waiter = null; flush(); }, timeoutMs);
+monitor.waiter = function () { clearTimeout(timer); flush(); };
+"""
+
+ROSTER_SCRIPT = """
+var monitor = window.__meetBotMonitor;
+return monitor ? monitor.roster(arguments[0]) : false;
+"""
+
+TILES_COMPLETE_SCRIPT = """
+if (window.__meetBotMonitor) { window.__meetBotMonitor.tilesComplete = arguments[0]; }
+"""
+
+END_EVENTS = ("left_call", "kicked", "call_ended")
+
+POLLS = telemetry.REGISTRY.counter("meetbot_monitor_polls_total", "Meeting monitor long-polls.")
+EVENTS = telemetry.REGISTRY.counter("meetbot_meeting_events_total", "Meeting events seen by the monitor.")
+
+class MeetingMonitor:
+    """
+    Event-driven replacement for polling the 'Leave call' button.
+    Installs an in-page observer that reports when the bot enters or leaves the
+    call, is kicked, or the call ends, plus participant join/leave events.
+    Participants come from the rendered tiles until set_tiles_complete(False)
+    says the layout hides some of them; from then on the People panel is
+    scraped every `roster_seconds` and departures are taken from it instead.
+    """
+    def __init__(self, driver, poll_timeout=30, reconcile_seconds=30, roster_seconds=300):
+        self.driver = driver
+        self.poll_timeout = poll_timeout
+        self.reconcile_seconds = reconcile_seconds
+        self.roster_seconds = roster_seconds
+        self.tiles_complete = True
+        self._last_roster = None
+
+    def install(self):
+        self.driver.execute_script(MONITOR_SCRIPT, LEAVE_BUTTON_SELECTOR, int(self.reconcile_seconds * 1000),
+                                   self.tiles_complete)
+
+    def set_tiles_complete(self, complete):
+        """
+        Tells the monitor whether every participant has a tile on screen, e.g.
+        False once the layout is switched to spotlight or capped to a few tiles.
+        """
+        if complete == self.tiles_complete:
+            return
+        self.tiles_complete = complete
+        self._last_roster = None
+        self.driver.execute_script(TILES_COMPLETE_SCRIPT, complete)
+
+    def reconcile_roster(self):
+        """
+        Scrapes the People panel and reports whoever joined or left since the
+        last roster. A roster without participant ids is not trusted.
+        """
+        self._last_roster = time.monotonic()
+        participants = scrape_participants(self.driver)
+        if not participants or any(p["id"].startswith(("unknown_", "extracted_")) for p in participants):
+            return False
+        return bool(self.driver.execute_script(ROSTER_SCRIPT, [{"id": p["id"], "name": p["name"]}
+                                                               for p in participants if not p["is_self"]]))
+
+    def wait_for_events(self, timeout=None):
+        """
+        Blocks until at least one event is available or `timeout` seconds pass.
+        Returns a list of event dictionaries (possibly empty).
+        If the page navigated and lost the observer, the observer is reinstalled and a
+        synthetic 'left_call' is returned when the bot is no longer in the call.
+        """
+        timeout = self.poll_timeout if timeout is None else timeout
+        # Give WebDriver a little headroom over the in-page timer.
+        self.driver.set_script_timeout(timeout + 5)
+        try:
+            events = self.driver.execute_async_script(WAIT_SCRIPT, int(timeout * 1000))
+        except TimeoutException:
+            return []
+
+        POLLS.inc()
+        if events is None:
+            in_call = bool(self.driver.find_elements("css selector", LEAVE_BUTTON_SELECTOR))
+            self.install()
+            if not in_call:
+                events = [{"type": "left_call", "time": int(time.time() * 1000)}]
+            else:
+                return []
+        for event in events:
+            EVENTS.inc(type=event.get("type"))
+        return events
+
+    def wait_for_end(self, on_event=None, on_poll=None):
+        """
+        Blocks until the meeting ends for the bot and returns the ending event.
+        `on_event` is called with every event received along the way.
+        `on_poll` is called after every poll, on the thread that owns the driver,
+        for other work that needs the driver while the meeting runs. If it
+        returns an event, monitoring stops and that event is returned.
+        """
+        self.install()
+        while True:
+            try:
+                events = self.wait_for_events()
+                stop_event = on_poll() if on_poll else None
+                if stop_event:
+                    return stop_event
+                if not self.tiles_complete and (self._last_roster is None
+                                                or time.monotonic() - self._last_roster >= self.roster_seconds):
+                    self.reconcile_roster()
+            except WebDriverException as e:
+                # The browser went away, which ends the recording just the same.
+                print(f"⚠️ Lost the browser while monitoring the meeting. Error: {e}")
+                return {"type": "browser_lost", "time": int(time.time() * 1000)}
+
+            for event in events:
+                if on_event:
+                    on_event(event)
+                if event["type"] in END_EVENTS:
+                    return event
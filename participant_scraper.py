@@ -0,0 +1,233 @@
+from selenium.common.exceptions import WebDriverException
+
+from selector_registry import get_registry
+import telemetry
+
+SCRAPE_SECONDS = telemetry.REGISTRY.histogram("meetbot_scrape_seconds", "In-page participant scrape duration.")
+SCRAPE_FAILURES = telemetry.REGISTRY.counter("meetbot_scrape_failures_total", "Participant scrapes that found nothing.")
+
+# The same selector-strategy chain as browser_handler.get_participant_names(),
+# but evaluated inside the page in a single execute_async_script call. The
+# strategies themselves live in selector_registry.py, ordered by recent success.
+IGNORED_PANEL_LINES = ["In this call", "Mute", "Pin", "More options"]
+
+SCRAPE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var cfg = arguments[0];
+var started = performance.now();
+var result = {participants: [], button: null, panel: null, strategy: null, error: null};
+
+function visible(el) { return !!(el && el.getClientRects().length); }
+function firstLine(text) { return (text || "").trim().split("\\n")[0].trim(); }
+function finish() {
+    result.elapsed_ms = Math.round(performance.now() - started);
+    done(result);
+}
+
+function findButton() {
+    for (var i = 0; i < cfg.buttons.length; i++) {
+        var el = document.evaluate(cfg.buttons[i], document, null,
+                                   XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (el && visible(el) && !el.disabled) { result.button = cfg.buttons[i]; return el; }
+    }
+    return null;
+}
+
+function findPanel() {
+    for (var i = 0; i < cfg.panels.length; i++) {
+        var el = document.querySelector(cfg.panels[i]);
+        if (visible(el)) { result.panel = cfg.panels[i]; return el; }
+    }
+    return null;
+}
+
+function panelPopulated() {
+    var panel = findPanel();
+    return panel && panel.querySelector("[data-participant-id], [role='listitem']") ? panel : null;
+}
+
+function isSelf(el) {
+    return !!el.querySelector("[data-self-name]") || /\\(You\\)/.test(el.textContent || "");
+}
+
+function nameOf(el) {
+    for (var i = 0; i < cfg.names.length; i++) {
+        var nameEl = el.querySelector(cfg.names[i]);
+        if (nameEl && firstLine(nameEl.textContent)) { return firstLine(nameEl.textContent); }
+    }
+    return firstLine(el.innerText || el.textContent);
+}
+
+function extract(panel) {
+    var scope = panel || document;
+    var seen = {};
+    // Strategy 1: elements carrying data-participant-id.
+    scope.querySelectorAll("div[data-participant-id]").forEach(function (el) {
+        var id = el.getAttribute("data-participant-id");
+        var name = nameOf(el);
+        if (id && name && !seen[id]) {
+            seen[id] = true;
+            result.participants.push({id: id, name: name, is_self: isSelf(el)});
+        }
+    });
+    if (result.participants.length) { result.strategy = "participant_id"; return; }
+
+    // Strategy 2: name elements, with the id taken from the closest ancestor if any.
+    for (var i = 0; i < cfg.names.length; i++) {
+        var nameEls = document.querySelectorAll(cfg.names[i]);
+        if (!nameEls.length) { continue; }
+        nameEls.forEach(function (el, idx) {
+            var name = firstLine(el.textContent);
+            if (!name) { return; }
+            var holder = el.closest("[data-participant-id]");
+            result.participants.push({id: holder ? holder.getAttribute("data-participant-id") : "unknown_" + idx,
+                                      name: name,
+                                      is_self: el.hasAttribute("data-self-name") || !!(holder && isSelf(holder))});
+        });
+        result.strategy = "name_elements";
+        return;
+    }
+
+    // Strategy 3: raw text of the panel.
+    if (panel) {
+        (panel.innerText || "").split("\\n").forEach(function (line, idx) {
+            line = line.trim();
+            if (line === "(You)" && result.participants.length) {
+                // Meet puts "(You)" on the line under the bot's own name.
+                result.participants[result.participants.length - 1].is_self = true;
+            } else if (line.length > 1 && cfg.ignored.indexOf(line) === -1) {
+                result.participants.push({id: "extracted_" + idx, name: line.replace(/\s*\(You\)$/, ""),
+                                          is_self: /\(You\)$/.test(line)});
+            }
+        });
+        result.strategy = "panel_text";
+    }
+}
+
+// Probe every candidate of every group at once, so the registry learns about
+// all strategies from each run, not just the first one that matched. Each
+// probe is timed on its own: {selector: {hit, ms}}.
+function timed(probe) {
+    var t = performance.now();
+    var hit = probe();
+    return {hit: hit, ms: Math.round((performance.now() - t) * 1000) / 1000};
+}
+
+function probeAll(panel) {
+    var probes = {buttons: {}, panels: {}, names: {}};
+    cfg.buttons.forEach(function (xpath) {
+        probes.buttons[xpath] = timed(function () {
+            return visible(document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE,
+                                             null).singleNodeValue);
+        });
+    });
+    cfg.panels.forEach(function (selector) {
+        probes.panels[selector] = timed(function () { return visible(document.querySelector(selector)); });
+    });
+    var scope = panel || document;
+    cfg.names.forEach(function (selector) {
+        probes.names[selector] = timed(function () { return !!scope.querySelector(selector); });
+    });
+    result.probes = probes;
+}
+
+var opened = false;
+var button = null;
+function complete(panel) {
+    extract(panel);
+    probeAll(panel);
+    if (opened && button) { button.click(); }
+    finish();
+}
+
+var panel = panelPopulated();
+if (panel) { complete(panel); return; }
+
+button = findButton();
+if (!button) {
+    result.error = "participants_button_not_found";
+    probeAll(null);
+    finish();
+    return;
+}
+button.click();
+opened = true;
+
+// Wait for the panel to be visible and populated, then for its list to stop
+// changing for a short quiet period, instead of sleeping a fixed amount.
+var quietTimer = null;
+var deadline = setTimeout(function () {
+    observer.disconnect();
+    complete(findPanel());
+}, cfg.timeout_ms);
+function armQuietTimer() {
+    if (!panelPopulated()) { return; }
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(function () {
+        observer.disconnect();
+        clearTimeout(deadline);
+        complete(findPanel());
+    }, cfg.quiet_ms);
+}
+var observer = new MutationObserver(armQuietTimer);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+// The click may have rendered the panel synchronously, before the observer
+// existed; then no mutation will ever arrive to start the quiet period.
+armQuietTimer();
+"""
+
+def scrape_participants(driver, timeout=10, quiet_ms=150):
+    """
+    Scrapes the participant list in one WebDriver round trip.
+    Opens the People panel if needed, waits for it to render (event-based),
+    extracts every participant and closes the panel again.
+    Returns a list of {'id', 'name', 'is_self'} dictionaries, empty on failure.
+    """
+    registry = get_registry()
+    config = {
+        "buttons": registry.ordered("participants_button"),
+        "panels": registry.ordered("participants_panel"),
+        "names": registry.ordered("participant_name"),
+        "ignored": IGNORED_PANEL_LINES,
+        "timeout_ms": int(timeout * 1000),
+        "quiet_ms": quiet_ms,
+    }
+    print("🕵️‍♂️ Scraping participants with a single in-page script...")
+    try:
+        driver.set_script_timeout(timeout + 5)
+        result = driver.execute_async_script(SCRAPE_SCRIPT, config)
+    except WebDriverException as e:
+        print(f"❌ Participant scraping script failed. Error: {e}")
+        SCRAPE_FAILURES.inc(reason="webdriver")
+        return []
+
+    probes = result.get("probes") or {}
+    for group, key in (("participants_button", "buttons"), ("participants_panel", "panels"),
+                       ("participant_name", "names")):
+        registry.record_probes(group, probes.get(key, {}))
+    registry.save()
+    if result.get("elapsed_ms") is not None:
+        SCRAPE_SECONDS.observe(result["elapsed_ms"] / 1000)
+
+    if result.get("error"):
+        print(f"   - ❌ Scraping failed: {result['error']}")
+        SCRAPE_FAILURES.inc(reason="not_found")
+        telemetry.log("scrape_failed", error=result["error"])
+        return []
+
+    participants = result["participants"]
+    print(f"✅ Scraped {len(participants)} participants in {result['elapsed_ms']} ms "
+          f"(button: {result['button']}, panel: {result['panel']}, strategy: {result['strategy']}).")
+    return participants
+
+def scrape_participant_names(driver, **kwargs):
+    """
+    Returns the unique participant names, like browser_handler.get_participant_names_only().
+    """
+    seen_ids = set()
+    names = []
+    for p in scrape_participants(driver, **kwargs):
+        if p["id"] not in seen_ids:
+            seen_ids.add(p["id"])
+            names.append(p["name"])
+    return names
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+class ParticipantTimeline:
+    """
+    Tracks who was in the meeting and when, from the participant_joined /
+    participant_left events that MeetingMonitor reports from DOM diffs.
+
+    Each participant (keyed by data-participant-id) keeps a list of
+    [joined, left] intervals. Quick reconnects within `merge_gap_seconds` are
+    folded into the previous interval, and once a participant has more than
+    `max_intervals` intervals the two closest ones are merged, so memory per
+    participant stays bounded however much churn an 8-hour meeting has.
+    """
+    def __init__(self, merge_gap_seconds=30, max_intervals=32):
+        self.merge_gap_seconds = merge_gap_seconds
+        self.max_intervals = max_intervals
+        self._names = {}
+        self._intervals = {}
+        self._open = {}
+
+    def handle_event(self, event):
+        """
+        Feeds one monitor event into the timeline. Other event types are ignored.
+        """
+        if event["type"] == "participant_joined":
+            self.joined(event["id"], event.get("name"), event["time"] / 1000)
+        elif event["type"] == "participant_left":
+            self.left(event["id"], event["time"] / 1000)
+
+    def joined(self, participant_id, name, timestamp):
+        if name:
+            self._names[participant_id] = name
+        if participant_id in self._open:
+            return
+
+        intervals = self._intervals.get(participant_id)
+        if intervals and timestamp - intervals[-1][1] <= self.merge_gap_seconds:
+            # A reconnect: reopen the last interval instead of starting a new one.
+            self._open[participant_id] = intervals.pop()[0]
+        else:
+            self._open[participant_id] = timestamp
+
+    def left(self, participant_id, timestamp):
+        started = self._open.pop(participant_id, None)
+        if started is None:
+            return
+        intervals = self._intervals.setdefault(participant_id, [])
+        intervals.append([started, timestamp])
+        if len(intervals) > self.max_intervals:
+            self._merge_closest(intervals)
+
+    def _merge_closest(self, intervals):
+        gaps = [intervals[i + 1][0] - intervals[i][1] for i in range(len(intervals) - 1)]
+        i = gaps.index(min(gaps))
+        intervals[i:i + 2] = [[intervals[i][0], intervals[i + 1][1]]]
+
+    def present_at(self, timestamp):
+        """
+        Returns the ids of participants present at the given UNIX timestamp.
+        """
+        present = {pid for pid, started in self._open.items() if started <= timestamp}
+        for pid, intervals in self._intervals.items():
+            if any(start <= timestamp <= end for start, end in intervals):
+                present.add(pid)
+        return present
+
+    def close(self, timestamp):
+        """
+        Ends every open interval, e.g. when the recording stops.
+        """
+        for participant_id in list(self._open):
+            self.left(participant_id, timestamp)
+
+    def to_list(self):
+        """
+        Serializes the timeline for store_metadata().
+        """
+        timeline = []
+        for participant_id in set(self._intervals) | set(self._open):
+            intervals = list(self._intervals.get(participant_id, []))
+            if participant_id in self._open:
+                intervals.append([self._open[participant_id], None])
+            timeline.append({
+                "id": participant_id,
+                "name": self._names.get(participant_id, participant_id),
+                "intervals": [
+                    {"joined_utc": datetime.utcfromtimestamp(start),
+                     "left_utc": datetime.utcfromtimestamp(end) if end is not None else None}
+                    for start, end in intervals
+                ],
+                "total_seconds": round(sum(end - start for start, end in intervals if end is not None)),
+            })
+        return sorted(timeline, key=lambda p: p["intervals"][0]["joined_utc"] if p["intervals"] else datetime.max)
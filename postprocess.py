@@ -0,0 +1,357 @@
+import atexit
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+# Leading/trailing stretches quieter than NOISE_DB (audio) or darker than the
+# blackdetect threshold (video) for at least MIN_DEAD_SECONDS count as dead time.
+NOISE_DB = -50
+MIN_DEAD_SECONDS = 2.0
+# Only this much of the start and the end is decoded to look for dead time, so
+# the cost of trimming does not grow with the length of the meeting.
+SCAN_SECONDS = 300
+# Kept around the detected content so speech is never clipped.
+PADDING_SECONDS = 1.0
+
+PROXY_ARGS = ["-vf", "scale=-2:360,fps=10", "-c:v", "libx264", "-preset", "veryfast", "-crf", "32",
+              "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "48k", "-ac", "1", "-threads", "2"]
+
+SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+BLACK_RE = re.compile(r"black_start:\s*(-?[\d.]+)\s+black_end:\s*(-?[\d.]+)")
+
+def probe(path):
+    """
+    Returns {'duration', 'start_time', 'has_video', 'has_audio'} for a media
+    file using ffprobe. 'duration' is None when the container does not record
+    it (e.g. a MediaRecorder .webm). Returns None if ffprobe fails.
+    """
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration,start_time:stream=codec_type",
+               "-of", "json", path]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True, timeout=60).stdout
+        info = json.loads(output)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        print(f"⚠️ Could not probe '{path}'. Error: {e}")
+        return None
+    types = {stream.get("codec_type") for stream in info.get("streams", [])}
+    duration = info.get("format", {}).get("duration")
+    start_time = info.get("format", {}).get("start_time")
+    return {
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "start_time": float(start_time) if start_time not in (None, "N/A") else 0.0,
+        "has_video": "video" in types,
+        "has_audio": "audio" in types,
+    }
+
+def parse_dead_intervals(stderr):
+    """
+    Parses silencedetect/blackdetect output into {'audio': [...], 'video': [...]}
+    lists of (start, end) intervals. An end of None means the interval was
+    still open when the scanned window ended.
+    """
+    intervals = {"audio": [], "video": []}
+    for line in stderr.splitlines():
+        for kind, value in SILENCE_RE.findall(line):
+            if kind == "start":
+                intervals["audio"].append((float(value), None))
+            elif intervals["audio"] and intervals["audio"][-1][1] is None:
+                intervals["audio"][-1] = (intervals["audio"][-1][0], float(value))
+        for start, end in BLACK_RE.findall(line):
+            intervals["video"].append((float(start), float(end)))
+    return intervals
+
+def _scan(path, start, length, has_video, has_audio):
+    """
+    Runs silencedetect/blackdetect over [start, start + length) of the file.
+    -copyts keeps the reported times relative to the whole file.
+    """
+    command = ["ffmpeg", "-hide_banner", "-nostats", "-ss", f"{start:.3f}", "-t", f"{length:.3f}",
+               "-copyts", "-i", path]
+    if has_video:
+        command += ["-map", "0:v:0", "-vf", f"blackdetect=d={MIN_DEAD_SECONDS}:pix_th=0.10"]
+    if has_audio:
+        command += ["-map", "0:a:0", "-af", f"silencedetect=noise={NOISE_DB}dB:d={MIN_DEAD_SECONDS}"]
+    command += ["-f", "null", "-"]
+    completed = subprocess.run(command, capture_output=True, timeout=max(600, length * 2))
+    return parse_dead_intervals(completed.stderr.decode(errors="replace"))
+
+def _leading_dead_end(intervals, window_start, window_end, tolerance=0.5):
+    for start, end in intervals:
+        if start <= window_start + tolerance:
+            return window_end if end is None else end
+    return window_start
+
+def _trailing_dead_start(intervals, duration, tolerance=0.5):
+    for start, end in intervals:
+        if end is None or end >= duration - tolerance:
+            return start
+    return duration
+
+def detect_content_bounds(path, info, scan_seconds=SCAN_SECONDS):
+    """
+    Returns (start, end) of the part of the recording that has content: the
+    first moment anything is audible and the last one. A screen capture of
+    the Meet UI is never black, so video only decides the bounds of
+    recordings without audio. Only the first and last `scan_seconds` of that
+    one signal are decoded.
+    """
+    duration = info["duration"]
+    kind = "audio" if info["has_audio"] else "video" if info["has_video"] else None
+    if not duration or not kind:
+        return 0.0, duration
+
+    window = min(scan_seconds, duration)
+    head = _scan(path, 0, window, kind == "video", kind == "audio")
+    start = _leading_dead_end(head[kind], 0, window)
+
+    tail_start = max(0.0, duration - window)
+    tail = head if tail_start == 0 else _scan(path, tail_start, window, kind == "video", kind == "audio")
+    end = _trailing_dead_start(tail[kind], duration)
+    return start, end
+
+def keyframe_before(path, position, start_time=0.0, search_seconds=60):
+    """
+    Returns the time of the last video keyframe at or before `position`
+    (seconds from the start of the file), which is where a stream-copy cut
+    at `position` really begins. Returns 0.0 if there is none within
+    `search_seconds`, or if the keyframes cannot be read.
+    """
+    lower = start_time + max(0.0, position - search_seconds)
+    command = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+               "-show_entries", "frame=pts_time,best_effort_timestamp_time",
+               "-read_intervals", f"{lower:.3f}%{start_time + position + 0.001:.3f}", "-of", "json", path]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True, timeout=60).stdout
+        frames = json.loads(output).get("frames", [])
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        print(f"⚠️ Could not read keyframes of '{path}'. Error: {e}")
+        return 0.0
+    keyframes = []
+    for frame in frames:
+        value = frame.get("pts_time", frame.get("best_effort_timestamp_time"))
+        if value not in (None, "N/A") and float(value) - start_time <= position + 0.001:
+            keyframes.append(float(value) - start_time)
+    return max(keyframes, default=0.0)
+
+def _run_ffmpeg(command, description):
+    completed = subprocess.run(command, capture_output=True)
+    if completed.returncode != 0:
+        tail = completed.stderr.decode(errors="replace").strip().splitlines()[-3:]
+        raise RuntimeError(f"{description} failed: {' | '.join(tail)}")
+
+def remux(path, output_path, start=0.0, end=None, faststart=True):
+    """
+    Copies the streams of `path` into `output_path` without re-encoding,
+    optionally cut to [start, end]. Stream copy cuts on keyframes, so the cut
+    can begin up to one GOP earlier than `start`; pass a keyframe time from
+    keyframe_before() to know exactly where it begins.
+    """
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    if start:
+        # Full precision, so a keyframe time from keyframe_before() is not rounded to just before it.
+        command += ["-ss", f"{start:.6f}"]
+    command += ["-i", path]
+    if end is not None:
+        command += ["-t", f"{end - start:.3f}"]
+    command += ["-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero"]
+    if faststart and output_path.endswith(".mp4"):
+        # Moves the moov atom to the front so playback can start before the whole object is downloaded.
+        command += ["-movflags", "+faststart"]
+    command.append(output_path)
+    _run_ffmpeg(command, "Remux")
+
+def _readable(info):
+    return bool(info and (info["duration"] or info["has_video"] or info["has_audio"]))
+
+def salvage(path):
+    """
+    Checks that a capture cut short by a crash can still be read, remuxing it
+    if ffprobe cannot make sense of it as written: a fragmented MP4 or a WebM
+    only loses its unfinished tail that way. Returns True if the file is
+    readable (replaced by the remux if one was needed), False if it is not,
+    and None if ffmpeg/ffprobe are missing and it could not be checked.
+    """
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        return None
+    if _readable(probe(path)):
+        return True
+    stem, ext = os.path.splitext(path)
+    repaired_path = f"{stem}.repaired{ext}"
+    try:
+        remux(path, repaired_path)
+        if _readable(probe(repaired_path)):
+            os.replace(repaired_path, path)
+            print(f"🩹 Remuxed the interrupted recording '{path}' into a readable file.")
+            return True
+    except RuntimeError as e:
+        print(f"⚠️ Could not remux the interrupted recording '{path}'. Error: {e}")
+    finally:
+        if os.path.exists(repaired_path):
+            os.remove(repaired_path)
+    return False
+
+def make_proxy(path, proxy_path):
+    """
+    Encodes a small 360p/10 fps preview of the recording.
+    """
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", path,
+               "-map", "0:v:0", "-map", "0:a:0?"] + PROXY_ARGS + ["-movflags", "+faststart", proxy_path]
+    _run_ffmpeg(command, "Proxy encode")
+
+def proxy_path_for(path):
+    stem, _ = os.path.splitext(path)
+    return f"{stem}_proxy.mp4"
+
+def postprocess_recording(path, trim=True, faststart=True, proxy=False):
+    """
+    Trims leading/trailing dead time, remuxes for fast start and optionally
+    makes a low-bitrate proxy. The recording is replaced in place, so every
+    later stage (and crash recovery) keeps using the same path.
+    Returns the media details stored with the metadata, including the final
+    file's CRC32C for de-duplication. Any failure leaves the original file untouched.
+    """
+    media = _process(path, trim, faststart, proxy)
+    # Imported here so the pool workers only load the GCS client when they need it.
+    from gcp_handler import file_crc32c
+    media["content_crc32c"] = file_crc32c(path)
+    return media
+
+def content_times(start_time, end_time, media):
+    """
+    Shifts the capture's start and end times by the dead time trimmed off
+    each end, so the stored times describe the media that was kept. The
+    offsets themselves stay in `media`.
+    """
+    media = media or {}
+    if start_time and media.get("trimmed_start_seconds"):
+        start_time = start_time + timedelta(seconds=media["trimmed_start_seconds"])
+    if end_time and media.get("trimmed_end_seconds"):
+        end_time = end_time - timedelta(seconds=media["trimmed_end_seconds"])
+    return start_time, end_time
+
+def _process(path, trim, faststart, proxy):
+    original_size = os.path.getsize(path)
+    media = {"size_bytes": original_size, "original_size_bytes": original_size}
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        print("⚠️ ffmpeg/ffprobe not found; uploading the recording as recorded.")
+        return media
+
+    info = probe(path)
+    if not info:
+        return media
+    media["duration_seconds"] = media["original_duration_seconds"] = info["duration"]
+
+    tmp_path = f"{os.path.splitext(path)[0]}.processing{os.path.splitext(path)[1]}"
+    try:
+        if trim or faststart:
+            start, end = detect_content_bounds(path, info) if trim else (0.0, info["duration"])
+            duration = info["duration"]
+            if duration and end is not None and end > start:
+                start = max(0.0, start - PADDING_SECONDS)
+                end = min(duration, end + PADDING_SECONDS)
+                # Not worth a cut for less than a couple of seconds.
+                if start < MIN_DEAD_SECONDS:
+                    start = 0.0
+                if duration - end < MIN_DEAD_SECONDS:
+                    end = None
+                if start and info["has_video"]:
+                    # Cut exactly on the keyframe the stream copy would start from anyway,
+                    # so the trimmed seconds stored below are the ones really removed.
+                    start = keyframe_before(path, start, info.get("start_time") or 0.0)
+            else:
+                start, end = 0.0, None
+
+            remux(path, tmp_path, start, end, faststart)
+            os.replace(tmp_path, path)
+            processed = probe(path) or {}
+            media.update({
+                "duration_seconds": processed.get("duration") or info["duration"],
+                "size_bytes": os.path.getsize(path),
+                "trimmed_start_seconds": round(start, 3),
+                "trimmed_end_seconds": round(duration - end, 3) if duration and end is not None else 0.0,
+                "faststart": faststart and path.endswith(".mp4"),
+            })
+            print(f"✂️  Post-processed '{path}': trimmed {media['trimmed_start_seconds']}s / "
+                  f"{media['trimmed_end_seconds']}s, {original_size / 1e6:.1f} MB -> "
+                  f"{media['size_bytes'] / 1e6:.1f} MB.")
+
+        if proxy and info["has_video"]:
+            proxy_path = proxy_path_for(path)
+            make_proxy(path, proxy_path)
+            media["proxy_path"] = proxy_path
+            media["proxy_size_bytes"] = os.path.getsize(proxy_path)
+            print(f"🎞️  Proxy written to '{proxy_path}' ({media['proxy_size_bytes'] / 1e6:.1f} MB).")
+    except Exception as e:
+        print(f"❌ Post-processing failed, keeping the recording as recorded. Error: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return media
+
+def _lower_priority():
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+class PostProcessor:
+    """
+    Runs postprocess_recording() in a bounded pool of low-priority worker
+    processes, so trimming and proxy encodes never compete with live recorders
+    for more than `max_workers` cores.
+
+    `slots` is an optional semaphore shared between processes (the scheduler
+    hands one to every worker) that bounds post-processing across the host.
+    """
+    def __init__(self, max_workers=None, slots=None):
+        self.max_workers = max_workers or int(os.environ.get("POSTPROCESS_WORKERS", "2"))
+        self.slots = slots
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_lower_priority)
+            return self._pool
+
+    def process(self, path, **options):
+        """
+        Post-processes one recording and returns its media details.
+        Blocks until a slot is free and the work is done.
+        """
+        if self.slots is not None:
+            self.slots.acquire()
+        try:
+            return self._get_pool().submit(postprocess_recording, path, **options).result()
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+_postprocessor = None
+_postprocessor_lock = threading.Lock()
+
+def get_postprocessor(slots=None):
+    """
+    Returns the process-wide PostProcessor, creating it on first use.
+    """
+    global _postprocessor
+    with _postprocessor_lock:
+        if _postprocessor is None:
+            _postprocessor = PostProcessor(slots=slots)
+            atexit.register(_postprocessor.close)
+        elif slots is not None:
+            _postprocessor.slots = slots
+        return _postprocessor
@@ -0,0 +1,138 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+# Evaluates a condition inside the page every `interval` ms and resolves as soon
+# as it returns something truthy, so a wait costs one WebDriver round trip and
+# finishes within one interval of the page actually being ready.
+WAIT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var condition = new Function(arguments[0]);
+var timeoutMs = arguments[1];
+var interval = arguments[2];
+var started = Date.now();
+(function check() {
+    var value = null;
+    try { value = condition(); } catch (e) { value = null; }
+    if (value) { done(value); return; }
+    if (Date.now() - started >= timeoutMs) { done(null); return; }
+    setTimeout(check, interval);
+})();
+"""
+
+# Ready once the document has loaded and no new resource has finished for a
+# quiet period. Meet keeps long-lived connections open, so "no requests in
+# flight" never happens; "no new completed requests" is the usable signal.
+NETWORK_IDLE_CONDITION = """
+if (document.readyState !== "complete") { return null; }
+var count = performance.getEntriesByType("resource").length;
+var state = window.__meetBotIdle || (window.__meetBotIdle = {count: -1, since: Date.now()});
+if (count !== state.count) { state.count = count; state.since = Date.now(); return null; }
+return Date.now() - state.since >= %d ? true : null;
+"""
+
+# Finds every lobby control in one pass over the page's buttons.
+LOBBY_CONTROLS_CONDITION = """
+var controls = {not_now: null, mic: null, camera: null, join: null};
+var buttons = document.querySelectorAll("button, [role='button']");
+for (var i = 0; i < buttons.length; i++) {
+    var b = buttons[i];
+    if (!b.getClientRects().length) { continue; }
+    var label = (b.getAttribute("aria-label") || "").toLowerCase();
+    var text = (b.innerText || "").trim();
+    if (!controls.not_now && text.indexOf("Not now") !== -1) { controls.not_now = b; }
+    if (!controls.mic && label.indexOf("microphone") !== -1) { controls.mic = b; }
+    if (!controls.camera && label.indexOf("camera") !== -1) { controls.camera = b; }
+    if (!controls.join && (text.indexOf("Join now") !== -1 || text.indexOf("Ask to join") !== -1) && !b.disabled) {
+        controls.join = b;
+    }
+}
+window.__meetBotLobby = controls;
+return controls.join ? true : null;
+"""
+
+# Dismisses the notification pop-up, turns the mic and camera off (only if they
+# are on, so a control is never toggled back on) and clicks join.
+PREPARE_AND_JOIN_SCRIPT = """
+var c = window.__meetBotLobby;
+var done = {not_now: false, mic: false, camera: false, join: null};
+if (c.not_now) { c.not_now.click(); done.not_now = true; }
+function turnOff(button) {
+    if (!button) { return false; }
+    var label = (button.getAttribute("aria-label") || "").toLowerCase();
+    var isOn = label.indexOf("turn off") !== -1 || button.getAttribute("data-is-muted") === "false";
+    if (isOn) { button.click(); }
+    return isOn;
+}
+done.mic = turnOff(c.mic);
+done.camera = turnOff(c.camera);
+done.join = (c.join.innerText || "").trim();
+c.join.click();
+return done;
+"""
+
+ADMISSION_CONDITION = """
+if (document.querySelector("button[aria-label='Leave call']")) { return "admitted"; }
+var text = document.body ? document.body.innerText : "";
+if (text.indexOf("You can't join this call") !== -1 || text.indexOf("denied your request") !== -1) {
+    return "denied";
+}
+return null;
+"""
+
+class StepTimer:
+    """
+    Records how long each step of a flow takes, in seconds.
+    """
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.timings[step] = round(now - self._last, 3)
+        self._last = now
+
+    @property
+    def total(self):
+        return round(self._last - self._started, 3)
+
+def wait_for(driver, condition, timeout=10, interval_ms=50):
+    """
+    Waits until the JavaScript `condition` (a function body) returns something
+    truthy in the page. Returns that value, or None on timeout. Long waits are
+    split into 30 s script calls so WebDriver's HTTP timeout is never hit.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        chunk = min(remaining, 30)
+        driver.set_script_timeout(chunk + 5)
+        try:
+            value = driver.execute_async_script(WAIT_SCRIPT, condition, int(chunk * 1000), interval_ms)
+        except TimeoutException:
+            value = None
+        if value:
+            return value
+
+def wait_for_network_idle(driver, quiet_ms=500, timeout=15):
+    return wait_for(driver, NETWORK_IDLE_CONDITION % quiet_ms, timeout)
+
+def wait_for_lobby_controls(driver, timeout=20):
+    """
+    Waits until the join button is rendered, and resolves the mic, camera,
+    join and 'Not now' controls in the same script.
+    """
+    return bool(wait_for(driver, LOBBY_CONTROLS_CONDITION, timeout))
+
+def prepare_and_join(driver):
+    return driver.execute_script(PREPARE_AND_JOIN_SCRIPT)
+
+def wait_for_admission(driver, timeout=300):
+    """
+    Returns 'admitted', 'denied', or None if nobody let the bot in before `timeout`.
+    """
+    return wait_for(driver, ADMISSION_CONDITION, timeout, interval_ms=100)
@@ -0,0 +1,202 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+
+from streaming_upload import FRAGMENTED_MP4_FLAGS
+import telemetry
+
+ENCODER_FPS = telemetry.REGISTRY.gauge("meetbot_encoder_fps", "FFmpeg encoding frame rate.")
+ENCODER_SPEED = telemetry.REGISTRY.gauge("meetbot_encoder_speed", "FFmpeg speed relative to realtime.")
+ENCODER_DROPPED = telemetry.REGISTRY.gauge("meetbot_encoder_dropped_frames", "Frames FFmpeg dropped so far.")
+
+# Encoder settings per use case. CPU cost grows roughly with fps x pixels, so
+# pick the cheapest preset that still serves the recording's purpose.
+PRESETS = {
+    # Transcription only: no video stream at all.
+    "audio_only": {
+        "video": None,
+        "audio": ["-c:a", "libopus", "-b:a", "32k", "-ac", "1", "-application", "voip"],
+    },
+    # Screen shares and slides: few frames, encoder tuned for static content.
+    "slides": {
+        "video": {"fps": 5, "size": "1280x720",
+                  "codec": ["-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+                            "-crf", "30", "-pix_fmt", "yuv420p", "-g", "50"]},
+        "audio": ["-c:a", "aac", "-b:a", "64k"],
+    },
+    # Camera feeds and full-motion content.
+    "full_motion": {
+        "video": {"fps": 25, "size": "1280x720",
+                  "codec": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "26",
+                            "-pix_fmt", "yuv420p", "-g", "50"]},
+        "audio": ["-c:a", "aac", "-b:a", "96k"],
+    },
+}
+
+class Recorder:
+    """
+    Records the screen and meeting audio to an MP4 with FFmpeg.
+
+    FFmpeg runs as a managed subprocess: on Linux it grabs an X11/Xvfb display
+    and a PulseAudio source (e.g. a null sink's monitor); on Windows it falls
+    back to gdigrab plus the VB-Cable device. Each recorder can be capped to a
+    number of encoder threads and a nice level so many of them can share a host,
+    and it reports encoder fps, speed and dropped frames through get_stats().
+    """
+    def __init__(self, output_path, preset="full_motion", display=None, screen_size="1920x1080",
+                 audio_source=None, threads=2, nice=10, fragmented=False):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown recorder preset '{preset}'. Choose one of: {', '.join(PRESETS)}")
+        self.output_path = output_path
+        self.preset = preset
+        self.display = display or os.environ.get("DISPLAY", ":0")
+        self.screen_size = screen_size
+        self.audio_source = audio_source or os.environ.get("PULSE_SOURCE", "default")
+        self.threads = threads
+        self.nice = nice
+        self.fragmented = fragmented
+        self.process = None
+        self.stats = {}
+        self._progress_thread = None
+        self._stderr_tail = []
+
+    def _input_args(self, video):
+        # A deep input queue keeps short encoder stalls from dropping captured frames.
+        queue = ["-thread_queue_size", "1024"]
+        args = []
+        if sys.platform.startswith("win"):
+            if video:
+                args += queue + ["-f", "gdigrab", "-framerate", str(video["fps"]), "-i", "desktop"]
+            args += queue + ["-f", "dshow", "-i", "audio=CABLE Output (VB-Audio Virtual Cable)"]
+        else:
+            if video:
+                args += queue + ["-f", "x11grab", "-draw_mouse", "0", "-framerate", str(video["fps"]),
+                                 "-video_size", self.screen_size, "-i", self.display]
+            args += queue + ["-f", "pulse", "-i", self.audio_source]
+        return args
+
+    def build_command(self):
+        """
+        Returns the FFmpeg command line for this recorder.
+        """
+        preset = PRESETS[self.preset]
+        video = preset["video"]
+
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "warning", "-nostats",
+                   "-progress", "pipe:1", "-y", "-filter_threads", "1"]
+        command += self._input_args(video)
+        if video:
+            command += ["-vf", f"scale={video['size'].replace('x', ':')}"]
+            command += video["codec"]
+            if video["codec"][1] == "libx264":
+                command += ["-x264-params", f"threads={self.threads}"]
+        else:
+            command += ["-vn"]
+        command += preset["audio"]
+        command += ["-threads", str(self.threads)]
+        if self.fragmented:
+            command += FRAGMENTED_MP4_FLAGS
+        command.append(self.output_path)
+        return command
+
+    def start_recording(self):
+        if not shutil.which("ffmpeg"):
+            raise RuntimeError("ffmpeg was not found on PATH")
+
+        command = self.build_command()
+        print(f"🎥 Starting FFmpeg recorder ({self.preset}) -> {self.output_path}")
+        kwargs = {}
+        if os.name == "posix" and self.nice and shutil.which("nice"):
+            # Not preexec_fn: this process already runs threads (metrics, Mongo
+            # flusher, lease heartbeat), and preexec_fn can deadlock the child then.
+            command = ["nice", "-n", str(self.nice)] + command
+        elif os.name != "posix" and self.nice:
+            kwargs["creationflags"] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, **kwargs)
+        if os.name == "posix" and self.nice and command[0] != "nice":
+            try:
+                os.setpriority(os.PRIO_PROCESS, self.process.pid, os.getpriority(os.PRIO_PROCESS, 0) + self.nice)
+            except OSError as e:
+                print(f"⚠️ Could not lower the recorder's priority. Error: {e}")
+        self._progress_thread = threading.Thread(target=self._read_progress, daemon=True)
+        self._progress_thread.start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+    def _read_progress(self):
+        """
+        Parses FFmpeg's -progress key=value blocks into self.stats.
+        """
+        block = {}
+        for raw in self.process.stdout:
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                self.stats = {
+                    "frame": int(block.get("frame", 0) or 0),
+                    "fps": float(block.get("fps", 0) or 0),
+                    "speed": float((block.get("speed") or "0x").rstrip("x") or 0),
+                    "drop_frames": int(block.get("drop_frames", 0) or 0),
+                    "dup_frames": int(block.get("dup_frames", 0) or 0),
+                    "out_time_seconds": int(block.get("out_time_us", 0) or 0) / 1e6,
+                    "total_size": int(block.get("total_size", 0) or 0),
+                }
+                ENCODER_FPS.set(self.stats["fps"])
+                ENCODER_SPEED.set(self.stats["speed"])
+                ENCODER_DROPPED.set(self.stats["drop_frames"])
+                block = {}
+
+    def _read_stderr(self):
+        for raw in self.process.stderr:
+            self._stderr_tail = (self._stderr_tail + [raw.decode(errors="replace").rstrip()])[-20:]
+
+    def get_stats(self):
+        """
+        Latest encoder figures. A speed below 1.0x or growing drop_frames means
+        the host is overpacked.
+        """
+        return dict(self.stats)
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop_recording(self, timeout=30):
+        """
+        Asks FFmpeg to finish with 'q' so it writes the MP4 trailer (moov atom),
+        escalating to SIGINT and finally a kill if it does not exit in time.
+        """
+        if not self.process:
+            return
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(b"q")
+                self.process.stdin.flush()
+                self.process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                print("⚠️ FFmpeg did not stop on 'q', sending an interrupt...")
+                if os.name == "posix":
+                    self.process.send_signal(signal.SIGINT)
+                else:
+                    self.process.terminate()
+                try:
+                    self.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+
+        if self._progress_thread:
+            self._progress_thread.join(timeout=5)
+        stats = self.get_stats()
+        if self.process.returncode not in (0, 255):
+            print(f"⚠️ FFmpeg exited with code {self.process.returncode}:")
+            for line in self._stderr_tail:
+                print(f"   {line}")
+        print(f"⏹️  Recording stopped: {stats.get('frame', 0)} frames, {stats.get('fps', 0):.1f} fps, "
+              f"{stats.get('speed', 0):.2f}x speed, {stats.get('drop_frames', 0)} dropped.")
@@ -0,0 +1,261 @@
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from driver_pool import DriverPool
+from job_journal import recover_pending
+from media_sandbox import MediaSandboxPool, media_sandbox_supported
+from system_resources import max_concurrent_jobs
+import telemetry
+
+JOBS_BY_STATUS = telemetry.REGISTRY.gauge("meetbot_scheduler_jobs", "Scheduler jobs by status.")
+
+class MeetingJob:
+    """
+    A single meeting to record: the Meet link and when the bot should join.
+    """
+    def __init__(self, meet_link, start_time=None, job_id=None):
+        self.meet_link = meet_link
+        self.start_time = start_time or datetime.utcnow()
+        self.job_id = job_id or str(uuid.uuid4())
+
+    def __lt__(self, other):
+        return self.start_time < other.start_time
+
+def load_jobs(path):
+    """
+    Reads meeting jobs from a JSON file containing a list of
+    {"meet_link": ..., "start_time": "2025-11-04T12:15:00"} entries.
+    A missing start_time means "join now". Times without an offset are UTC.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    jobs = []
+    for entry in entries:
+        start_time = entry.get("start_time")
+        if start_time:
+            start_time = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+            if start_time.tzinfo:
+                # The queue compares against naive UTC (datetime.utcnow()).
+                start_time = start_time.astimezone(timezone.utc).replace(tzinfo=None)
+        jobs.append(MeetingJob(entry["meet_link"], start_time, entry.get("job_id")))
+    return jobs
+
+# What a job's status is left at if its worker process dies without reporting a result.
+UNFINISHED_STATUSES = ("dispatched", "running")
+
+def _run_job(job_id, meet_link, statuses, debugger_address=None, sandbox=None, postprocess_slots=None,
+             worker=None):
+    """
+    Worker entry point. Runs in its own process so a crashed browser or
+    recorder only takes down its own meeting.
+    `worker` is the scheduler's slot number for this process.
+    """
+    # Imported here so each worker process sets up its own Selenium/FFmpeg state.
+    from main import record_meeting
+    from postprocess import get_postprocessor
+
+    load_dotenv()
+    # A stable slot number (rather than this short-lived pid) names the metrics file.
+    metrics_path = telemetry.start_exporters(http=False, worker=worker)
+    postprocessor = get_postprocessor(slots=postprocess_slots)
+
+    def report(stage):
+        statuses[job_id] = {"status": "running", "stage": stage}
+
+    try:
+        result = record_meeting(meet_link, report=report, debugger_address=debugger_address,
+                                sandbox=sandbox, job_id=job_id)
+    except Exception as e:
+        result = {"status": "failed", "stage": statuses[job_id].get("stage"), "error": str(e)}
+    finally:
+        # Worker processes exit without running atexit hooks, so shut the
+        # post-processing pool down and write the final numbers now.
+        postprocessor.close()
+        if metrics_path:
+            telemetry.write_metrics_file(metrics_path)
+    statuses[job_id] = result
+    return result
+
+class Scheduler:
+    """
+    Runs many meetings concurrently from one process.
+    Jobs wait in a queue ordered by start time. Each one runs in its own worker
+    process, at most `max_workers` at once (capped by the host's CPU/memory
+    budget). A worker that dies (an OOM kill, a Chrome or driver crash) fails
+    only its own job; the others keep running and dispatching carries on.
+    If a DriverPool is given, each job is handed a warm Chrome session instead
+    of cold-starting its own browser. If a MediaSandboxPool is given, each job
+    gets its own display and audio sink (warm sessions bring their own).
+    At most `postprocess_workers` jobs post-process their recordings at once.
+    """
+    def __init__(self, max_workers=None, cpus_per_job=1.0, memory_mb_per_job=1500, driver_pool=None,
+                 sandbox_pool=None, postprocess_workers=None):
+        self.max_workers = max_workers or max_concurrent_jobs(cpus_per_job, memory_mb_per_job)
+        self.driver_pool = driver_pool
+        self.sandbox_pool = sandbox_pool
+        self._queue = []
+        self._manager = multiprocessing.Manager()
+        self.statuses = self._manager.dict()
+        self.postprocess_slots = self._manager.BoundedSemaphore(
+            postprocess_workers or int(os.environ.get("POSTPROCESS_WORKERS", "2")))
+
+    def submit(self, job):
+        heapq.heappush(self._queue, job)
+        self.statuses[job.job_id] = {"status": "queued", "stage": None, "meet_link": job.meet_link}
+
+    def print_status(self):
+        print("📊 Job status:")
+        for job_id, status in self.statuses.items():
+            print(f"   {job_id}: {status.get('status')} ({status.get('stage')})")
+
+    def _dispatch(self, job, session, context, slot):
+        """
+        Starts `job` in a new worker process. Returns (process, sandbox), or
+        (None, sandbox) if the process could not be started.
+        """
+        print(f"▶️  Dispatching job {job.job_id} for {job.meet_link}")
+        self.statuses[job.job_id] = {"status": "dispatched", "stage": None, "meet_link": job.meet_link}
+        sandbox = None
+        if session and session.sandbox:
+            sandbox = session.sandbox
+        elif self.sandbox_pool and not session:
+            try:
+                sandbox = self.sandbox_pool.acquire()
+            except Exception as e:
+                print(f"⚠️ Could not create a media sandbox, using the shared display. Error: {e}")
+        process = context.Process(target=_run_job, name=f"meeting-{job.job_id}",
+                                  args=(job.job_id, job.meet_link, self.statuses,
+                                        session.debugger_address if session else None,
+                                        sandbox.describe() if sandbox else None,
+                                        self.postprocess_slots, slot))
+        try:
+            process.start()
+        except Exception as e:
+            print(f"❌ Could not start a worker for job {job.job_id}. Error: {e}")
+            self.statuses[job.job_id] = {"status": "failed", "stage": None, "error": str(e)}
+            return None, sandbox
+        return process, sandbox
+
+    def _reap(self, job_id, process):
+        """
+        Marks a job failed if its worker exited without reporting a result.
+        """
+        process.join()
+        status = self.statuses.get(job_id, {})
+        if status.get("status") not in UNFINISHED_STATUSES:
+            return
+        exitcode = process.exitcode
+        reason = f"killed by signal {-exitcode}" if exitcode < 0 else f"exited with code {exitcode}"
+        print(f"❌ Worker for job {job_id} {reason} during {status.get('stage') or 'startup'}.")
+        self.statuses[job_id] = {"status": "failed", "stage": status.get("stage"), "error": f"worker {reason}"}
+
+    def run(self, status_interval=60):
+        """
+        Dispatches every queued job at its start time and blocks until all of them finish.
+        Returns the final per-job status mapping.
+        """
+        print(f"🗓️  Scheduler started with up to {self.max_workers} concurrent meetings.")
+        # job_id -> (process, warm session, sandbox, worker slot)
+        running = {}
+        free_slots = list(range(self.max_workers))
+        last_report = time.monotonic()
+
+        # 'spawn' gives each worker a clean interpreter, and one process per
+        # meeting means a leaked Chrome or FFmpeg handle never outlives it.
+        context = multiprocessing.get_context("spawn")
+        while self._queue or running:
+            while self._queue and free_slots and self._queue[0].start_time <= datetime.utcnow():
+                session = None
+                if self.driver_pool:
+                    session = self.driver_pool.acquire(timeout=0)
+                    if not session:
+                        break
+                job = heapq.heappop(self._queue)
+                slot = free_slots.pop(0)
+                process, sandbox = self._dispatch(job, session, context, slot)
+                running[job.job_id] = (process, session, sandbox, slot)
+
+            for job_id, (process, session, sandbox, slot) in list(running.items()):
+                if process and process.is_alive():
+                    continue
+                if process:
+                    self._reap(job_id, process)
+                if session:
+                    self.driver_pool.release(session)
+                elif sandbox:
+                    self.sandbox_pool.release(sandbox)
+                free_slots.append(slot)
+                del running[job_id]
+
+            statuses = list(self.statuses.values())
+            for status in ("queued", "dispatched", "running"):
+                JOBS_BY_STATUS.set(sum(1 for st in statuses if st.get("status") == status), status=status)
+
+            if time.monotonic() - last_report >= status_interval:
+                self.print_status()
+                last_report = time.monotonic()
+            time.sleep(1)
+
+        self.print_status()
+        return dict(self.statuses)
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python scheduler.py <jobs.json>")
+        sys.exit(1)
+
+    load_dotenv()
+    if os.environ.get("METRICS_PORT") and not os.environ.get("METRICS_DIR"):
+        # The per-job metrics live in the workers; /metrics here merges the files they write.
+        os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="meetbot_metrics_")
+    telemetry.start_exporters()
+    scheduler = Scheduler()
+
+    if os.environ.get("MEDIA_SANDBOX") == "1":
+        if media_sandbox_supported():
+            scheduler.sandbox_pool = MediaSandboxPool(os.environ.get("MEDIA_SANDBOX_RESOLUTION", "1280x720"))
+        else:
+            print("⚠️ MEDIA_SANDBOX=1 needs Linux with Xvfb and pactl. Using the shared display.")
+
+    driver_pool = None
+    template_profile = os.environ.get("CHROME_TEMPLATE_PROFILE")
+    if template_profile:
+        driver_pool = DriverPool(scheduler.max_workers, template_profile,
+                                 headless=os.environ.get("CHROME_HEADLESS") == "1",
+                                 sandbox_pool=scheduler.sandbox_pool)
+        if driver_pool.start():
+            scheduler.driver_pool = driver_pool
+        else:
+            driver_pool.close()
+            driver_pool = None
+
+    # Finish uploads and metadata writes left behind by a previous crash
+    # while the new meetings get under way.
+    recovery = threading.Thread(target=recover_pending, daemon=True)
+    recovery.start()
+
+    try:
+        for job in load_jobs(sys.argv[1]):
+            scheduler.submit(job)
+        scheduler.run()
+        recovery.join()
+    finally:
+        if driver_pool:
+            driver_pool.close()
+        if scheduler.sandbox_pool:
+            scheduler.sandbox_pool.close()
+
+    print("\n🎉 All jobs finished.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Built-in selector strategies. A JSON file named by SELECTOR_DEFINITIONS with
+# the same shape overrides any group; it is re-read whenever it changes, so a
+# Meet UI change can be handled without a code change or restart.
+DEFAULT_DEFINITIONS = {
+    "participants_button": [
+        "//button[.//i[contains(text(), 'people')]]",
+        "//button[@aria-label[contains(., 'participant')]]",
+        "//button[@aria-label[contains(., 'People')]]",
+        "//button[contains(@aria-label, 'Show everyone')]",
+        "//button[@jsname='A5il2e']",
+    ],
+    "participants_panel": ["div.R3Gmyc", "div[role='list']", "div.Sfe7Qb", "div.CKKJIf"],
+    "participant_name": ["div.zWGUib", "div.Yx52jb", "span[data-self-name]", "div.GvcuGe", "div.wnPUne"],
+}
+
+@contextmanager
+def _file_lock(path):
+    """
+    Holds an exclusive lock on `path` (created if needed) across processes.
+    """
+    with open(path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class SelectorRegistry:
+    """
+    Remembers which selector strategies work and how fast.
+
+    Every probe of a selector is recorded as a hit or a miss. The recent success
+    rate is an exponentially weighted average, so a strategy that stops working
+    after a Meet UI change sinks within a few runs. ordered() returns each group
+    best-first. Stats are persisted to a JSON file, so the learning carries
+    across runs and worker processes: save() merges this process's new
+    observations into whatever other processes saved in the meantime.
+    """
+    def __init__(self, stats_path=None, definitions_path=None, alpha=0.3):
+        self.stats_path = stats_path or os.environ.get("SELECTOR_STATS", "selector_stats.json")
+        self.definitions_path = definitions_path or os.environ.get("SELECTOR_DEFINITIONS")
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._definitions = dict(DEFAULT_DEFINITIONS)
+        self._definitions_mtime = None
+        self._stats = {}
+        # Observations not yet saved: {(group, selector): [(hit, elapsed_ms), ...]}.
+        self._pending = {}
+        self._load_stats()
+
+    def _read_stats(self):
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_stats(self):
+        self._stats = self._read_stats()
+
+    def _reload_definitions(self):
+        if not self.definitions_path:
+            return
+        try:
+            mtime = os.path.getmtime(self.definitions_path)
+        except OSError:
+            return
+        if mtime == self._definitions_mtime:
+            return
+        try:
+            with open(self.definitions_path) as f:
+                overrides = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read selector definitions from '{self.definitions_path}'. Error: {e}")
+            return
+        self._definitions = dict(DEFAULT_DEFINITIONS, **overrides)
+        self._definitions_mtime = mtime
+        print(f"🔄 Reloaded selector definitions from '{self.definitions_path}'.")
+
+    def definitions(self, group):
+        with self._lock:
+            self._reload_definitions()
+            return list(self._definitions.get(group, []))
+
+    @staticmethod
+    def _entry(stats, group, selector):
+        return stats.setdefault(group, {}).setdefault(
+            selector, {"hits": 0, "misses": 0, "score": 0.5, "avg_ms": None})
+
+    def _apply(self, entry, hit, elapsed_ms):
+        entry["hits" if hit else "misses"] += 1
+        entry["score"] = (1 - self.alpha) * entry["score"] + self.alpha * (1.0 if hit else 0.0)
+        if hit and elapsed_ms is not None:
+            previous = entry["avg_ms"]
+            entry["avg_ms"] = elapsed_ms if previous is None else \
+                round((1 - self.alpha) * previous + self.alpha * elapsed_ms, 1)
+
+    def ordered(self, group):
+        """
+        The group's selectors, best recent success rate first (then fastest,
+        then definition order for untried ones).
+        """
+        selectors = self.definitions(group)
+        with self._lock:
+            stats = self._stats.get(group, {})
+
+            def rank(item):
+                index, selector = item
+                entry = stats.get(selector, {})
+                return (-entry.get("score", 0.5), entry.get("avg_ms") or float("inf"), index)
+
+            return [selector for _, selector in sorted(enumerate(selectors), key=rank)]
+
+    def record(self, group, selector, hit, elapsed_ms=None):
+        with self._lock:
+            self._apply(self._entry(self._stats, group, selector), hit, elapsed_ms)
+            self._pending.setdefault((group, selector), []).append((hit, elapsed_ms))
+
+    def record_probes(self, group, probes):
+        """
+        Records a {selector: {'hit', 'ms'}} mapping from one in-page probe of
+        the whole group, with each selector's own query time.
+        """
+        for selector, probe in probes.items():
+            self.record(group, selector, bool(probe.get("hit")), probe.get("ms"))
+
+    def stats(self):
+        """
+        Hit/miss counts, recent success rate and average latency per selector.
+        """
+        with self._lock:
+            return {group: {selector: {"hits": e["hits"], "misses": e["misses"],
+                                       "success_rate": round(e["score"], 3), "avg_ms": e["avg_ms"]}
+                            for selector, e in entries.items()}
+                    for group, entries in self._stats.items()}
+
+    def save(self):
+        """
+        Replays this process's observations since the last save onto the
+        stats file as it is now, under a lock, so concurrent workers add to
+        each other's counts instead of overwriting them.
+        """
+        with self._lock:
+            tmp_path = f"{self.stats_path}.{os.getpid()}.tmp"
+            try:
+                with _file_lock(f"{self.stats_path}.lock"):
+                    merged = self._read_stats()
+                    for (group, selector), observations in self._pending.items():
+                        entry = self._entry(merged, group, selector)
+                        for hit, elapsed_ms in observations:
+                            self._apply(entry, hit, elapsed_ms)
+                    with open(tmp_path, "w") as f:
+                        json.dump(merged, f, indent=2)
+                    os.replace(tmp_path, self.stats_path)
+                self._stats = merged
+                self._pending = {}
+            except OSError as e:
+                print(f"⚠️ Could not save selector stats. Error: {e}")
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SelectorRegistry()
+        return _registry
+
+if __name__ == "__main__":
+    for group, entries in get_registry().stats().items():
+        print(f"{group}:")
+        for selector, entry in entries.items():
+            avg_ms = f"{entry['avg_ms']:.0f} ms" if entry["avg_ms"] is not None else "-"
+            print(f"   {entry['success_rate']:>5.2f}  {entry['hits']:>5} hits  {entry['misses']:>5} misses  "
+                  f"{avg_ms:>8}  {selector}")
@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gcp_handler import MAX_COMPOSE_SOURCES, get_bucket, retry_with_backoff
+
+# FFmpeg output flags that make the recorder write a fragmented MP4. Fragments
+# are appended and earlier bytes are never rewritten, so the file can be
+# uploaded in byte ranges while it is still growing, and the concatenation of
+# those ranges is a playable MP4.
+FRAGMENTED_MP4_FLAGS = ["-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+                        "-frag_duration", "2000000", "-flush_packets", "1"]
+
+class StreamingUploader:
+    """
+    Uploads a recording to GCS while FFmpeg is still writing it.
+
+    The growing file is cut into fixed-size byte ranges. Each finished range is
+    uploaded as its own part object as soon as it is complete, and parts are
+    folded into a running composite with server-side compose. When the meeting
+    ends only the tail has to be uploaded, so the final object is available
+    seconds later.
+
+    At most `max_in_flight` parts are held in memory at once. Progress is kept
+    in a small state file next to the recording, so a restarted process can
+    call StreamingUploader.resume() and continue where it stopped.
+    """
+    def __init__(self, local_file_path, destination_blob_name, part_size=16 * 1024 * 1024,
+                 max_in_flight=2, poll_interval=1.0, state_path=None):
+        self.local_file_path = local_file_path
+        self.destination_blob_name = destination_blob_name
+        self.part_size = part_size
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.state_path = state_path or f"{local_file_path}.upload-state"
+        self.parts_prefix = f"{destination_blob_name}.parts/"
+        self.composite_name = f"{self.parts_prefix}composite"
+
+        # Part i always covers bytes [i * part_size, (i + 1) * part_size).
+        self.composed_through = -1
+        self.uploaded_parts = set()
+        self.next_index = 0
+        self.bytes_uploaded = 0
+
+        self._bucket = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._futures = []
+        self._error = None
+
+    @classmethod
+    def resume(cls, local_file_path, state_path=None):
+        """
+        Rebuilds an uploader from its state file after a restart.
+        Returns None if there is nothing to resume.
+        """
+        state_path = state_path or f"{local_file_path}.upload-state"
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path) as f:
+            state = json.load(f)
+        uploader = cls(local_file_path, state["destination_blob_name"], state["part_size"],
+                       state_path=state_path)
+        uploader.composed_through = state["composed_through"]
+        uploader.uploaded_parts = set(state["uploaded_parts"])
+        # Parts that were still in flight when the process died are uploaded
+        # again; part names are deterministic, so this just overwrites them.
+        index = uploader.composed_through + 1
+        while index in uploader.uploaded_parts:
+            index += 1
+        uploader.uploaded_parts = {i for i in uploader.uploaded_parts if i < index}
+        uploader.next_index = index
+        print(f"🔁 Resuming streaming upload of '{local_file_path}' from byte {uploader.next_offset}.")
+        return uploader
+
+    @property
+    def next_offset(self):
+        return self.next_index * self.part_size
+
+    def _part_name(self, index):
+        return f"{self.parts_prefix}{index:06d}"
+
+    def _save_state(self):
+        state = {
+            "destination_blob_name": self.destination_blob_name,
+            "part_size": self.part_size,
+            "composed_through": self.composed_through,
+            "uploaded_parts": sorted(self.uploaded_parts),
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def start(self):
+        """
+        Starts uploading finished parts in the background while the file grows.
+        """
+        self._bucket = get_bucket()
+        if not self._bucket:
+            return False
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"📡 Streaming '{self.local_file_path}' to gs://{self._bucket.name}/{self.destination_blob_name}...")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set() and not self._error:
+            self._upload_available(final=False)
+            self._stop.wait(self.poll_interval)
+
+    def _upload_available(self, final):
+        """
+        Queues every complete part (and, when `final`, the trailing partial one).
+        Blocks while `max_in_flight` parts are already uploading.
+        """
+        if not os.path.exists(self.local_file_path):
+            return
+        size = os.path.getsize(self.local_file_path)
+        while self.next_offset + self.part_size <= size or (final and self.next_offset < size):
+            index = self.next_index
+            length = min(self.part_size, size - self.next_offset)
+            self.next_index += 1
+
+            self._futures = [f for f in self._futures if not f.done()]
+            while len(self._futures) >= self.max_in_flight:
+                self._futures[0].result()
+                self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(self._pool.submit(self._upload_part, index, length))
+
+    def _upload_part(self, index, length):
+        try:
+            with open(self.local_file_path, "rb") as f:
+                f.seek(index * self.part_size)
+                data = f.read(length)
+            blob = self._bucket.blob(self._part_name(index))
+            retry_with_backoff(lambda: blob.upload_from_string(data, checksum="crc32c"),
+                               description=f"Upload of part {index}")
+            with self._lock:
+                self.bytes_uploaded += length
+                self.uploaded_parts.add(index)
+                self._compose_ready(final=False)
+                self._save_state()
+        except Exception as e:
+            self._error = e
+            print(f"❌ Streaming upload of part {index} failed. Error: {e}")
+
+    def _ready_parts(self):
+        """
+        Uploaded parts that directly follow what is already composed. Parts can
+        finish out of order, and compose has to keep byte order.
+        """
+        ready = []
+        index = self.composed_through + 1
+        while index in self.uploaded_parts:
+            ready.append(index)
+            index += 1
+        return ready
+
+    def _compose(self, indexes, target_name):
+        sources = [self._bucket.blob(self.composite_name)] if self.composed_through >= 0 else []
+        sources += [self._bucket.blob(self._part_name(i)) for i in indexes]
+        target = self._bucket.blob(target_name)
+        retry_with_backoff(lambda: target.compose(sources), description="Compose of uploaded parts")
+        self.composed_through = indexes[-1]
+        for i in indexes:
+            self.uploaded_parts.discard(i)
+            self._delete_quietly(self._part_name(i))
+
+    def _compose_ready(self, final):
+        """
+        Folds contiguous parts into the running composite once a full compose
+        batch has piled up. When `final`, the last batch is composed straight
+        into the destination object instead.
+        """
+        ready = self._ready_parts()
+        if final and not ready:
+            if self.composed_through < 0:
+                raise RuntimeError("no data was uploaded")
+            # Everything is already in the composite; a one-source compose moves it into place.
+            target = self._bucket.blob(self.destination_blob_name)
+            retry_with_backoff(lambda: target.compose([self._bucket.blob(self.composite_name)]),
+                               description="Compose of uploaded parts")
+            return
+        while ready:
+            slots = MAX_COMPOSE_SOURCES - (1 if self.composed_through >= 0 else 0)
+            if final and len(ready) <= slots:
+                self._compose(ready, self.destination_blob_name)
+                return
+            if not final and len(ready) < slots:
+                return
+            self._compose(ready[:slots], self.composite_name)
+            ready = ready[slots:]
+
+    def _delete_quietly(self, name):
+        try:
+            self._bucket.blob(name).delete()
+        except Exception:
+            pass
+
+    def abort(self):
+        """
+        Stops uploading and deletes every part and composite uploaded so far.
+        The destination object is never written.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        for future in self._futures:
+            future.exception()
+        if self._pool:
+            self._pool.shutdown()
+        if not self._bucket:
+            return
+        with self._lock:
+            for index in self.uploaded_parts:
+                self._delete_quietly(self._part_name(index))
+            self._delete_quietly(self.composite_name)
+            self.uploaded_parts.clear()
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def finish(self):
+        """
+        Call after the recorder has stopped. Uploads the tail, composes the final
+        object and returns its gs:// URI (None on failure).
+        """
+        try:
+            if not self._bucket:
+                self._bucket = get_bucket()
+                if not self._bucket:
+                    return None
+            if not self._pool:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+            self._stop.set()
+            if self._thread:
+                self._thread.join()
+
+            self._upload_available(final=True)
+            for future in self._futures:
+                future.result()
+            self._pool.shutdown()
+            if self._error:
+                raise self._error
+
+            with self._lock:
+                self._compose_ready(final=True)
+                self._delete_quietly(self.composite_name)
+
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            print(f"✅ Streaming upload finished ({os.path.getsize(self.local_file_path)} bytes).")
+            return f"gs://{self._bucket.name}/{self.destination_blob_name}"
+        except Exception as e:
+            print(f"❌ Failed to finish the streaming upload. Error: {e}")
+            return None
@@ -0,0 +1,140 @@
+import os
+
+def cpu_count():
+    """
+    Returns the number of CPUs this process is allowed to run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def available_memory_mb():
+    """
+    Reads MemAvailable from /proc/meminfo.
+    Returns None on platforms without /proc.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+def max_concurrent_jobs(cpus_per_job=1.0, memory_mb_per_job=1500, reserve_memory_mb=1024):
+    """
+    Works out how many meetings this host can record at once.
+    Every job needs a Chrome session plus an FFmpeg encoder, so the limit is
+    whichever runs out first: CPU cores or free memory.
+    """
+    by_cpu = max(1, int(cpu_count() / cpus_per_job))
+
+    free_mb = available_memory_mb()
+    if free_mb is None:
+        return by_cpu
+    by_memory = max(1, (free_mb - reserve_memory_mb) // memory_mb_per_job)
+    return min(by_cpu, by_memory)
+
+def _child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so split after its closing paren.
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+def process_tree_pids(pid):
+    """
+    Returns pid plus every descendant pid (Chrome spawns a renderer/GPU/utility process tree).
+    """
+    pids = [pid]
+    index = 0
+    while index < len(pids):
+        pids.extend(_child_pids(pids[index]))
+        index += 1
+    return pids
+
+def process_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def process_tree_rss_mb(pid):
+    """
+    Total resident memory of a process and all of its descendants, in MB.
+    Returns None on platforms without /proc.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    return sum(process_rss_mb(p) for p in process_tree_pids(pid))
+
+def process_cpu_seconds(pid):
+    """
+    User + system CPU time consumed so far by one process, or 0.0 if it is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat.
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+def process_tree_cpu_seconds(pid):
+    """
+    Total user + system CPU time consumed so far by a process and its descendants.
+    Sample it twice and divide the difference by the wall time to get cores used.
+    """
+    return sum(process_cpu_seconds(p) for p in process_tree_pids(pid))
+
+def process_start_id(pid):
+    """
+    Identifies one run of a process: the boot id plus its start time in clock
+    ticks since boot. Unlike the pid alone it is never reused, so it tells a
+    recorded process apart from a new one that got the same pid.
+    Returns None if the process is gone or the platform has no /proc.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # starttime is field 22 of /proc/<pid>/stat.
+        return f"{boot_id}:{fields[19]}"
+    except (OSError, IndexError):
+        return None
+
+def process_command_line(pid):
+    """
+    Returns the arguments a process was started with, or [] if it is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+    except OSError:
+        return []
+
+def find_process_with_argument(argument):
+    """
+    Returns the pid of the first process started with `argument`, or None.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    for entry in os.listdir("/proc"):
+        if entry.isdigit() and argument in process_command_line(int(entry)):
+            return int(entry)
+    return None
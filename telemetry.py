@@ -0,0 +1,335 @@
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Job/recording identifiers attached to every structured log line.
+_context = contextvars.ContextVar("telemetry_context", default={})
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, 7200)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self, extra=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key, extra)} {value}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self, extra=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        extra = list(extra)
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, extra + [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, extra + [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key, extra)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key, extra)} {count}")
+        return lines
+
+class Registry:
+    """
+    Process-wide metrics. Metric updates are a dictionary update under a lock,
+    cheap enough for hot loops such as the meeting-monitor poll.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def expose(self, extra_labels=None):
+        """
+        Renders every metric in the Prometheus text exposition format.
+        `extra_labels` are added to every series.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        extra = sorted((extra_labels or {}).items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose(extra))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("meetbot_stage_duration_seconds", "Duration of each pipeline stage.")
+STAGE_ERRORS = REGISTRY.counter("meetbot_stage_errors_total", "Pipeline stages that raised an error.")
+
+# --- Structured logs ---
+
+_log_lock = threading.Lock()
+_log_file = None
+
+def _log_stream():
+    global _log_file
+    if _log_file is None:
+        target = os.environ.get("TELEMETRY_LOG", "telemetry.jsonl")
+        _log_file = open(target, "a", encoding="utf-8", buffering=1)
+    return _log_file
+
+def log(event, **fields):
+    """
+    Writes one JSON log line carrying the current job/recording context.
+    """
+    record = {"ts": datetime.utcnow().isoformat() + "Z", "event": event, "pid": os.getpid()}
+    record.update(_context.get())
+    record.update(fields)
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        _log_stream().write(line + "\n")
+
+def bind(**fields):
+    """
+    Adds fields (e.g. job_id, recording_id) to the log context of the current thread/task.
+    """
+    _context.set(dict(_context.get(), **fields))
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Times a pipeline stage: observes meetbot_stage_duration_seconds, counts
+    failures and logs the outcome as JSON.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+        STAGE_ERRORS.inc(stage=stage, **labels)
+        log("stage_failed", stage=stage, seconds=round(elapsed, 4), error=repr(e), **labels)
+        raise
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+    log("stage_finished", stage=stage, seconds=round(elapsed, 4), **labels)
+
+class StageTracker:
+    """
+    Times a sequence of pipeline stages where each stage ends when the next one
+    starts, e.g. record_meeting()'s launching_browser -> joining -> ... -> uploading.
+    """
+    def __init__(self):
+        self.stage = None
+        self._started = None
+
+    def enter(self, stage):
+        self._close()
+        self.stage = stage
+        self._started = time.perf_counter()
+        log("stage_started", stage=stage)
+
+    def _close(self, error=None):
+        if self.stage is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if error:
+            STAGE_ERRORS.inc(stage=self.stage)
+            log("stage_failed", stage=self.stage, seconds=round(elapsed, 4), error=error)
+        else:
+            log("stage_finished", stage=self.stage, seconds=round(elapsed, 4))
+        self.stage = None
+
+    def finish(self, status, error=None):
+        """
+        Closes the running stage. A status other than 'succeeded' counts the
+        last stage as failed.
+        """
+        self._close(error or (None if status == "succeeded" else status))
+
+# --- Exporters ---
+
+def merged_exposition(directory=None):
+    """
+    Renders this process's metrics together with the .prom files other
+    processes (e.g. scheduler workers) write to `directory`, with each
+    metric's HELP and TYPE lines written once.
+    """
+    texts = [REGISTRY.expose()]
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            # This process's own file is already covered by REGISTRY.
+            if not (name.startswith("meetbot_") and name.endswith(".prom")) or path in _file_labels:
+                continue
+            try:
+                with open(path) as f:
+                    texts.append(f.read())
+            except OSError:
+                continue
+
+    families = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                _, kind, name = line.split(" ", 3)[:3]
+                family = families.setdefault(name, {"HELP": None, "TYPE": None, "samples": []})
+                family[kind] = family[kind] or line
+            elif line and family is not None:
+                family["samples"].append(line)
+    lines = []
+    for family in families.values():
+        lines.extend(line for line in (family["HELP"], family["TYPE"]) if line)
+        lines.extend(family["samples"])
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = merged_exposition(os.environ.get("METRICS_DIR")).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_http_exporter(port, host=None):
+    """
+    Serves /metrics for Prometheus to scrape, from a background thread.
+    Listens on METRICS_BIND (default 127.0.0.1 only). The response includes
+    the metrics files of every other process writing to METRICS_DIR.
+    """
+    host = host or os.environ.get("METRICS_BIND", "127.0.0.1")
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
+
+# Extra labels each metrics file is written with, by path.
+_file_labels = {}
+
+def write_metrics_file(path):
+    """
+    Writes the metrics atomically. Series carry a worker (or pid) label so the
+    files of several processes can be collected side by side without clashing.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(REGISTRY.expose(_file_labels.get(path, {"pid": os.getpid()})))
+    os.replace(tmp_path, path)
+
+def _remove_metrics_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def start_file_exporter(directory, interval=15, worker=None):
+    """
+    Rewrites a .prom file in `directory` every `interval` seconds, for the
+    node_exporter textfile collector.
+
+    Scheduler workers pass their `worker` slot and write meetbot_worker<N>.prom,
+    which the next job in that slot takes over, so the number of files stays
+    bounded by the pool size. Any other process writes meetbot_<pid>.prom and
+    removes it when it exits, so a dead process's series are not exported forever.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if worker is None:
+        path = os.path.join(directory, f"meetbot_{os.getpid()}.prom")
+        _file_labels[path] = {"pid": os.getpid()}
+        atexit.register(_remove_metrics_file, path)
+    else:
+        path = os.path.join(directory, f"meetbot_worker{worker}.prom")
+        _file_labels[path] = {"worker": worker}
+
+    def run():
+        while True:
+            write_metrics_file(path)
+            time.sleep(interval)
+
+    threading.Thread(target=run, daemon=True).start()
+    return path
+
+def start_exporters(http=True, worker=None):
+    """
+    Starts whatever exporters the environment asks for: METRICS_PORT (HTTP)
+    and/or METRICS_DIR (textfile). Returns the metrics file path, if any.
+    Worker processes pass http=False, since only one process can own the
+    port, and their worker slot.
+    """
+    if http and os.environ.get("METRICS_PORT"):
+        start_http_exporter(int(os.environ["METRICS_PORT"]))
+    if os.environ.get("METRICS_DIR"):
+        return start_file_exporter(os.environ["METRICS_DIR"], worker=worker)
+    return None
@@ -0,0 +1,74 @@
+"""
+Switches the Meet fixture to Spotlight mid-call and checks that participants
+whose tiles disappear are not reported as leaving, while a real departure
+still is. Needs Chrome and chromedriver; skipped without them.
+
+Usage (from the project root):
+    python -m pytest tests/test_long_meeting_layout.py
+"""
+import pathlib
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from browser_handler import initialize_driver
+from long_meeting import LongMeetingGuard
+from meeting_monitor import MeetingMonitor
+
+FIXTURE = pathlib.Path(__file__).resolve().parent.parent / "fixtures" / "meet_call.html"
+REMOTE_PARTICIPANTS = 8
+
+@pytest.fixture
+def driver():
+    driver = initialize_driver(user_data_dir=tempfile.mkdtemp(prefix="test_layout_profile_"), headless=True)
+    if not driver:
+        pytest.skip("Chrome and chromedriver are needed to drive the fixture")
+    yield driver
+    driver.quit()
+
+def drain(monitor):
+    """
+    Returns every event the monitor has queued, waiting briefly for stragglers.
+    """
+    events = []
+    while True:
+        batch = monitor.wait_for_events(timeout=1)
+        if not batch:
+            return events
+        events += batch
+
+def in_spotlight(driver):
+    driver.get(f"{FIXTURE.as_uri()}?participants={REMOTE_PARTICIPANTS}&panelDelay=50")
+    monitor = MeetingMonitor(driver, poll_timeout=1, reconcile_seconds=0.2, roster_seconds=0)
+    monitor.install()
+    joined = [e for e in drain(monitor) if e["type"] == "participant_joined"]
+    # The bot's own tile is not a participant.
+    assert len(joined) == REMOTE_PARTICIPANTS
+    assert "spaces/fixture/devices/self" not in [e["id"] for e in joined]
+
+    guard = LongMeetingGuard(driver, "full", on_layout_change=lambda: monitor.set_tiles_complete(False))
+    assert guard._apply("layout", {"layout": "Spotlight", "tiles": None}, "test")
+    assert driver.execute_script("return meetFixture.view.layout") == "Spotlight"
+    assert len(driver.find_elements("css selector", "#grid div[data-participant-id]")) == 1
+    return monitor
+
+def test_switching_layout_is_not_a_departure(driver):
+    monitor = in_spotlight(driver)
+    # Let the in-page rescan run, then check against the People panel.
+    events = drain(monitor)
+    assert monitor.reconcile_roster()
+    events += drain(monitor)
+    assert [e for e in events if e["type"] == "participant_left"] == []
+
+def test_departure_after_layout_switch_comes_from_the_roster(driver):
+    monitor = in_spotlight(driver)
+    # The spotlight shows the first remote participant, so the last one has no tile.
+    leaving = f"spaces/fixture/devices/{REMOTE_PARTICIPANTS - 1}"
+    driver.execute_script("meetFixture.removeParticipant(arguments[0])", leaving)
+    assert drain(monitor) == []
+    assert monitor.reconcile_roster()
+    left = [e["id"] for e in drain(monitor) if e["type"] == "participant_left"]
+    assert left == [leaving]